@@ -1,11 +1,18 @@
 import numpy as np
+import random
 import time
 from agents.common import *
-from agents.agent_minimax.minimax import get_valid_columns
+from agents import kernels
+from agents.bitboard import BitBoard, COLS
+from agents.book import get_book
+from agents.agent_mct.selection import SelectionPolicy, get_policy
+from agents.agent_mct.rollout import batched_rollouts, rollout_counts
 
 
 def generate_move_montecarlo(
-        board: np.ndarray, player: BoardPiece, saved_state: Optional[SavedState]
+        board: np.ndarray, player: BoardPiece, saved_state: Optional[SavedState], runtime=10, n_workers: int = 1,
+        parallel: str = "root", max_nodes: Optional[int] = None, policy=None, rollouts: int = 1,
+        max_iterations: Optional[int] = None, early_stop: bool = False, compact: bool = False, book=None
 ) -> Tuple[PlayerAction, Optional[SavedState]]:
     """
     generate move function employing monte carlo tree search algorithm
@@ -13,75 +20,143 @@ def generate_move_montecarlo(
     -----------
     board: np.ndarray  # board reflecting current game state
     player: BoardPiece  # player for which the mcts algorithm is supposed to calculate an action
-    saved_state: parameter for saving game tree -> not implemented
+    saved_state: MctsState with the game tree of the last move (reused if the board is reached from it) or None
+    runtime: max runtime for the agent, None for no time limit
+    n_workers: number of processes, the search is parallelized if > 1 (the tree is not reused between moves then,
+               the budgets apply to every tree in root parallelization)
+    parallel: "root" (independent trees, see root_parallel_mcts) or "leaf" (parallel simulations, see leaf_parallel_mcts)
+    max_nodes: max size of the game tree, None for no limit
+    policy: selection policy, a SelectionPolicy or one of "ucb1" (default), "ucb1-tuned", "puct"
+    rollouts: number of simulations per expanded node, run as one batch if > 1 (see batched_rollouts)
+    max_iterations: max number of iterations, None for no limit
+    early_stop: stop as soon as the best move can not be overtaken within the remaining budget
+    compact: search on the compact ArrayTree (see agents.agent_mct.tree, capped at DEFAULT_MAX_NODES nodes if
+             max_nodes is None), the tree is not reused between moves then; it has no MCTS-Solver and supports
+             neither rollouts > 1 nor early_stop
+    book: opening book consulted before the search (see agents.book.get_book), by default the book in the
+          environment variable CONNECT4_BOOK, False for none
     Return
     -----------
     action  # presumably best action for player
+    saved_state  # MctsState with the game tree and the MctsStats of the search, to be passed to the next call
     """
-    action = mcts_algorithm(board, player)
+    if not isinstance(saved_state, MctsState):
+        saved_state = MctsState()
+    saved_state.stats = MctsStats()
+
+    opening_book = get_book(book)
+    if opening_book is not None:
+        entry = opening_book.lookup(board, player)
+        if entry is not None:
+            saved_state.root_node, saved_state.stats.stop_reason = None, "book"
+            return entry[0], saved_state
+
+    if n_workers > 1:
+        from agents.agent_mct.parallel import root_parallel_mcts, leaf_parallel_mcts
+        if parallel not in ("root", "leaf"):
+            raise ValueError(f"unknown parallelization {parallel!r}, expected 'root' or 'leaf'")
+        if compact:
+            raise ValueError("the compact tree is not supported with n_workers > 1")
+        parallel_mcts = root_parallel_mcts if parallel == "root" else leaf_parallel_mcts
+        saved_state.root_node = None
+        action, _ = parallel_mcts(
+            board, player, runtime, n_workers, policy=policy, rollouts=rollouts, max_iterations=max_iterations,
+            max_nodes=max_nodes, early_stop=early_stop, stats=saved_state.stats
+        )
+        return action, saved_state
+
+    if compact:
+        from agents.agent_mct.tree import array_mcts_algorithm, DEFAULT_MAX_NODES
+        if rollouts != 1 or early_stop:
+            raise ValueError("rollouts > 1 and early_stop are not supported on the compact tree")
+        max_nodes = DEFAULT_MAX_NODES if max_nodes is None else max_nodes
+        saved_state.root_node = None
+        action = array_mcts_algorithm(board, player, runtime, max_nodes, policy, max_iterations, saved_state.stats)
+        return action, saved_state
+
+    root_node = saved_state.advance(board, player)
+    action = mcts_algorithm(
+        board, player, runtime, root_node, policy, rollouts, max_iterations, max_nodes, early_stop, saved_state.stats
+    )
+    saved_state.root_node, saved_state.last_move = root_node, action
 
     return action, saved_state
 
 
+PROVEN_WIN = 1
+PROVEN_DRAW = 0
+PROVEN_LOSS = -1
+
+
 class Node:
     def __init__(self, board, player, move=None, parent=None, ):
         """Node of the game tree
-        :type board: np.ndarray
+        :type board: np.ndarray or BitBoard (a BitBoard is owned by the node and not copied)
         """
         self.wins = 0  # of wins for the node
         self.sims = 0  # of simulations of the node
         self.active_player = player  # active player of the current node
         self.opp_player = PLAYER2 if player == PLAYER1 else PLAYER1
-        self.board = board.copy()  # current board state of that node
+        if isinstance(board, BitBoard):
+            self.position = board  # current board state of that node, searched as bitboard
+        else:
+            self.position = BitBoard.from_array(board)
         self.move = move  # move from preceding board state, that led to this node
         self.parent = parent
         self.child_nodes = []
-        self.possibleMoves = get_valid_columns(board)
+        self.possibleMoves = self.position.valid_columns()
+        self.index = 0  # index of the node in parent.child_nodes
+        """proven game value for opp_player (PROVEN_WIN, PROVEN_DRAW, PROVEN_LOSS), None if not solved yet"""
+        self.proven = None
+        self.proven_depth = 0  # number of moves until the proven end of the game
+        if self.position.connected_four(self.opp_player):
+            self.proven = PROVEN_WIN
+            self.possibleMoves = []  # the game is over, terminal nodes are not expanded
+        elif not self.possibleMoves:
+            self.proven = PROVEN_DRAW
+        """statistics of the child nodes (in the order of child_nodes) as contiguous arrays for the selection"""
+        self.child_wins = np.zeros(len(self.possibleMoves))
+        self.child_sims = np.zeros(len(self.possibleMoves))
+        self.child_moves = np.zeros(len(self.possibleMoves), dtype=np.intp)
+        self.child_solved = np.zeros(len(self.possibleMoves), dtype=bool)
 
-    def mcts_selection(self):
+    @property
+    def board(self) -> np.ndarray:
+        """current board state of that node as ndarray"""
+        return self.position.to_array()
+
+    def mcts_selection(self, policy: Optional[SelectionPolicy] = None):
         """
-        Calculate UCB values of the child nodes of the node passed into the function
+        Score all child nodes at once with the selection policy (UCB1 by default), solved children are skipped
         Return:
         ------------------------
-        selected_node: child with the highest UCB value """
-        ucb_values = np.zeros(len(self.child_nodes))
-
-        for i, child in enumerate(self.child_nodes):
-            ucb_values[i] = child.calc_ucb(n_tot=self.sims)
-        maximum = np.argmax(ucb_values)
+        selected_node: unsolved child with the highest score """
+        policy = get_policy(policy)
+        n = len(self.child_nodes)
+        scores = policy.scores(self.child_wins[:n], self.child_sims[:n], self.sims, self.child_moves[:n])
+        scores[self.child_solved[:n]] = -np.inf
+        maximum = np.argmax(scores)
 
         selected_node = self.child_nodes[maximum]
 
         return selected_node
 
-    def calc_ucb(self, n_tot):
-        """
-        Upper Confidence Bound 1 - calculation
-        Parameters
-        -----------
-        self.wins: # of wins for the node, considered after the i-th move
-        self.sims: # of simulations of the node, considered after the i-th move
-        n_tot: total number of simulations run by the parent node, after the i-th move
-        c: exploration parameter
-        Return:
-        ----------------
-        ucb: ucb value of the respective node
-        """
-        c = np.sqrt(2)
-        ucb = self.wins / self.sims + c * (np.sqrt(np.log(n_tot) / self.sims))
-        return ucb
-
-    def mcts_expansion(self):
+    def mcts_expansion(self, rng=random):
         """
         Expand game tree by randomly choosing one of the nodes possible moves, applying this action to the board
+        Parameters:
+        ----------------
+        rng: random number generator choosing the move (random module or random.Random instance)
         Return:
         ------------------
         new_node: new child node, saved in the game tree
         """
-        action = np.random.choice(self.possibleMoves)
-        exp_board = apply_player_action(self.board, action, self.active_player, True)
+        action = rng.choice(self.possibleMoves)
+        exp_position = self.position.copy().play(action, self.active_player)
 
-        new_node = Node(exp_board, self.opp_player, action, self)
+        new_node = Node(exp_position, self.opp_player, action, self)
+        new_node.index = len(self.child_nodes)
+        self.child_moves[new_node.index] = action
         self.possibleMoves.remove(action)
         self.child_nodes.append(new_node)
 
@@ -99,86 +174,396 @@ class Node:
         next_player: winner (PLAYER1 or PLAYER2) of the simulation
         GameState.IS_DRAW: -1 in case simulation ended with a draw
         """
-        """ check if expanded node is an end state (i.e if last move finished the game)"""
-        if check_end_state(self.board, self.opp_player) == GameState.IS_WIN:
-            return self.opp_player  # player which won the game when expanding
-
-        """ apply random actions until final GamesState(.IS_WIN or .IS_DRAW) is reached"""
-        next_player = PLAYER1 if self.active_player == PLAYER2 else PLAYER2
-        sim_board = self.board.copy()
-
-        while check_end_state(sim_board, next_player) == GameState.STILL_PLAYING:
-            next_player = PLAYER1 if next_player == PLAYER2 else PLAYER2
-            valid_columns = get_valid_columns(sim_board)
-            random_action = np.random.choice(valid_columns, size=1)
-            sim_board = apply_player_action(sim_board, random_action, next_player)
-
-        """evaluate the end state of the simulation and return the winnign player ( or -1 in case of draw)"""
-        if check_end_state(sim_board, next_player) != GameState.IS_DRAW:
-            return next_player  # winning player of the simulation either 1 or 2
-        else:
-            return GameState.IS_DRAW  # -1
+        return random_rollout(self.position, self.opp_player)
 
     def pick_best_action(self):
         """
-        Evaluate wins and simulations counter of the root node
+        Evaluate wins and simulations counter of the root node, a proven win is picked at once and proven losses
+        are only picked if all children are proven losses (the one delaying the loss the longest)
         Return:
         ------------------------
         best_child: child with the highest value (child.wins / child.sims)"""
+        if all(child.proven == PROVEN_LOSS for child in self.child_nodes):
+            return max(self.child_nodes, key=lambda child: child.proven_depth)
+
         child_values = np.zeros(len(self.child_nodes))
         for i, child in enumerate(self.child_nodes):
-            child_values[i] = child.wins / child.sims
+            if child.proven == PROVEN_WIN:
+                return child
+            child_values[i] = -1 if child.proven == PROVEN_LOSS else child.wins / child.sims
 
         maximum = np.argmax(child_values)
         best_child = self.child_nodes[maximum]
 
         return best_child
 
+    def pick_robust_action(self):
+        """
+        Return:
+        ------------------------
+        robust_child: child with the most simulations (the first one in case of a tie)"""
+        return self.child_nodes[int(np.argmax(self.child_sims[:len(self.child_nodes)]))]
+
+
+class MctsState(SavedState):
+    def __init__(self):
+        """
+        State of the mcts agent carried between moves in saved_state
+        root_node: root of the game tree of the last move
+        last_move: move chosen in the last move
+        stats: MctsStats of the last search
+        """
+        self.root_node = None
+        self.last_move = None
+        self.stats = None
+
+    def advance(self, board: np.ndarray, player: BoardPiece) -> Node:
+        """
+        Find the node for board in the stored tree: descend through the child of last_move and the child of the
+        opponents reply (the column in which board has one more piece than the child), this node becomes the
+        new root and the rest of the old tree is dropped. A new root node is returned if board is not in the tree.
+        """
+        position = BitBoard.from_array(board)
+        root_node, self.root_node = self.root_node, None  # the old tree is released in any case
+
+        if root_node is not None and root_node.active_player == player:
+            child = next((node for node in root_node.child_nodes if node.move == self.last_move), None)
+            if child is not None and position.n_moves == child.position.n_moves + 1:
+                replies = [col for col in range(COLS) if position.heights[col] != child.position.heights[col]]
+                grandchild = next((node for node in child.child_nodes if node.move in replies), None)
+                if grandchild is not None and grandchild.position == position:
+                    grandchild.parent = None
+                    return grandchild
 
-def mcts_algorithm(board: np.ndarray, player: BoardPiece, runtime=10):
+        return Node(position, player)
+
+
+def random_rollout(position: BitBoard, last_player: BoardPiece, rng=random):
     """
-    Monte Carlo Tree Search algorithm with 4 steps: Selection, Expansion, Simulation, Backpropagation
-    Parameters
+    play random moves for PLAYER1 and PLAYER2 alternating on a copy of position, until final
+    GamesState(.IS_WIN or .IS_DRAW) is reached
+    Parameters:
     ----------------
-    board: board reflecting current game state
-    player:  player for which mcts algorithm is supposed to calculate an action
-    runtime: max runtime for the agent
+    position: board reflecting current game state
+    last_player: player who made the last move in position
+    rng: random number generator (random module or random.Random instance)
+    Return:
+    ----------------
+    winner (PLAYER1 or PLAYER2) of the simulation, GameState.IS_DRAW (-1) in case simulation ended with a draw
+    """
+    if kernels.ENABLED:
+        winner = kernels.rollout_kernel(
+            position.pieces[PLAYER1], position.pieces[PLAYER2], np.array(position.heights), int(last_player),
+            rng.getrandbits(32)
+        )
+        return GameState.IS_DRAW if winner == kernels.DRAW else BoardPiece(winner)
+
+    """ check if position is an end state (i.e if last move finished the game)"""
+    if position.connected_four(last_player):
+        return last_player
+
+    """ apply random actions until final GamesState(.IS_WIN or .IS_DRAW) is reached"""
+    next_player = last_player
+    sim_position = position.copy()
+
+    while not sim_position.is_full():
+        next_player = PLAYER1 if next_player == PLAYER2 else PLAYER2
+        random_action = rng.choice(sim_position.valid_columns())
+        sim_position.play(random_action, next_player)
+        if sim_position.connected_four(next_player):
+            return next_player  # winning player of the simulation either 1 or 2
+
+    return GameState.IS_DRAW  # -1
+
+
+def rollout_results(winner) -> list:
+    """
+    results of a single simulation as number of simulations won by [draw, PLAYER1, PLAYER2]
+    """
+    results = [0, 0, 0]
+    results[0 if winner == GameState.IS_DRAW else winner] += 1
+    return results
+
+
+def mcts_select(root_node: Node, policy: Optional[SelectionPolicy] = None) -> Node:
+    """
+    MCTS selection (according to the selection policy, UCB1 by default) from root_node
+    Return:
+    ----------------
+    first node on the path with unexpanded moves, or a terminal node
+    """
+    node = root_node
+    while node.child_nodes != [] and node.possibleMoves == []:
+        node = node.mcts_selection(policy)
+    return node
+
+
+def mcts_expand(node: Node, rng=random) -> Optional[Node]:
+    """
+    MCTS expansion of the selected node (the move is chosen with rng), a proven new node is propagated
+    (see mcts_solve)
+    Return:
+    ----------------
+    new child node, None if the node can not be expanded (solved root)
+    """
+    if node.possibleMoves:
+        new_node = node.mcts_expansion(rng)
+        if new_node.proven is not None:
+            mcts_solve(new_node)
+        return new_node
+    return None
+
+
+def mcts_solve(node: Node):
+    """
+    MCTS-Solver: propagate the proven value of node to its ancestors
+    a node is a proven loss (for the player who moved into it) if one child is a proven win, and it takes the
+    negated best value of its children if all moves are expanded and all children are proven
+    """
+    while node.parent is not None and node.proven is not None:
+        parent = node.parent
+        parent.child_solved[node.index] = True
+        if node.proven == PROVEN_WIN:
+            parent.proven, parent.proven_depth = PROVEN_LOSS, node.proven_depth + 1
+        elif parent.possibleMoves == [] and all(child.proven is not None for child in parent.child_nodes):
+            best_value = max(child.proven for child in parent.child_nodes)
+            parent.proven = -best_value
+            parent.proven_depth = 1 + max(
+                child.proven_depth for child in parent.child_nodes if child.proven == best_value
+            )
+        else:
+            break
+        node = parent
+
+
+def mcts_backpropagation(node: Node, results):
+    """
+    MCTS backpropagation from node up to the root
+    Parameters:
+    ----------------
+    node: node the simulations were started from
+    results: number of simulations won by [draw, PLAYER1, PLAYER2] (see rollout_results), every node counts
+             the simulations won by the player who moved into it (node.opp_player)
+    """
+    sims = sum(results)
+    while node is not None:
+        node.sims += sims
+        node.wins += results[node.opp_player]
+        if node.parent is not None:
+            node.parent.child_sims[node.index] = node.sims
+            node.parent.child_wins[node.index] = node.wins
+        node = node.parent
+
+
+PHASES = ("selection", "expansion", "simulation", "backpropagation")
+
+
+class MctsStats:
+    def __init__(self):
+        """
+        Statistics of a search, filled by mcts_run
+        iterations: # of iterations (selection, expansion, simulation, backpropagation)
+        simulations: # of simulations (rollouts)
+        nodes: size of the tree at the end of the search
+        max_depth: depth of the deepest node expanded in the search (plies from the root)
+        phase_times: seconds spent in each of the PHASES
+        elapsed: runtime in seconds
+        stop_reason: budget which ended the search, one of STOP_REASONS
+        """
+        self.iterations = 0
+        self.simulations = 0
+        self.nodes = 0
+        self.max_depth = 0
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.elapsed = 0.0
+        self.stop_reason = None
+
+    @property
+    def simulations_per_second(self) -> float:
+        return self.simulations / self.elapsed if self.elapsed > 0 else 0.0
+
+    def merge(self, other: "MctsStats"):
+        """add the counters of the search of another process (elapsed and stop_reason are not merged)"""
+        for name in ("iterations", "simulations", "nodes"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for phase, seconds in other.phase_times.items():
+            self.phase_times[phase] += seconds
+
+    def as_dict(self) -> dict:
+        """statistics as plain dict (e.g. for JSON), with the simulations per second"""
+        return dict(vars(self), phase_times=dict(self.phase_times), simulations_per_second=self.simulations_per_second)
+
+    def __str__(self) -> str:
+        phases = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in self.phase_times.items())
+        return (f"{self.iterations} iterations, {self.simulations} simulations ({self.simulations_per_second:.0f}/s), "
+                f"{self.nodes} nodes, depth {self.max_depth}, {self.elapsed:.3f}s ({phases}), "
+                f"stopped by {self.stop_reason}")
+
+
+STOP_REASONS = ("runtime", "iterations", "nodes", "early_stop", "solved", "book")
+EARLY_STOP_INTERVAL = 64  # iterations between two checks of the early stop
+
+
+def count_nodes(root_node: Node) -> int:
+    """number of nodes of the tree of root_node"""
+    n_nodes = 0
+    nodes = [root_node]
+    while nodes:
+        node = nodes.pop()
+        n_nodes += 1
+        nodes.extend(node.child_nodes)
+    return n_nodes
+
+
+def best_child_decided(root_node: Node, remaining_sims) -> bool:
+    """
+    True if the most simulated child of the root (pick_robust_action) leads the other children by more than
+    remaining_sims simulations, so it stays the most simulated one until the end of the search, and it is also
+    the best child by value (pick_best_action) at this point; a search stopped early picks the robust child
+    """
+    if root_node.possibleMoves:
+        return False  # unexpanded moves are selected first
+    if len(root_node.child_nodes) < 2:
+        return True
+    robust_child = root_node.pick_robust_action()
+    runner_up = max(child.sims for child in root_node.child_nodes if child is not robust_child)
+    return robust_child.sims - runner_up > remaining_sims and root_node.pick_best_action() is robust_child
+
+
+def budget_stop_reason(
+        root_node: Node, elapsed: float, iterations: int, n_nodes: int, runtime=None,
+        max_iterations: Optional[int] = None, max_nodes: Optional[int] = None, early_stop: bool = False,
+        rollouts: int = 1
+) -> Optional[str]:
+    """
+    Check the budgets of a search (see mcts_run) after iterations iterations and elapsed seconds
     Return
     ----------------
-    best_child.move: move (action) corresponding to the presumably best action for the current game state
+    the budget which ends the search (one of STOP_REASONS), None to continue
     """
+    if runtime is not None and elapsed >= runtime:
+        return "runtime"
+    if max_iterations is not None and iterations >= max_iterations:
+        return "iterations"
+    if max_nodes is not None and n_nodes >= max_nodes:
+        return "nodes"
+    if root_node.proven is not None:
+        return "solved"
+    if early_stop and iterations > 0:
+        remaining = [np.inf]
+        if runtime is not None:
+            remaining.append(iterations / elapsed * (runtime - elapsed) if elapsed > 0 else np.inf)
+        if max_iterations is not None:
+            remaining.append(max_iterations - iterations)
+        if max_nodes is not None:
+            remaining.append(max_nodes - n_nodes)
+        if best_child_decided(root_node, min(remaining) * rollouts):
+            return "early_stop"
+    return None
+
 
-    root_node = Node(board, player, move=None, parent=None)  # initialize root node with current board state
+def mcts_run(
+        root_node: Node, runtime=None, policy=None, rollouts: int = 1, max_iterations: Optional[int] = None,
+        max_nodes: Optional[int] = None, early_stop: bool = False, stats: Optional[MctsStats] = None
+) -> int:
+    """
+    run the 4 MCTS steps (Selection, Expansion, Simulation, Backpropagation) on the tree of root_node
+    until one of the budgets is used up or the root is solved (see mcts_solve)
+    Parameters
+    ----------------
+    runtime: max runtime in seconds, None for no time limit
+    policy: selection policy (see get_policy)
+    rollouts: number of simulations per expanded node, played in lockstep by batched_rollouts if > 1
+    max_iterations: max number of iterations, None for no limit (a fixed number makes the search reproducible)
+    max_nodes: max size of the tree, None for no limit
+    early_stop: stop as soon as the best root child can not be overtaken within the remaining budget
+    stats: MctsStats filled with the statistics of the search
+    Return
+    ----------------
+    counter: number of iterations
+    """
+    if runtime is None and max_iterations is None and max_nodes is None:
+        raise ValueError("mcts_run needs a runtime, max_iterations or max_nodes budget")
+    policy = get_policy(policy)
+    rng = np.random.default_rng(random.getrandbits(32)) if rollouts > 1 else None
+    n_nodes = count_nodes(root_node) if max_nodes is not None or stats is not None else 0
     counter = 0
+    simulations = 0
+    max_depth = 0
+    root_moves = root_node.position.n_moves
+    phase_times = [0.0] * len(PHASES)  # seconds per phase, timed with perf_counter
     start_time = time.time()
-    while (time.time() - start_time) < runtime:
+    while True:
+        stop_reason = budget_stop_reason(
+            root_node, time.time() - start_time, counter, n_nodes, runtime, max_iterations, max_nodes,
+            early_stop and counter % EARLY_STOP_INTERVAL == 0, rollouts
+        )
+        if stop_reason is not None:
+            break
         counter += 1
-        node = root_node
 
-        """MCTS SELECTION (according to UCB values)"""
-        while node.child_nodes != [] and node.possibleMoves == []:
-            node = node.mcts_selection()
+        """MCTS SELECTION and EXPANSION, back propagation only after successfully expanding"""
+        t0 = time.perf_counter()
+        node = mcts_select(root_node, policy)
+        t1 = time.perf_counter()
+        node = mcts_expand(node)
+        t2 = time.perf_counter()
+        phase_times[0] += t1 - t0
+        phase_times[1] += t2 - t1
+        if node is not None:
+            n_nodes += 1
+            max_depth = max(max_depth, node.position.n_moves - root_moves)
+            if rollouts > 1:
+                results = rollout_counts(batched_rollouts(node.position, node.opp_player, rollouts, rng))
+            else:
+                winner = node.mcts_simulate()  # winning player (1 or 2) of simulation (or -1 in case of GameStage.IS_DRAW)
+                results = rollout_results(winner)
+            simulations += sum(results)
+            t3 = time.perf_counter()
 
-        EXPANDED = False
-        """MCTS EXPANSION """
-        if node.possibleMoves:
-            node = node.mcts_expansion()
+            """MCTS BACKPROPAGATION"""
+            mcts_backpropagation(node, results)
+            phase_times[2] += t3 - t2
+            phase_times[3] += time.perf_counter() - t3
 
-            EXPANDED = True  # enables back propagation, only after successfully expanding
+    if stats is not None:
+        stats.iterations, stats.simulations, stats.nodes = counter, simulations, n_nodes
+        stats.max_depth, stats.phase_times = max_depth, dict(zip(PHASES, phase_times))
+        stats.elapsed, stats.stop_reason = time.time() - start_time, stop_reason
+    return counter
 
-            winner = node.mcts_simulate()  # winning player (1 or 2) of simulation (or -1 in case of GameStage.IS_DRAW)
 
-        """MCTS BACKPROPAGATION"""
-        if EXPANDED:
-            while node is not None:
-                node.sims += 1
-                if node.opp_player == winner:
-                    node.wins += 1
-                node = node.parent
+def mcts_algorithm(
+        board: np.ndarray, player: BoardPiece, runtime=10, root_node: Optional[Node] = None, policy=None,
+        rollouts: int = 1, max_iterations: Optional[int] = None, max_nodes: Optional[int] = None,
+        early_stop: bool = False, stats: Optional[MctsStats] = None
+):
+    """
+    Monte Carlo Tree Search algorithm with 4 steps: Selection, Expansion, Simulation, Backpropagation
+    Parameters
+    ----------------
+    board: board reflecting current game state
+    player:  player for which mcts algorithm is supposed to calculate an action
+    runtime: max runtime for the agent, None for no time limit
+    root_node: node of board from an earlier search, its statistics are reused (new tree if None)
+    policy: selection policy, a SelectionPolicy or one of "ucb1" (default), "ucb1-tuned", "puct"
+    rollouts: number of simulations per expanded node (batched if > 1)
+    max_iterations, max_nodes, early_stop: further budgets of the search (see mcts_run)
+    stats: MctsStats filled with the statistics of the search (iterations, simulations, ...)
+    Return
+    ----------------
+    best_child.move: move (action) corresponding to the presumably best action for the current game state
+    """
 
-    # ToDo: introduce exit condition for final game phase (i.e. if there are no more nodes to explore.) #
+    if root_node is None:
+        root_node = Node(board, player, move=None, parent=None)  # initialize root node with current board state
+    stats = MctsStats() if stats is None else stats
+    mcts_run(root_node, runtime, policy, rollouts, max_iterations, max_nodes, early_stop, stats)
 
-    """evaluate game tree and return action, corresponding to the most promising child_node"""
+    """evaluate game tree and return action, corresponding to the most promising child_node
+    (the child which can not be overtaken anymore if the search stopped early, see best_child_decided)"""
+    if stats.stop_reason == "early_stop":
+        return root_node.pick_robust_action().move
     best_child = root_node.pick_best_action()
-    print(counter)
     return best_child.move
@@ -0,0 +1,243 @@
+import numpy as np
+import random
+import time
+from typing import Optional, Tuple
+from agents.common import BoardPiece, PlayerAction
+from agents.bitboard import BitBoard
+from agents.pool import get_pool, default_n_workers
+from agents.agent_mct.montecarlo import Node, MctsStats, PHASES, PROVEN_WIN, PROVEN_LOSS, mcts_run, mcts_select, \
+    mcts_expand, mcts_backpropagation, budget_stop_reason, random_rollout, rollout_results
+from agents.agent_mct.selection import get_policy
+
+"""
+Parallel Monte Carlo Tree Search on the persistent process pool (see agents.pool)
+root parallelization: every worker grows its own tree with the budgets of the search, the statistics of the root
+                      children are merged at the end
+leaf parallelization: one tree in the calling process, the leaves are expanded in rounds of n_workers *
+                      leaves_per_task and their simulations are run on the workers, one task per leaves_per_task
+                      leaves; a leaf waiting for its simulations counts as a simulated draw (virtual loss), so that
+                      the selections of one round spread over the tree
+Both return the chosen move and the number of simulations (playouts) per second and fill the MctsStats of the
+search.
+"""
+
+DEFAULT_LEAVES_PER_TASK = 16  # leaves simulated per task of the leaf parallelization
+VIRTUAL_VISIT = [1, 0, 0]  # results backpropagated for a leaf waiting for its simulations (see rollout_results)
+
+
+def _grow_tree(board: np.ndarray, player: BoardPiece, runtime, seed: int, policy=None, rollouts: int = 1,
+               max_iterations: Optional[int] = None, max_nodes: Optional[int] = None, early_stop: bool = False):
+    """
+    Worker task of root_parallel_mcts: grow a tree with the budgets of mcts_run
+    Return
+    ----------------
+    Tuple [list of (move, wins, sims, proven, proven_depth) of the root children, MctsStats of the tree]
+    """
+    random.seed(seed)
+    root_node = Node(board, player)
+    stats = MctsStats()
+    mcts_run(root_node, runtime, policy, rollouts, max_iterations, max_nodes, early_stop, stats)
+    children = [
+        (child.move, child.wins, child.sims, child.proven, child.proven_depth) for child in root_node.child_nodes
+    ]
+    return children, stats
+
+
+def merged_best_move(wins: dict, sims: dict, proven: dict, proven_depth: dict) -> PlayerAction:
+    """
+    best move of the merged root children by the rules of Node.pick_best_action: a proven win is picked at once
+    (the fastest one), proven losses only if all children are proven losses (the one delaying the loss the
+    longest), else the highest wins / sims
+    """
+    winning = [move for move in sims if proven[move] == PROVEN_WIN]
+    if winning:
+        return PlayerAction(min(winning, key=lambda move: proven_depth[move]))
+    if all(proven[move] == PROVEN_LOSS for move in sims):
+        return PlayerAction(max(sims, key=lambda move: proven_depth[move]))
+    return PlayerAction(max(sims, key=lambda move: -1 if proven[move] == PROVEN_LOSS else wins[move] / sims[move]))
+
+
+def _simulate_batch(position: BitBoard, last_player: BoardPiece, n_rollouts: int, seed: int):
+    """
+    n_rollouts random simulations from position
+    Return
+    ----------------
+    number of simulations won by [draw, PLAYER1, PLAYER2]
+    """
+    rng = random.Random(seed)
+    results = [0, 0, 0]
+    for _ in range(n_rollouts):
+        winner_results = rollout_results(random_rollout(position, last_player, rng))
+        results = [n + m for n, m in zip(results, winner_results)]
+    return results
+
+
+def _simulate_leaves(leaves: list, n_rollouts: int, seed: int) -> list:
+    """
+    Worker task of leaf_parallel_mcts: n_rollouts random simulations from every leaf
+    Parameters
+    ----------------
+    leaves: list of (position, last_player)
+    Return
+    ----------------
+    results of every leaf (see _simulate_batch)
+    """
+    rng = random.Random(seed)
+    return [
+        _simulate_batch(position, last_player, n_rollouts, rng.getrandbits(32)) for position, last_player in leaves
+    ]
+
+
+def _check_budgets(runtime, max_iterations: Optional[int], max_nodes: Optional[int]):
+    if runtime is None and max_iterations is None and max_nodes is None:
+        raise ValueError("parallel mcts needs a runtime, max_iterations or max_nodes budget")
+
+
+def root_parallel_mcts(
+        board: np.ndarray, player: BoardPiece, runtime=10, n_workers: Optional[int] = None, seed: Optional[int] = None,
+        policy=None, rollouts: int = 1, max_iterations: Optional[int] = None, max_nodes: Optional[int] = None,
+        early_stop: bool = False, stats: Optional[MctsStats] = None
+) -> Tuple[PlayerAction, float]:
+    """
+    Root parallelization: n_workers independent trees, the wins and simulations of the root children are summed,
+    a child proven (see mcts_solve) in any of the trees keeps its proven value
+    Parameters
+    ----------------
+    board: board reflecting current game state
+    player: player for which mcts algorithm is supposed to calculate an action
+    runtime: max runtime for the agent, None for no time limit
+    n_workers: number of worker processes (trees), all cores by default
+    seed: seed for the random number generators of the workers
+    policy, rollouts, max_iterations, max_nodes, early_stop: selection policy and budgets of every tree
+                                                             (see mcts_run)
+    stats: MctsStats filled with the merged statistics of the trees
+    Return
+    ----------------
+    Tuple [best move of the merged root children (see merged_best_move), simulations per second]
+    """
+    _check_budgets(runtime, max_iterations, max_nodes)
+    n_workers = default_n_workers() if n_workers is None else n_workers
+    pool = get_pool(n_workers)
+    rng = random.Random(seed)
+
+    start_time = time.time()
+    futures = [
+        pool.submit(_grow_tree, board, player, runtime, rng.getrandbits(32), policy, rollouts, max_iterations,
+                    max_nodes, early_stop)
+        for _ in range(n_workers)
+    ]
+
+    wins, sims, proven, proven_depth = {}, {}, {}, {}
+    stats = MctsStats() if stats is None else stats
+    stop_reasons = []
+    for future in futures:
+        children, tree_stats = future.result()
+        stats.merge(tree_stats)
+        stop_reasons.append(tree_stats.stop_reason)
+        for move, child_wins, child_sims, child_proven, child_depth in children:
+            wins[move] = wins.get(move, 0) + child_wins
+            sims[move] = sims.get(move, 0) + child_sims
+            if proven.get(move) is None:
+                proven[move], proven_depth[move] = child_proven, child_depth
+            elif child_proven is not None:
+                """proofs of different trees agree on the value, the shortest win and the longest loss are kept"""
+                shorter = min if child_proven == PROVEN_WIN else max
+                proven_depth[move] = shorter(proven_depth[move], child_depth)
+    stats.elapsed = time.time() - start_time
+    stats.stop_reason = max(stop_reasons, key=stop_reasons.count)
+
+    return merged_best_move(wins, sims, proven, proven_depth), stats.simulations_per_second
+
+
+def leaf_parallel_mcts(
+        board: np.ndarray, player: BoardPiece, runtime=10, n_workers: Optional[int] = None,
+        leaves_per_task: int = DEFAULT_LEAVES_PER_TASK, seed: Optional[int] = None, policy=None, rollouts: int = 1,
+        max_iterations: Optional[int] = None, max_nodes: Optional[int] = None, early_stop: bool = False,
+        stats: Optional[MctsStats] = None
+) -> Tuple[PlayerAction, float]:
+    """
+    Leaf parallelization: selection, expansion and backpropagation in this process, the simulations of the leaves
+    expanded in a round (n_workers * leaves_per_task) are run on the workers
+    Parameters
+    ----------------
+    board: board reflecting current game state
+    player: player for which mcts algorithm is supposed to calculate an action
+    runtime: max runtime for the agent, None for no time limit
+    n_workers: number of worker processes, all cores by default
+    leaves_per_task: leaves sent to a worker at once
+    seed: seed for the random number generators of the tree and the workers
+    policy, rollouts, max_iterations, max_nodes, early_stop: selection policy, simulations per leaf and budgets
+                                                             (see mcts_run, an iteration expands one leaf)
+    stats: MctsStats filled with the statistics of the search
+    Return
+    ----------------
+    Tuple [move of the most promising root child, simulations per second]
+    """
+    _check_budgets(runtime, max_iterations, max_nodes)
+    n_workers = default_n_workers() if n_workers is None else n_workers
+    pool = get_pool(n_workers)
+    policy = get_policy(policy)
+    rng = random.Random(seed)  # expansion order of the tree and seeds of the workers
+
+    root_node = Node(board, player)
+    root_moves = root_node.position.n_moves
+    iterations, n_nodes, simulations, max_depth = 0, 1, 0, 0
+    phase_times = [0.0] * len(PHASES)
+    start_time = time.time()
+    while True:
+        stop_reason = budget_stop_reason(
+            root_node, time.time() - start_time, iterations, n_nodes, runtime, max_iterations, max_nodes,
+            early_stop, rollouts
+        )
+        if stop_reason is not None:
+            break
+
+        """SELECTION and EXPANSION of the leaves of the round, every leaf gets a virtual visit"""
+        round_size = n_workers * leaves_per_task
+        if max_iterations is not None:
+            round_size = min(round_size, max_iterations - iterations)
+        if max_nodes is not None:
+            round_size = min(round_size, max_nodes - n_nodes)
+        leaves = []
+        while len(leaves) < round_size:
+            t0 = time.perf_counter()
+            node = mcts_select(root_node, policy)
+            t1 = time.perf_counter()
+            node = mcts_expand(node, rng)
+            phase_times[0] += t1 - t0
+            phase_times[1] += time.perf_counter() - t1
+            if node is None:
+                iterations += 1  # nothing to expand, counted like in mcts_run
+                break
+            mcts_backpropagation(node, VIRTUAL_VISIT)
+            leaves.append(node)
+            max_depth = max(max_depth, node.position.n_moves - root_moves)
+        iterations += len(leaves)
+        n_nodes += len(leaves)
+        if not leaves:
+            continue
+
+        """SIMULATION on the workers"""
+        t2 = time.perf_counter()
+        tasks = [
+            [(node.position, node.opp_player) for node in leaves[i:i + leaves_per_task]]
+            for i in range(0, len(leaves), leaves_per_task)
+        ]
+        futures = [pool.submit(_simulate_leaves, task, rollouts, rng.getrandbits(32)) for task in tasks]
+        leaf_results = [results for future in futures for results in future.result()]
+        t3 = time.perf_counter()
+
+        """BACKPROPAGATION of the results, the virtual visits are taken back"""
+        for node, results in zip(leaves, leaf_results):
+            simulations += sum(results)
+            mcts_backpropagation(node, [results[0] - VIRTUAL_VISIT[0], results[1], results[2]])
+        phase_times[2] += t3 - t2
+        phase_times[3] += time.perf_counter() - t3
+
+    stats = MctsStats() if stats is None else stats
+    stats.iterations, stats.simulations, stats.nodes = iterations, simulations, n_nodes
+    stats.max_depth, stats.phase_times = max_depth, dict(zip(PHASES, phase_times))
+    stats.elapsed, stats.stop_reason = time.time() - start_time, stop_reason
+
+    best_child = root_node.pick_robust_action() if stop_reason == "early_stop" else root_node.pick_best_action()
+    return PlayerAction(best_child.move), stats.simulations_per_second
@@ -0,0 +1,93 @@
+import numpy as np
+from typing import Optional
+from agents.common import BoardPiece, GameState, PLAYER1, PLAYER2
+from agents.bitboard import BitBoard, ROWS, COLS, COL_BITS, DIRECTIONS
+
+"""
+Batched random rollouts: n_games random games are played from the same position in lockstep on a vector of
+bitboards (one uint64 bitmask per player and game, plus the column heights of every game). As all games start
+from the same position, the player to move is the same in all games at every ply; the legal moves are sampled
+and the wins detected for all games at once.
+"""
+
+DRAW = GameState.IS_DRAW.value  # winner code of a drawn game (-1)
+TOP_BITS = np.arange(COLS) * COL_BITS + ROWS  # bit index of the sentinel bit (full column) of every column
+SHIFTS = tuple((np.uint64(shift), np.uint64(2 * shift)) for shift in DIRECTIONS)
+
+
+def connected_four_vector(bits: np.ndarray) -> np.ndarray:
+    """
+    shift-and-mask check for four pieces in a row for a vector of bitmasks (see connected_four_bits)
+    Parameters
+    -----------
+    bits: np.ndarray of np.uint64
+        bitmasks of the pieces of one player, one per game
+
+    Return
+    -----------
+    bool array, True for the games with four in a row in any direction
+    """
+    won = np.zeros(bits.shape, dtype=bool)
+    for shift, double_shift in SHIFTS:
+        pairs = bits & (bits >> shift)
+        won |= (pairs & (pairs >> double_shift)) != 0
+    return won
+
+
+def batched_rollouts(
+        position: BitBoard, last_player: BoardPiece, n_games: int, rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """
+    play n_games random games from position in lockstep, PLAYER1 and PLAYER2 alternating
+    Parameters:
+    ----------------
+    position: board reflecting current game state (not changed)
+    last_player: player who made the last move in position
+    n_games: number of games
+    rng: NumPy random number generator, a new one if None
+    Return:
+    ----------------
+    winner of every game: PLAYER1, PLAYER2 or DRAW (GameState.IS_DRAW.value, -1)
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    if position.connected_four(last_player):
+        return np.full(n_games, last_player, dtype=np.int8)
+
+    winners = np.full(n_games, DRAW, dtype=np.int8)
+    pieces = {player: np.full(n_games, position.pieces[player], dtype=np.uint64) for player in (PLAYER1, PLAYER2)}
+    heights = np.tile(np.array(position.heights, dtype=np.int64), (n_games, 1))
+    games = np.arange(n_games)  # indices of the running games
+    player = last_player
+
+    for _ in range(ROWS * COLS - position.n_moves):
+        player = PLAYER1 if player == PLAYER2 else PLAYER2
+
+        """random legal column for every running game: highest random key among the columns which are not full"""
+        legal = heights < TOP_BITS
+        columns = np.argmax(np.where(legal, rng.random(legal.shape), -1.0), axis=1)
+        rows = np.arange(len(games))
+        bits = heights[rows, columns]
+        heights[rows, columns] += 1
+        pieces[player] |= np.left_shift(np.uint64(1), bits.astype(np.uint64))
+
+        """finished games are removed from the vectors"""
+        won = connected_four_vector(pieces[player])
+        if won.any():
+            winners[games[won]] = player
+            running = ~won
+            games = games[running]
+            heights = heights[running]
+            pieces = {p: bitmasks[running] for p, bitmasks in pieces.items()}
+            if len(games) == 0:
+                break
+
+    return winners
+
+
+def rollout_counts(winners: np.ndarray) -> list:
+    """
+    results of a batch of simulations as number of simulations won by [draw, PLAYER1, PLAYER2]
+    (see rollout_results)
+    """
+    return [int(np.count_nonzero(winners == DRAW)), int(np.count_nonzero(winners == PLAYER1)),
+            int(np.count_nonzero(winners == PLAYER2))]
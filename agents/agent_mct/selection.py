@@ -0,0 +1,94 @@
+import numpy as np
+from typing import Optional
+from agents.bitboard import COLS
+
+"""
+Selection policies of the Monte Carlo Tree Search. A policy scores all children of a node at once from their
+contiguous statistics (NumPy arrays of wins, simulations and moves), the child with the highest score is selected.
+Constants are computed when the policy is created and the log of the parent simulations once per selection.
+All children passed to a policy have been simulated at least once.
+"""
+
+
+class SelectionPolicy:
+    def scores(self, wins: np.ndarray, sims: np.ndarray, parent_sims: int, moves: np.ndarray) -> np.ndarray:
+        """
+        Return the selection score of every child
+        Parameters
+        -----------
+        wins: # of wins of the children (for the player who moved into the child)
+        sims: # of simulations of the children
+        parent_sims: # of simulations of the parent node
+        moves: moves (columns) leading to the children
+        """
+        raise NotImplementedError
+
+    def select(self, wins: np.ndarray, sims: np.ndarray, parent_sims: int, moves: np.ndarray) -> int:
+        """
+        Return the index of the child with the highest score (the first one in case of a tie)
+        """
+        return int(np.argmax(self.scores(wins, sims, parent_sims, moves)))
+
+
+class UCB1(SelectionPolicy):
+    def __init__(self, c: float = np.sqrt(2)):
+        """
+        Upper Confidence Bound 1: wins / sims + c * sqrt(ln(parent_sims) / sims)
+        c: exploration parameter
+        """
+        self.c = c
+
+    def scores(self, wins, sims, parent_sims, moves):
+        return wins / sims + self.c * np.sqrt(np.log(parent_sims) / sims)
+
+
+class UCB1Tuned(SelectionPolicy):
+    def __init__(self, c: float = 1.0):
+        """
+        UCB1-Tuned: the exploration term is scaled by an upper bound of the variance of the results,
+        wins / sims + c * sqrt(ln(parent_sims) / sims * min(1/4, var + sqrt(2 * ln(parent_sims) / sims)))
+        with var = mean - mean**2, the variance of 0/1 rewards
+        c: exploration parameter
+        """
+        self.c = c
+
+    def scores(self, wins, sims, parent_sims, moves):
+        mean = wins / sims
+        log_ratio = np.log(parent_sims) / sims
+        variance_bound = np.minimum(0.25, mean - mean * mean + np.sqrt(2 * log_ratio))
+        return mean + self.c * np.sqrt(log_ratio * variance_bound)
+
+
+class PUCT(SelectionPolicy):
+    def __init__(self, c: float = 1.5, prior: Optional[np.ndarray] = None):
+        """
+        Predictor + UCT (as in AlphaZero): wins / sims + c * P(move) * sqrt(parent_sims) / (1 + sims)
+        c: exploration parameter
+        prior: prior probability of every column (shape (COLS,)), normalized over the children, uniform by default
+        """
+        self.c = c
+        self.prior = np.ones(COLS) if prior is None else np.asarray(prior, dtype=float)
+
+    def scores(self, wins, sims, parent_sims, moves):
+        prior = self.prior[moves]
+        prior = prior / prior.sum()
+        return wins / sims + self.c * prior * np.sqrt(parent_sims) / (1 + sims)
+
+
+DEFAULT_POLICY = UCB1()
+
+POLICIES = {"ucb1": UCB1, "ucb1-tuned": UCB1Tuned, "puct": PUCT}
+
+
+def get_policy(policy) -> SelectionPolicy:
+    """
+    Return the policy, a name of POLICIES (created with the default parameters) or a SelectionPolicy instance,
+    DEFAULT_POLICY for None
+    """
+    if policy is None:
+        return DEFAULT_POLICY
+    if isinstance(policy, SelectionPolicy):
+        return policy
+    if policy not in POLICIES:
+        raise ValueError(f"unknown selection policy {policy!r}, expected one of {sorted(POLICIES)}")
+    return POLICIES[policy]()
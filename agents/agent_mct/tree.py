@@ -0,0 +1,240 @@
+import numpy as np
+import random
+import time
+from typing import Optional
+from agents.common import BoardPiece, PlayerAction, PLAYER1, PLAYER2
+from agents.bitboard import BitBoard, COLS
+from agents.agent_mct.montecarlo import random_rollout, MctsStats, PHASES
+from agents.agent_mct.selection import get_policy
+
+"""
+Compact game tree for the Monte Carlo Tree Search: instead of one Python object per node, the statistics of all
+nodes are stored in preallocated NumPy arrays (structure of arrays), a node is an index into these arrays.
+The children of a node are stored contiguously (allocated as one block when the node is expanded for the first
+time), and boards are not stored at all: the position of a node is rebuilt by replaying the moves from the root
+during the selection.
+"""
+
+ROOT = 0
+NO_NODE = -1
+DEFAULT_CAPACITY = 1 << 12  # initial number of node slots
+DEFAULT_MAX_NODES = 1 << 22  # hard cap of the number of nodes (about 100 MB)
+MIN_MAX_NODES = 1 + COLS  # smallest cap, the root and all its children
+
+
+class ArrayTree:
+    def __init__(self, board, player: BoardPiece, capacity: int = DEFAULT_CAPACITY,
+                 max_nodes: int = DEFAULT_MAX_NODES, policy=None):
+        """
+        Game tree in structure-of-arrays layout, node ROOT is the current board state with player to move
+        wins[n]: # of wins of the player who moved into node n
+        sims[n]: # of simulations of node n
+        parent[n]: index of the parent node (NO_NODE for the root)
+        first_child[n], n_children[n]: block of the children of node n (NO_NODE / 0 before the first expansion)
+        move[n]: move from preceding board state, that led to node n
+        player[n]: player who made move[n] (opp_player of the Node class)
+        untried[n]: bitmask of the columns which were not expanded yet (0 for terminal nodes)
+        Growth policy: the arrays are doubled when full, up to max_nodes (at least MIN_MAX_NODES, so that the
+        children of the root always fit); after that the tree stops growing (full is set), the selected node is
+        returned unexpanded and run ends the search with the stop reason "nodes"
+        policy: selection policy, a SelectionPolicy or one of "ucb1" (default), "ucb1-tuned", "puct"
+        :type board: np.ndarray or BitBoard
+        """
+        if max_nodes < MIN_MAX_NODES:
+            raise ValueError(f"max_nodes must be at least {MIN_MAX_NODES} (the root and its children)")
+        self.root_position = board.copy() if isinstance(board, BitBoard) else BitBoard.from_array(board)
+        self.max_nodes = max_nodes
+        self.policy = get_policy(policy)
+        capacity = min(capacity, max_nodes)
+        self.wins = np.zeros(capacity, dtype=np.int32)
+        self.sims = np.zeros(capacity, dtype=np.int32)
+        self.parent = np.full(capacity, NO_NODE, dtype=np.int32)
+        self.first_child = np.full(capacity, NO_NODE, dtype=np.int32)
+        self.n_children = np.zeros(capacity, dtype=np.int8)
+        self.move = np.full(capacity, -1, dtype=np.int8)
+        self.player = np.zeros(capacity, dtype=np.int8)
+        self.untried = np.zeros(capacity, dtype=np.int8)
+
+        opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+        self.player[ROOT] = opponent
+        self.untried[ROOT] = self._untried_moves(self.root_position, opponent)
+        self.n_nodes = 1
+        self.full = False
+
+    @property
+    def capacity(self) -> int:
+        return len(self.wins)
+
+    @staticmethod
+    def _untried_moves(position: BitBoard, last_player: BoardPiece) -> int:
+        """bitmask of the valid columns of position, 0 if the game is over"""
+        if position.connected_four(last_player) or position.is_full():
+            return 0
+        return position.valid_moves_mask()
+
+    def _grow(self, n_required: int) -> bool:
+        """
+        make room for n_required more nodes (doubling the arrays), False if this would exceed max_nodes
+        """
+        n_total = self.n_nodes + n_required
+        if n_total > self.max_nodes:
+            return False
+        if n_total > self.capacity:
+            capacity = min(max(2 * self.capacity, n_total), self.max_nodes)
+            for name in ("wins", "sims", "parent", "first_child", "n_children", "move", "player", "untried"):
+                old = getattr(self, name)
+                new = np.empty(capacity, dtype=old.dtype)
+                new[:len(old)] = old
+                setattr(self, name, new)
+        return True
+
+    def _allocate_children(self, node: int) -> bool:
+        """
+        allocate the block of children of node, one per valid column, False if the tree is full
+        """
+        moves = [col for col in range(COLS) if self.untried[node] >> col & 1]
+        if not self._grow(len(moves)):
+            return False
+        start = self.n_nodes
+        end = start + len(moves)
+        self.wins[start:end] = 0
+        self.sims[start:end] = 0
+        self.parent[start:end] = node
+        self.first_child[start:end] = NO_NODE
+        self.n_children[start:end] = 0
+        self.move[start:end] = moves
+        self.player[start:end] = PLAYER2 if self.player[node] == PLAYER1 else PLAYER1
+        self.untried[start:end] = 0
+        self.first_child[node] = start
+        self.n_children[node] = len(moves)
+        self.n_nodes = end
+        return True
+
+    def select_child(self, node: int) -> int:
+        """
+        child of node with the highest score of the selection policy, computed for all children at once
+        """
+        start = self.first_child[node]
+        end = start + self.n_children[node]
+        return start + self.policy.select(self.wins[start:end], self.sims[start:end], self.sims[node],
+                                          self.move[start:end])
+
+    def select_and_expand(self, position: BitBoard) -> int:
+        """
+        MCTS selection from the root and expansion of the selected node, position (a copy of the root position)
+        is brought to the position of the returned node by replaying the moves
+        Return:
+        ----------------
+        new child node, or the selected node if it can not be expanded (terminal node or tree full)
+        """
+        node = ROOT
+        while self.untried[node] == 0 and self.n_children[node] > 0:
+            node = self.select_child(node)
+            position.play(int(self.move[node]), int(self.player[node]))
+
+        if self.untried[node] == 0:
+            return node  # terminal node
+        if self.first_child[node] == NO_NODE and not self._allocate_children(node):
+            self.full = True
+            return node
+
+        untried = int(self.untried[node])
+        action = random.choice([col for col in range(COLS) if untried >> col & 1])
+        self.untried[node] = untried & ~(1 << action)
+
+        start = self.first_child[node]
+        child = start + int(np.flatnonzero(self.move[start:start + self.n_children[node]] == action)[0])
+        child_player = int(self.player[child])
+        position.play(action, child_player)
+        self.untried[child] = self._untried_moves(position, child_player)
+        return child
+
+    def backpropagate(self, node: int, winner):
+        """
+        MCTS backpropagation from node up to the root, every node counts the wins of the player who moved into it
+        """
+        while node != NO_NODE:
+            self.sims[node] += 1
+            if self.player[node] == winner:
+                self.wins[node] += 1
+            node = self.parent[node]
+
+    def run(self, runtime=None, max_iterations: Optional[int] = None, stats: Optional[MctsStats] = None) -> int:
+        """
+        run the 4 MCTS steps (Selection, Expansion, Simulation, Backpropagation) until runtime (seconds) is over,
+        max_iterations iterations are done (None for no limit) or the tree is full (max_nodes),
+        stats: MctsStats filled with the statistics
+        Return
+        ----------------
+        counter: number of iterations
+        """
+        if runtime is None and max_iterations is None:
+            raise ValueError("ArrayTree.run needs a runtime or max_iterations budget")
+        counter = 0
+        max_depth = 0
+        root_moves = self.root_position.n_moves
+        phase_times = [0.0] * len(PHASES)
+        start_time = time.time()
+        while True:
+            if runtime is not None and (time.time() - start_time) >= runtime:
+                stop_reason = "runtime"
+                break
+            if max_iterations is not None and counter >= max_iterations:
+                stop_reason = "iterations"
+                break
+            if self.full:
+                stop_reason = "nodes"
+                break
+            counter += 1
+            t0 = time.perf_counter()
+            position = self.root_position.copy()
+            node = self.select_and_expand(position)
+            max_depth = max(max_depth, position.n_moves - root_moves)
+            t1 = time.perf_counter()
+            winner = random_rollout(position, int(self.player[node]))
+            t2 = time.perf_counter()
+            self.backpropagate(node, winner)
+            phase_times[0] += t1 - t0
+            phase_times[2] += t2 - t1
+            phase_times[3] += time.perf_counter() - t2
+
+        if stats is not None:
+            """selection and expansion are one step on the array tree, their time is counted as selection"""
+            stats.iterations, stats.simulations, stats.nodes = counter, counter, self.n_nodes
+            stats.max_depth, stats.phase_times = max_depth, dict(zip(PHASES, phase_times))
+            stats.elapsed, stats.stop_reason = time.time() - start_time, stop_reason
+        return counter
+
+    def best_move(self) -> PlayerAction:
+        """
+        move of the simulated root child with the highest value (wins / sims)
+        """
+        start = self.first_child[ROOT]
+        end = start + self.n_children[ROOT]
+        sims = self.sims[start:end]
+        values = np.where(sims > 0, self.wins[start:end] / np.maximum(sims, 1), -1)
+        return PlayerAction(self.move[start + int(np.argmax(values))])
+
+
+def array_mcts_algorithm(
+        board: np.ndarray, player: BoardPiece, runtime=10, max_nodes: int = DEFAULT_MAX_NODES, policy=None,
+        max_iterations: Optional[int] = None, stats: Optional[MctsStats] = None
+):
+    """
+    Monte Carlo Tree Search on the compact ArrayTree, one simulation per iteration and without the MCTS-Solver
+    Parameters
+    ----------------
+    board: board reflecting current game state
+    player: player for which mcts algorithm is supposed to calculate an action
+    runtime: max runtime for the agent
+    max_nodes: hard cap of the number of nodes of the tree, the search ends when it is reached
+    policy: selection policy, a SelectionPolicy or one of "ucb1" (default), "ucb1-tuned", "puct"
+    max_iterations: max number of iterations, None for no limit
+    stats: MctsStats filled with the statistics of the search
+    Return
+    ----------------
+    move (action) corresponding to the presumably best action for the current game state
+    """
+    tree = ArrayTree(board, player, max_nodes=max_nodes, policy=policy)
+    tree.run(runtime, max_iterations, stats)
+    return tree.best_move()
@@ -1 +1,2 @@
 from .minimax import generate_move_minimax as generate_move_minimax
+from .minimax import generate_moves_minimax_batch as generate_moves_batch
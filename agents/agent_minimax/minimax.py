@@ -1,10 +1,93 @@
 import numpy as np
+import time
+from functools import lru_cache
 from agents.common import *
-
+from agents import kernels
+from agents.bitboard import BitBoard, WINDOW_MASKS, ROWS, COLS, mirror_action
+from agents.book import get_book
+from agents.agent_minimax.transposition import TranspositionTable, DEFAULT_TT_SIZE, EXACT, LOWER_BOUND, UPPER_BOUND
+from agents.agent_minimax.ordering import MoveOrdering, CenterFirstOrdering, KillerHistoryOrdering
+
+WIN_SCORE = 1000000  # value of a won position, reduced by the number of pieces on the board
+WINDOW_SCORES = (0, 2, 5, 70, 0)  # score of a window by number of pieces of a single player, see evaluate_window
+DEFAULT_DEPTH = 7  # search depth of generate_move_minimax without time budget
+DEFAULT_RUNTIME = 1.0  # time budget (seconds) per move of generate_move_minimax
+
+
+class SearchTimeout(Exception):
+    """raised inside the search when the deadline has passed, the unfinished iteration is discarded"""
+
+
+NATURAL_ORDER = MoveOrdering()  # left to right, hash move first (used if no ordering is given)
+STOP_REASONS = ("depth", "runtime", "solved", "book")
+
+
+class SearchStats:
+    def __init__(self):
+        """
+        Statistics of an alpha-beta search, filled by alpha_beta_bitboard (counters) and the functions around it
+        (times, depths); the counters of worker processes are merged in by parallel_alpha_beta
+        nodes: # of positions searched (calls of alpha_beta_bitboard)
+        leaf_evals: # of heuristic evaluations (depth 0)
+        terminal_nodes: # of won, lost or drawn positions reached
+        cutoffs: # of beta cut-offs
+        tt_probes, tt_hits: # of transposition table lookups and of lookups which found the position
+        max_depth: deepest ply from the root reached
+        completed_depth: depth of the last completed search (iteration of the iterative deepening)
+        depth_times: seconds spent on every iteration of the iterative deepening (depth 1, 2, ...)
+        elapsed: runtime in seconds
+        stop_reason: reason the search ended, one of STOP_REASONS
+        """
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.terminal_nodes = 0
+        self.cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.root_moves = None  # pieces on the board of the root, set by the first call of alpha_beta_bitboard
+        self.max_depth = 0
+        self.completed_depth = 0
+        self.depth_times = []
+        self.elapsed = 0.0
+        self.stop_reason = None
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def merge(self, other: "SearchStats"):
+        """add the counters of other (e.g. of a worker process searching a part of the same tree)"""
+        for name in ("nodes", "leaf_evals", "terminal_nodes", "cutoffs", "tt_probes", "tt_hits"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+
+    def as_dict(self) -> dict:
+        """statistics as plain dict (e.g. for JSON), with the nodes per second"""
+        return dict(vars(self), depth_times=list(self.depth_times), nodes_per_second=self.nodes_per_second)
+
+    def __str__(self) -> str:
+        return (f"{self.nodes} nodes ({self.nodes_per_second:.0f}/s), {self.leaf_evals} evaluations, "
+                f"{self.cutoffs} cut-offs, {self.tt_hits}/{self.tt_probes} tt hits, depth {self.completed_depth} "
+                f"(max {self.max_depth}), {self.elapsed:.3f}s, stopped by {self.stop_reason}")
+
+
+class MinimaxState(SavedState):
+    def __init__(self, tt_size: int = DEFAULT_TT_SIZE, ordering: Optional[MoveOrdering] = None):
+        """
+        State of the minimax agent carried between moves in saved_state
+        tt: transposition table, positions searched for earlier moves are reused as lookups
+        ordering: move ordering (killer and history heuristics by default), its statistics are kept between moves
+        stats: SearchStats of the last move
+        """
+        self.tt = TranspositionTable(tt_size)
+        self.ordering = KillerHistoryOrdering() if ordering is None else ordering
+        self.stats = None
 
 
 def generate_move_minimax(
-        board: np.ndarray, player: BoardPiece, saved_state: Optional[SavedState]
+        board: np.ndarray, player: BoardPiece, saved_state: Optional[SavedState], depth: Optional[int] = None,
+        runtime: Optional[float] = DEFAULT_RUNTIME, tt_size: int = DEFAULT_TT_SIZE,
+        ordering: Optional[MoveOrdering] = None, pvs: bool = True, n_workers: int = 1, book=None
 ) -> Tuple[PlayerAction, Optional[SavedState]]:
     """
     generate move function employing minimax algorithm with/without alpha-beta pruning
@@ -14,104 +97,387 @@ def generate_move_minimax(
         board reflecting current game state
     player: BoardPiece
         player for which the minimax algorithm is supposed to calculate an action
+    saved_state: MinimaxState or None
+        state of the agent from its last move (transposition table), created if None
+    depth: int, optional
+        maximal depth explored by the minimax algorithm (default: unlimited with runtime, else DEFAULT_DEPTH)
+    runtime: float, optional
+        time budget in seconds for the iterative deepening search, None for a single search to a fixed depth
+    tt_size: int
+        number of slots of the transposition table, if a new one is created
+    ordering: MoveOrdering, optional
+        move ordering, if a new state is created (default: KillerHistoryOrdering)
+    pvs: bool
+        use principal variation search (null window searches for all but the first move)
+    n_workers: int
+        number of processes, the moves at the root are searched in parallel if > 1 (see parallel_alpha_beta)
+    book: OpeningBook, str or bool, optional
+        opening book consulted before the search (see agents.book.get_book), by default the book in the
+        environment variable CONNECT4_BOOK, False for none
 
     Return
     -----------
     action
         action for player, generated by minimax
+    saved_state
+        MinimaxState with the SearchStats of the move, to be passed to the next call
     """
 
-    depth = 5
-    """change comment to use/not use alpha-beta pruning"""
-    #action, _ = minimax(board, depth, player, True)
-    action, _ = minimax_alpha_beta_pruning(board, depth, player, True, -np.inf, +np.inf)
+    if not isinstance(saved_state, MinimaxState):
+        saved_state = MinimaxState(tt_size, ordering)
+    stats = saved_state.stats = SearchStats()
+
+    opening_book = get_book(book)
+    if opening_book is not None:
+        entry = opening_book.lookup(board, player)
+        if entry is not None:
+            stats.stop_reason = "book"
+            return entry[0], saved_state
+
+    saved_state.tt.new_search()
+    saved_state.ordering.new_search()
+
+    if runtime is not None:
+        action, _, _ = iterative_deepening(
+            board, player, runtime, depth, saved_state.tt, saved_state.ordering, pvs, n_workers, stats
+        )
+        return PlayerAction(action), saved_state
+
+    depth = DEFAULT_DEPTH if depth is None else depth
+    start_time = time.time()
+    if n_workers > 1:
+        from agents.agent_minimax.parallel import parallel_alpha_beta, new_search_id
+        search_id = new_search_id()  # the iterations share the worker tables
+        action, _ = parallel_alpha_beta(board, depth, player, n_workers, pvs=pvs, stats=stats)
+    else:
+        """change comment to use/not use alpha-beta pruning"""
+        #action, _ = minimax(board, depth, player, True)
+        action, _ = minimax_alpha_beta_pruning(
+            board, depth, player, True, -np.inf, +np.inf, saved_state.tt, saved_state.ordering, pvs, stats
+        )
+    stats.completed_depth, stats.elapsed, stats.stop_reason = depth, time.time() - start_time, "depth"
+
+    return PlayerAction(action), saved_state
+
+
+def iterative_deepening(
+        board: np.ndarray, player: BoardPiece, runtime: float, max_depth: Optional[int] = None,
+        tt: Optional[TranspositionTable] = None, ordering: Optional[MoveOrdering] = None, pvs: bool = False,
+        n_workers: int = 1, stats: Optional[SearchStats] = None
+):
+    """
+    Iterative deepening around the alpha-beta search: search to depth 1, 2, 3, ... until the time budget is used
+    up. The transposition table keeps the best moves of the earlier iterations, they are searched first
+    (principal variation first), which makes the deeper iterations cheap.
+    Parameters
+    -----------
+    board: np.ndarray or BitBoard
+        board reflecting current game state
+    player: BoardPiece
+        player to move, for which the algorithm is supposed to calculate an action
+    runtime: float
+        time budget in seconds, the iteration running at the deadline is aborted and discarded
+    max_depth: int, optional
+        maximal depth, by default the search deepens until the board would be full
+    tt: TranspositionTable, optional
+        transposition table to be used, a new one is created if None
+    ordering: MoveOrdering, optional
+        move ordering, see alpha_beta_bitboard
+    pvs: bool
+        use principal variation search, see alpha_beta_bitboard
+    n_workers: int
+        number of processes, if > 1 the iterations are searched by parallel_alpha_beta (the transposition table
+        and move ordering of the worker processes are used then, kept from iteration to iteration, and the best
+        move of the last iteration is searched first)
+    stats: SearchStats, optional
+        filled with the statistics of the search (time per iteration, completed depth, ...)
 
-    return action, saved_state
+    Return
+    -----------
+    Tuple [action (best column of the deepest completed iteration), heuristic_value, completed depth]
+    """
+    if n_workers > 1:
+        from agents.agent_minimax.parallel import parallel_alpha_beta, new_search_id
+        search_id = new_search_id()  # the iterations share the worker tables
+
+    start_time = time.time()
+    deadline = start_time + runtime
+    position = search_position(board)
+    if tt is None:
+        tt = TranspositionTable()
+
+    remaining_moves = ROWS * COLS - position.n_moves
+    max_depth = remaining_moves if max_depth is None else min(max_depth, remaining_moves)
+
+    best_column, best_value, completed_depth = -1, None, 0
+    stop_reason = "depth"
+    for depth in range(1, max_depth + 1):
+        iteration_start = time.time()
+        try:
+            """depth 1 always runs to the end, so that there is a move to return"""
+            if n_workers > 1 and depth > 1:
+                column, value = parallel_alpha_beta(
+                    position, depth, player, n_workers, deadline, None, pvs, best_column, stats, search_id
+                )
+            else:
+                column, value = alpha_beta_bitboard(
+                    position.copy(), depth, player, -np.inf, np.inf, tt, deadline if depth > 1 else None, ordering,
+                    pvs, stats
+                )
+        except SearchTimeout:
+            stop_reason = "runtime"
+            break
+        finally:
+            if stats is not None:
+                stats.depth_times.append(time.time() - iteration_start)
+        best_column, best_value, completed_depth = column, value, depth
+        if abs(value) >= WIN_SCORE - ROWS * COLS:
+            stop_reason = "solved"
+            break  # proven win or loss, deeper iterations can not change the result
+
+    if stats is not None:
+        stats.completed_depth, stats.stop_reason = completed_depth, stop_reason
+        stats.elapsed = time.time() - start_time
+    return best_column, best_value, completed_depth
+
+
+def solve(
+        board, player: BoardPiece, tt: Optional[TranspositionTable] = None, ordering: Optional[MoveOrdering] = None,
+        deadline: Optional[float] = None, stats: Optional[SearchStats] = None
+):
+    """
+    Perfect-play solver: alpha-beta search (negamax, PVS) to the end of the game, so every leaf is a won, lost
+    or drawn position and the value is exact: WIN_SCORE - (number of pieces on the board at the end of the game)
+    for a win of player, the negative for a loss and 0 for a draw
+    Parameters
+    -----------
+    board: np.ndarray or BitBoard
+        board reflecting current game state
+    player: BoardPiece
+        player to move
+    tt: TranspositionTable, optional
+        transposition table, positions solved earlier (e.g. when building the book) are reused
+    ordering: MoveOrdering, optional
+        move ordering, CenterFirstOrdering if None
+    deadline: float, optional
+        time.time() at which the search is aborted by raising SearchTimeout
+    stats: SearchStats, optional
+        filled with the statistics of the search
+
+    Return
+    -----------
+    Tuple [action (best column, -1 for a finished game), exact value]
+    """
+    position = search_position(board).copy()
+    if tt is None:
+        tt = TranspositionTable()
+    if ordering is None:
+        ordering = CenterFirstOrdering()
+    remaining_moves = ROWS * COLS - position.n_moves
+    start_time = time.time()
+    result = alpha_beta_bitboard(
+        position, remaining_moves, player, -np.inf, np.inf, tt, deadline, ordering, True, stats
+    )
+    if stats is not None:
+        stats.completed_depth, stats.elapsed, stats.stop_reason = remaining_moves, time.time() - start_time, "solved"
+    return result
+
+
+def search_position(board) -> "EvaluatedBitBoard":
+    """
+    convert an ndarray board or a BitBoard into the EvaluatedBitBoard the search runs on
+    """
+    if isinstance(board, EvaluatedBitBoard):
+        return board
+    if isinstance(board, BitBoard):
+        return EvaluatedBitBoard.from_position(board)
+    return EvaluatedBitBoard.from_array(board)
 
 
 def minimax_alpha_beta_pruning(
-        board: np.ndarray, depth, player: BoardPiece, maximizing: bool, alpha, beta
+        board: np.ndarray, depth, player: BoardPiece, maximizing: bool, alpha, beta,
+        tt: Optional[TranspositionTable] = None, ordering: Optional[MoveOrdering] = None, pvs: bool = False,
+        stats: Optional[SearchStats] = None
 ):
     """
-    Minimax algorithm with alpha-beta pruning
+    Minimax algorithm with alpha-beta pruning, the search itself runs on a bitboard with incremental
+    evaluation (see alpha_beta_bitboard and EvaluatedBitBoard)
     Parameters
     -----------
-    board: np.ndarray
+    board: np.ndarray or BitBoard
         board reflecting current game state
     depth: int
         depth explored by the minimax algorithm
     player: BoardPiece
-        player for which the minimax algorithm is supposed to calculate an action
+        player to move, for which the minimax algorithm is supposed to calculate an action
     maximizing : Bool
-        if True, result is maximized for the given player
+        if True, result is maximized for the given player, else it is minimized (value from the opponents view)
     alpha
         alpha-value for pruning, if MAXIMIZING = True, should be initialized to -np.inf
     beta
         beta-value for pruning, if MAXIMIZING = True, should be initialized to +np.inf
+    tt: TranspositionTable, optional
+        table for storing and looking up the values of positions already searched
+    ordering: MoveOrdering, optional
+        move ordering, see alpha_beta_bitboard
+    pvs: bool
+        use principal variation search, see alpha_beta_bitboard
+    stats: SearchStats, optional
+        counters of the search, see alpha_beta_bitboard
 
     Return
     -----------
     Tuple [action (best column), heuristic_value]
     """
 
-    opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+    position = search_position(board)
 
-    """Edge Case: (terminal node) AI or Player is winning with the next piece or the board is full (draw)"""
-    terminal_state = check_end_state(board, player)
+    if maximizing:
+        return alpha_beta_bitboard(position, depth, player, alpha, beta, tt, None, ordering, pvs, stats)
 
-    if terminal_state == GameState.IS_WIN and maximizing:  # Maximizing Player is Winning
-        # print("winning")
-        return -1, np.inf
-    elif terminal_state == GameState.IS_WIN and maximizing == False:  # Maximizing Player looses because Minimizing player wins
-        # print("loosing")
-        return -1, -np.inf
-    elif terminal_state == GameState.IS_DRAW:  # Game over because draw
-        return -1, None
+    best_column, value = alpha_beta_bitboard(position, depth, player, -beta, -alpha, tt, None, ordering, pvs, stats)
+    return best_column, -value
 
-    if depth == 0:  # case where depth = 0
-        value_for_depth0 = evaluate_board(board, player)
-        return -1, value_for_depth0
 
-    valid_columns = get_valid_columns(board)
-    best_column = np.random.choice(valid_columns, 1)
+def alpha_beta_bitboard(
+        position: BitBoard, depth: int, player: BoardPiece, alpha, beta, tt: Optional[TranspositionTable] = None,
+        deadline: Optional[float] = None, ordering: Optional[MoveOrdering] = None, pvs: bool = False,
+        stats: Optional[SearchStats] = None
+):
+    """
+    Alpha-beta search in negamax formulation on a bitboard, moves are applied and taken back in place
+    Parameters
+    -----------
+    position: BitBoard
+        bitboard reflecting current game state, it is restored before the function returns
+    depth: int
+        depth explored by the algorithm
+    player: BoardPiece
+        player to move, the value is returned from the view of this player
+    alpha
+        lower bound of the search window
+    beta
+        upper bound of the search window
+    tt: TranspositionTable, optional
+        table for storing and looking up the values of positions already searched, the stored best move of
+        a position is passed to the move ordering (hash move)
+    deadline: float, optional
+        time.time() at which the search is aborted by raising SearchTimeout (position is not restored then)
+    ordering: MoveOrdering, optional
+        order in which the moves are searched, NATURAL_ORDER (left to right, hash move first) if None
+    pvs: bool
+        principal variation search: the first move is searched with the full window, all other moves with a
+        null window (proving they are not better) and only re-searched with the full window if they are better
+    stats: SearchStats, optional
+        counters (nodes, evaluations, cut-offs, table lookups, depth) incremented by the search
 
-    """ recursive minimizing/maximizing case"""
-    if maximizing:  # maximizing for player
-        value = -np.inf
-        for column in valid_columns:
-            c_board = apply_player_action(board, column, player, True)  ### player
-            _, new_score = minimax_alpha_beta_pruning(c_board, depth - 1, opponent, False, alpha,
-                                                      beta)  ### maximizingTrue is False for next iter, because  will be oppnent
-            if new_score > value:
-                value = new_score
-                best_column = column
-            alpha = max(alpha, new_score)
-            if alpha >= beta:
-                break  ### beta cut-off
+    Return
+    -----------
+    Tuple [action (best column, -1 for leaf nodes), heuristic_value]
+    """
 
-        return best_column, value
+    if deadline is not None and time.time() > deadline:
+        raise SearchTimeout
 
-    else:  # minimizing for opponent
-        value = np.inf
-        for column in valid_columns:
-            c_board = apply_player_action(board, column, opponent, True)  ### opponent is minimizing player
-            _, new_score = minimax_alpha_beta_pruning(c_board, depth - 1, player, True, alpha,
-                                                      beta)  ### maximizingTrue is True for next iter, because will be player
-            if new_score < value:
-                value = new_score
-                best_column = column
-            beta = min(beta, new_score)
-            if alpha >= beta:
-                break  ### alpha cut off
+    if stats is not None:
+        stats.nodes += 1
+        if stats.root_moves is None:
+            stats.root_moves = position.n_moves
+        stats.max_depth = max(stats.max_depth, position.n_moves - stats.root_moves)
 
-        return best_column, value
+    opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+
+    """Edge Case: (terminal node) the opponent won with the last piece or the board is full (draw)"""
+    if position.connected_four(opponent):
+        if stats is not None:
+            stats.terminal_nodes += 1
+        return -1, -(WIN_SCORE - position.n_moves)  # earlier wins are worth more
+    if position.is_full():
+        if stats is not None:
+            stats.terminal_nodes += 1
+        return -1, 0
+
+    if depth == 0:
+        if stats is not None:
+            stats.leaf_evals += 1
+        if isinstance(position, EvaluatedBitBoard):
+            return -1, position.evaluator.score(player)
+        return -1, evaluate_bitboard(position, player)
+
+    """ transposition table lookup: exact values are returned, bounds narrow the search window
+    the table is keyed on the canonical form (mirror images share an entry), the stored move belongs to it"""
+    alpha_orig = alpha
+    hash_move = -1
+    if tt is not None:
+        key, mirrored = position.canonical_zobrist_key(player)
+        entry = tt.probe(key)
+        if stats is not None:
+            stats.tt_probes += 1
+            stats.tt_hits += entry is not None
+        if entry is not None:
+            hash_move = mirror_action(entry.move) if mirrored and entry.move >= 0 else entry.move
+            if entry.depth >= depth:
+                if entry.flag == EXACT:
+                    return hash_move, entry.value
+                if entry.flag == LOWER_BOUND:
+                    alpha = max(alpha, entry.value)
+                else:
+                    beta = min(beta, entry.value)
+                if alpha >= beta:
+                    return hash_move, entry.value
+
+    if ordering is None:
+        ordering = NATURAL_ORDER
+    columns = ordering.order(position.valid_columns(), position, player, hash_move)
+
+    best_column = -1
+    value = -np.inf
+    for i, column in enumerate(columns):
+        position.play(column, player)
+        if pvs and i > 0:
+            """null window search around alpha (finite after the first move), re-search if the move is better"""
+            _, new_score = alpha_beta_bitboard(
+                position, depth - 1, opponent, -alpha - 1, -alpha, tt, deadline, ordering, pvs, stats
+            )
+            if alpha < -new_score < beta:
+                _, new_score = alpha_beta_bitboard(
+                    position, depth - 1, opponent, -beta, -alpha, tt, deadline, ordering, pvs, stats
+                )
+        else:
+            _, new_score = alpha_beta_bitboard(
+                position, depth - 1, opponent, -beta, -alpha, tt, deadline, ordering, pvs, stats
+            )
+        position.undo(column)
+        new_score = -new_score
+        if new_score > value:
+            value = new_score
+            best_column = column
+        alpha = max(alpha, new_score)
+        if alpha >= beta:
+            if stats is not None:
+                stats.cutoffs += 1
+            ordering.cutoff(position, column, player, depth)
+            break  ### cut-off
+
+    if tt is not None:
+        if value <= alpha_orig:
+            flag = UPPER_BOUND
+        elif value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        stored_move = mirror_action(best_column) if mirrored and best_column >= 0 else best_column
+        tt.store(key, depth, value, flag, stored_move)
+
+    return best_column, value
 
 
 def minimax(
-        board: np.ndarray, depth: int, player: BoardPiece, MAXIMIZING: bool
+        board: np.ndarray, depth: int, player: BoardPiece, MAXIMIZING: bool, heights: Optional[np.ndarray] = None
 ):
     """
-    Minimax algorithm
+    Minimax algorithm (without pruning) on the ndarray board, reference for testing the alpha-beta search:
+    it returns the same values as minimax_alpha_beta_pruning for the same arguments
     Parameters
     -----------
     board: np.ndarray
@@ -119,9 +485,12 @@ def minimax(
     depth: int
         depth explored by the minimax algorithm
     player: BoardPiece
-        player for which the minimax algorithm is supposed to calculate an action
+        player to move, for which the minimax algorithm is supposed to calculate an action
     MAXIMIZING : Bool
-        if True, result is maximized for the given player
+        if True, result is maximized for the given player, else it is minimized (player is the minimizing player)
+    heights: np.ndarray, optional
+        column-height index of board (see common.column_heights), computed if None. Moves are applied to
+        board in place and taken back, board and heights are restored before the function returns
 
     Return
     -----------
@@ -129,52 +498,50 @@ def minimax(
     """
 
     opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+    maximizing_player = player if MAXIMIZING else opponent
 
-    """Edge Case: (terminal node) AI or Player is winning with the next piece or the board is full (draw)"""
-    terminal_state = check_end_state(board, player)
-
-    if terminal_state == GameState.IS_WIN and MAXIMIZING == True:  # Maximizing Player is Winning
-        # print("winning")
-        return -1, np.inf
-    elif terminal_state == GameState.IS_WIN and MAXIMIZING == False:  # Maximizing Player looses because Minimizing player wins
-        # print("loosing")
-        return -1, -np.inf
-    elif terminal_state == GameState.IS_DRAW:  # Game over because draw
-        return -1, None
+    """Edge Case: (terminal node) the opponent won with the last piece or the board is full (draw)"""
+    if connected_four(board, opponent):
+        win_value = WIN_SCORE - np.count_nonzero(board)
+        if MAXIMIZING:  # Maximizing Player looses because Minimizing player wins
+            return -1, -win_value
+        return -1, win_value  # Maximizing Player is Winning
+    if np.all(board[-1] != NO_PLAYER):  # Game over because draw
+        return -1, 0
 
     if depth == 0:  # case where depth = 0
-        value_for_depth0 = evaluate_board(board, player)
+        value_for_depth0 = evaluate_board(board, maximizing_player)
         return -1, value_for_depth0
 
+    if heights is None:
+        heights = column_heights(board)
     valid_columns = get_valid_columns(board)
-    best_column = np.random.choice(valid_columns, 1)
+    best_column = valid_columns[0]
 
     """ recursive minimizing/maximizing case"""
     if MAXIMIZING:  # maximizing for player
-        # print("maximizing works")
         value = -np.inf
         for column in valid_columns:
-            c_board = apply_player_action(board, column, player, True)  ### player
-            _, new_score = minimax(c_board, depth - 1, opponent,
-                                   False)  ### maximizingTrue is False for next iter, because  will be oppnent
+            apply_player_action(board, column, player, heights=heights)  ### player
+            _, new_score = minimax(board, depth - 1, opponent, False,
+                                   heights)  ### maximizingTrue is False for next iter, because  will be oppnent
+            undo_player_action(board, column, heights)
             if new_score > value:
                 value = new_score
                 best_column = column
-            # print("after column", column, "best column is", best_column)
 
         return best_column, value
 
-    else:  # minimizing for opponent
-        # print("minimizing works")
+    else:  # minimizing for player
         value = np.inf
         for column in valid_columns:
-            c_board = apply_player_action(board, column, opponent, True)  ### opponent is minimizing player
-            _, new_score = minimax(c_board, depth - 1, player,
-                                   True)  ### maximizingTrue is True for next iter, because will be player
+            apply_player_action(board, column, player, heights=heights)  ### player is minimizing player
+            _, new_score = minimax(board, depth - 1, opponent, True,
+                                   heights)  ### maximizingTrue is True for next iter, because will be opponent
+            undo_player_action(board, column, heights)
             if new_score < value:
                 value = new_score
                 best_column = column
-            # print("after column", column, "best column is", best_column)
 
         return best_column, value
 
@@ -192,6 +559,9 @@ def get_valid_columns(board: np.ndarray) -> np.ndarray:
     valid_columns_array:
         array containing indices of all valid columns """
 
+    if kernels.ENABLED:
+        return kernels.valid_columns_kernel(board).tolist()
+
     valid_columns_array = []  # initialize empty list
 
     for m, col in enumerate(board.T):
@@ -241,11 +611,51 @@ def evaluate_window(window: np.ndarray, player: BoardPiece) -> int:
     return window_score
 
 
+@lru_cache(maxsize=None)
+def window_indices(n_rows: int = ROWS, m_columns: int = COLS, window_length: int = 4) -> np.ndarray:
+    """
+    Precomputed index table of all windows of the board, computed once per board shape
+    (the line table of the GameConfig, see common.line_indices)
+     Parameters
+    -----------
+    n_rows, m_columns: int
+        shape of the board
+    window_length: int
+        number of cells of a window (GameConfig.connect_n, =4 for connect 4)
+
+    Return
+    -----------
+    indices: np.ndarray
+        array of shape (n_windows, window_length) with the flat indices (row * m_columns + column) of the cells
+        of every horizontal, vertical and diagonal window, (69, 4) for the 6x7 board
+    """
+    return line_indices(GameConfig(n_rows, m_columns, window_length))
+
+
+@lru_cache(maxsize=None)
+def window_score_table(window_length: int = 4) -> np.ndarray:
+    """
+    score of a window by (# pieces of player, # pieces of opponent), see evaluate_window:
+    windows with pieces of both players or without empty cells score 0, for other window lengths the scores
+    of WINDOW_SCORES are given to the windows missing the same number of pieces
+    """
+    own_scores = np.zeros(window_length + 1, dtype=np.int64)
+    for missing in range(1, 4):
+        if window_length - missing > 0:
+            own_scores[window_length - missing] = WINDOW_SCORES[4 - missing]
+    table = np.zeros((window_length + 1, window_length + 1), dtype=np.int64)
+    table[:, 0] += own_scores
+    table[0, :] -= own_scores
+    table.setflags(write=False)
+    return table
+
+
 def evaluate_board(
-        board: np.ndarray, player: BoardPiece
+        board: np.ndarray, player: BoardPiece, connect_n: int = DEFAULT_CONFIG.connect_n
 ) -> int:
     """
-    return a score reflecting the state of the board for the given player
+    return a score reflecting the state of the board for the given player, the sum of evaluate_window
+    over all windows, computed in one vectorized pass over the precomputed window index table
 
      Parameters
     -----------
@@ -253,46 +663,187 @@ def evaluate_board(
         board reflecting current game state
     player: BoardPiece
         Player for whom the the board) is evaluated
+    connect_n: int
+        number of pieces in a row which win (GameConfig.connect_n), the length of the windows
 
     Return
     -----------
     board_score: int
-        score for the respective window
+        score for the respective board
+    """
+
+    indices = window_indices(*board.shape, connect_n)
+    if kernels.ENABLED:
+        return int(kernels.evaluate_board_kernel(board, player, indices, window_score_table(connect_n)))
+
+    opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+    windows = board.reshape(-1)[indices]  # (n_windows, connect_n)
+
+    """ count the pieces of player and opponent in every window and look up the window scores"""
+    own = np.count_nonzero(windows == player, axis=1)
+    other = np.count_nonzero(windows == opponent, axis=1)
+    return int(window_score_table(connect_n)[own, other].sum())
+
+
+def evaluate_boards(
+        boards: np.ndarray, players, connect_n: int = DEFAULT_CONFIG.connect_n
+) -> np.ndarray:
     """
+    batched evaluate_board: scores a stack of boards at once
 
-    WINDOW_LENGTH = 4  # Window length to be evaluated (=4 for connect 4)
-    slide = WINDOW_LENGTH - 1  # reducing parameter based on window length when iterating over the board
-    board_score = 0  # initialize board score to 0
-    n_rows, m_columns = board.shape  # initialize board shape
-
-    """ evaluate horizontally """
-    for r, row in enumerate(board):
-        for c in range(m_columns - slide):
-            window = row[c:c + WINDOW_LENGTH]
-            board_score += evaluate_window(window, player)
-
-    """ evaluate horizontally """
-    tboard = np.transpose(board)
-    for r, trow in enumerate(tboard):
-        for c in range(n_rows - slide):
-            window = trow[c:c + WINDOW_LENGTH]
-            board_score += evaluate_window(window, player)
-
-    """  positive slope diagonal evaluation """
-    for r in range(n_rows - slide):
-        for c in range(m_columns - slide):
-            window = np.asarray([board[r + step, c + step] for step in range(WINDOW_LENGTH)])
-            board_score += evaluate_window(window, player)
-
-    """ negative slope diagonal evaluation """
-    for r in range(n_rows - slide):
-        for c in range(m_columns - slide):
-            window = np.asarray([board[r + slide - step, c + step] for step in range(WINDOW_LENGTH)])
-            board_score += evaluate_window(window, player)
+     Parameters
+    -----------
+    boards: np.ndarray
+        boards of shape (N, n_rows, m_columns)
+    players: BoardPiece or np.ndarray
+        player for whom the boards are evaluated, either one for all boards or an array of shape (N,)
+    connect_n: int
+        length of the windows, see evaluate_board
+
+    Return
+    -----------
+    board_scores: np.ndarray
+        array of shape (N,), board_scores[i] == evaluate_board(boards[i], players[i])
+    """
+
+    n_boards, n_rows, m_columns = boards.shape
+    players = np.broadcast_to(np.asarray(players, dtype=BoardPiece), (n_boards,))[:, np.newaxis, np.newaxis]
+    opponents = np.where(players == PLAYER1, PLAYER2, PLAYER1)
+    windows = boards.reshape(n_boards, -1)[:, window_indices(n_rows, m_columns, connect_n)]  # (N, n_windows, n)
+
+    own = np.count_nonzero(windows == players, axis=2)
+    other = np.count_nonzero(windows == opponents, axis=2)
+    return window_score_table(connect_n)[own, other].sum(axis=1)
+
+
+def evaluate_bitboard(position: BitBoard, player: BoardPiece) -> int:
+    """
+    bitboard equivalent of evaluate_board, returns the same score for the same board
+
+     Parameters
+    -----------
+    position: BitBoard
+        bitboard reflecting current game state
+    player: BoardPiece
+        Player for whom the the board is evaluated
+
+    Return
+    -----------
+    board_score: int
+        score for the respective board
+    """
+    own = position.pieces[player]
+    other = position.pieces[PLAYER2 if player == PLAYER1 else PLAYER1]
+    board_score = 0
+
+    """ windows containing pieces of both players score 0, otherwise score by the number of pieces"""
+    for window in WINDOW_MASKS:
+        own_window = own & window
+        other_window = other & window
+        if own_window:
+            if not other_window:
+                board_score += WINDOW_SCORES[own_window.bit_count()]
+        elif other_window:
+            board_score -= WINDOW_SCORES[other_window.bit_count()]
 
     return board_score
 
 
+""" tables for the incremental evaluation, windows and cells as in WINDOW_MASKS and BitBoard bit indices"""
+CELL_WINDOWS = [
+    [w for w, window in enumerate(WINDOW_MASKS) if window >> cell & 1] for cell in range(COLS * (ROWS + 1))
+]  # windows through every cell (at most 13 for connect 4)
+WINDOW_CODE_STEP = (0, 5, 1)  # window code = 5 * (# pieces of PLAYER1) + (# pieces of PLAYER2), step by player
+WINDOW_CODE_SCORES = [
+    (WINDOW_SCORES[code // 5] if code % 5 == 0 else 0) - (WINDOW_SCORES[code % 5] if code // 5 == 0 else 0)
+    for code in range(25)
+]  # score of a window from the view of PLAYER1 by window code
+WINDOW_CODE_DELTAS = [None] + [
+    [WINDOW_CODE_SCORES[code + step] - WINDOW_CODE_SCORES[code] if code + step < 25 else 0 for code in range(25)]
+    for step in WINDOW_CODE_STEP[1:]
+]  # change of the score when a piece of a player is added to a window, by [player][window code]
+
+
+class IncrementalEvaluator:
+    def __init__(self, position: BitBoard):
+        """
+        Score of evaluate_board maintained incrementally: the number of pieces of both players in every
+        window (as window code) and the running score from the view of PLAYER1 are updated when a piece
+        is added or removed, only the windows through that cell change
+        :type position: BitBoard
+        """
+        self.codes = [0] * len(WINDOW_MASKS)
+        self.score1 = 0
+        for player in (PLAYER1, PLAYER2):
+            pieces = position.pieces[player]
+            while pieces:
+                cell = (pieces & -pieces).bit_length() - 1
+                self.add(cell, player)
+                pieces &= pieces - 1
+
+    def add(self, cell: int, player: BoardPiece):
+        """ add a piece of player at bit index cell """
+        codes = self.codes
+        deltas = WINDOW_CODE_DELTAS[player]
+        step = WINDOW_CODE_STEP[player]
+        for w in CELL_WINDOWS[cell]:
+            code = codes[w]
+            self.score1 += deltas[code]
+            codes[w] = code + step
+
+    def remove(self, cell: int, player: BoardPiece):
+        """ remove the piece of player at bit index cell """
+        codes = self.codes
+        deltas = WINDOW_CODE_DELTAS[player]
+        step = WINDOW_CODE_STEP[player]
+        for w in CELL_WINDOWS[cell]:
+            code = codes[w] - step
+            self.score1 -= deltas[code]
+            codes[w] = code
+
+    def copy(self) -> "IncrementalEvaluator":
+        evaluator = IncrementalEvaluator.__new__(IncrementalEvaluator)
+        evaluator.codes = self.codes.copy()
+        evaluator.score1 = self.score1
+        return evaluator
+
+    def score(self, player: BoardPiece) -> int:
+        """ same value as evaluate_board(board, player) """
+        return self.score1 if player == PLAYER1 else -self.score1
+
+
+class EvaluatedBitBoard(BitBoard):
+    """
+    BitBoard which keeps an IncrementalEvaluator up to date in play and undo, alpha_beta_bitboard reads the
+    leaf scores from the evaluator instead of evaluating the board from scratch
+    """
+    __slots__ = ("evaluator",)
+
+    @classmethod
+    def from_position(cls, position: BitBoard) -> "EvaluatedBitBoard":
+        evaluated = super().from_position(position)
+        evaluated.evaluator = IncrementalEvaluator(position)
+        return evaluated
+
+    @classmethod
+    def from_array(cls, board: np.ndarray) -> "EvaluatedBitBoard":
+        return cls.from_position(BitBoard.from_array(board))
+
+    def copy(self) -> "EvaluatedBitBoard":
+        evaluated = super().copy()
+        evaluated.evaluator = self.evaluator.copy()
+        return evaluated
+
+    def play(self, action: PlayerAction, player: BoardPiece) -> "EvaluatedBitBoard":
+        self.evaluator.add(self.heights[action], player)
+        return super().play(action, player)
+
+    def undo(self, action: PlayerAction) -> "EvaluatedBitBoard":
+        cell = self.heights[action] - 1
+        self.evaluator.remove(cell, PLAYER1 if self.pieces[PLAYER1] >> cell & 1 else PLAYER2)
+        return super().undo(action)
+
+
 def pick_smart_move(
         board: np.ndarray, player: BoardPiece, saved_state: Optional[SavedState]
 ) -> Tuple[PlayerAction, Optional[SavedState]]:
@@ -315,13 +866,143 @@ def pick_smart_move(
     best_column_score = 0
     valid_columns = get_valid_columns(board)
     best_column = np.random.choice(valid_columns, 1)
+    heights = column_heights(board)
 
-    """ generate a hypothetical board for all possible moves and evaluate it, choose move with highest score """
+    """ apply every possible move to the board in place, evaluate it and take it back, choose move with highest score """
     for column in valid_columns:
-        c_board = apply_player_action(board, column, player, True)
-        score = evaluate_board(c_board, player)
+        apply_player_action(board, column, player, heights=heights)
+        score = evaluate_board(board, player)
+        undo_player_action(board, column, heights)
         if score > best_column_score:
             best_column_score = score
             best_column = column
 
     return best_column, saved_state
+
+
+DEFAULT_BATCH_DEPTH = 2  # search depth of generate_moves_minimax_batch, the batch grows by cols per ply
+
+
+def expand_boards(boards: np.ndarray, players: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    all children of a stack of boards (N, rows, cols): every board is repeated cols times and column c is played
+    by players[i] in the c-th copy of boards[i]
+    Return
+    -----------
+    Tuple [children (N * cols, rows, cols), legal moves (N, cols), see valid_moves_mask], the children of illegal
+    moves are copies of their parent
+    """
+    n_boards, _, cols = boards.shape
+    children = np.repeat(boards, cols, axis=0)
+    apply_player_actions(children, np.tile(np.arange(cols), n_boards), np.repeat(players, cols))
+    return children, valid_moves_mask(boards)
+
+
+def pick_smart_moves_batch(
+        boards: np.ndarray, players, saved_states: Optional[list] = None, connect_n: int = DEFAULT_CONFIG.connect_n
+) -> Tuple[np.ndarray, Optional[list]]:
+    """
+    batched pick_smart_move: the children of all boards are evaluated in one call of evaluate_boards
+    Parameters
+    -----------
+    boards: np.ndarray
+        boards of shape (N, rows, cols), one per game
+    players: BoardPiece or np.ndarray
+        player to move, one for all boards or an array of shape (N,)
+    saved_states: list, optional
+        returned unchanged
+    connect_n: int
+        number of pieces in a row which win (GameConfig.connect_n)
+
+    Return
+    -----------
+    actions: np.ndarray
+        array (N,): column with the highest positive score, a random valid column if no score is positive
+        (-1 for full boards)
+    """
+    from agents.agent_random.random import generate_moves_random_batch
+
+    n_boards, _, cols = boards.shape
+    players = np.broadcast_to(np.asarray(players, dtype=BoardPiece), (n_boards,))
+    children, valid = expand_boards(boards, players)
+    scores = evaluate_boards(children, np.repeat(players, cols), connect_n).reshape(n_boards, cols)
+    scores = np.where(valid, scores, -np.inf)
+
+    random_actions, _ = generate_moves_random_batch(boards, players)
+    actions = np.where(scores.max(axis=1) > 0, np.argmax(scores, axis=1), random_actions).astype(PlayerAction)
+    return actions, saved_states
+
+
+def negamax_batch(
+        boards: np.ndarray, players, depth: int, connect_n: int = DEFAULT_CONFIG.connect_n
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Full-width minimax search (negamax, without pruning) of a stack of boards at once: all positions of a ply are
+    expanded, checked for wins (connected_four_boards) and evaluated (evaluate_boards) as one batch, so the
+    cost per board is amortized. Returns the same moves and values as minimax(board, depth, player, True) for
+    every board; the batch grows by a factor of cols per ply, so it is meant for shallow depths.
+    Parameters
+    -----------
+    boards: np.ndarray
+        boards of shape (N, rows, cols) of running games
+    players: BoardPiece or np.ndarray
+        player to move, one for all boards or an array of shape (N,)
+    depth: int
+        search depth (>= 1)
+    connect_n: int
+        number of pieces in a row which win (GameConfig.connect_n)
+
+    Return
+    -----------
+    Tuple [actions (N,) (best column, -1 for full boards), values (N,) from the view of the player to move]
+    """
+    n_boards, _, cols = boards.shape
+    players = np.broadcast_to(np.asarray(players, dtype=BoardPiece), (n_boards,))
+    children, valid = expand_boards(boards, players)
+    movers = np.repeat(players, cols)
+
+    """values of the children from the view of the player who moved into them"""
+    if depth > 1:
+        _, values = negamax_batch(children, np.where(movers == PLAYER1, PLAYER2, PLAYER1), depth - 1, connect_n)
+        values = -values
+    else:
+        values = evaluate_boards(children, movers, connect_n).astype(float)
+    values = np.where(valid_moves_mask(children).any(axis=1), values, 0.0)  # draw
+    won = connected_four_boards(children, movers, connect_n)
+    n_pieces = np.count_nonzero(children.reshape(len(children), -1), axis=1)
+    values = np.where(won, WIN_SCORE - n_pieces, values)  # earlier wins are worth more
+    values = np.where(valid.reshape(-1), values, -np.inf).reshape(n_boards, cols)
+
+    actions = np.argmax(values, axis=1)
+    best_values = values[np.arange(n_boards), actions]
+    actions[~valid.any(axis=1)] = -1
+    return actions.astype(PlayerAction), best_values
+
+
+def generate_moves_minimax_batch(
+        boards: np.ndarray, players, saved_states: Optional[list] = None, depth: int = DEFAULT_BATCH_DEPTH,
+        connect_n: int = DEFAULT_CONFIG.connect_n
+) -> Tuple[np.ndarray, Optional[list]]:
+    """
+    batched shallow minimax for serving many games at once (see negamax_batch), works on any board size
+    Parameters
+    -----------
+    boards: np.ndarray
+        boards of shape (N, rows, cols), one per game
+    players: BoardPiece or np.ndarray
+        player to move, one for all boards or an array of shape (N,)
+    saved_states: list, optional
+        returned unchanged (the batched search keeps no state between moves)
+    depth: int
+        search depth
+    connect_n: int
+        number of pieces in a row which win (GameConfig.connect_n)
+
+    Return
+    -----------
+    actions: np.ndarray
+        array (N,) of the best columns
+    saved_states
+    """
+    actions, _ = negamax_batch(boards, players, depth, connect_n)
+    return actions, saved_states
@@ -0,0 +1,99 @@
+from typing import List
+from agents.common import BoardPiece, PlayerAction
+from agents.bitboard import BitBoard, ROWS, COLS, COL_BITS
+
+"""
+Move ordering for the alpha-beta search. The earlier the best move is searched, the earlier the cut-offs happen.
+An ordering object is asked for the order of the valid columns at every node (order) and is told about every
+move causing a cut-off (cutoff), which the killer and history heuristics learn from.
+"""
+
+CENTER_ORDER = sorted(range(COLS), key=lambda col: abs(col - COLS // 2))  # [3, 2, 4, 1, 5, 0, 6]
+
+
+class MoveOrdering:
+    def __init__(self, hash_move_first: bool = True):
+        """
+        Natural (left to right) order of the columns
+        hash_move_first: search the best move stored in the transposition table first
+        """
+        self.hash_move_first = hash_move_first
+
+    def order(self, columns: List[int], position: BitBoard, player: BoardPiece, hash_move: int) -> List[int]:
+        """
+        Return the valid columns in the order they are supposed to be searched
+        Parameters
+        -----------
+        columns: list of valid columns in natural order
+        position: current position, player to move
+        player: player to move
+        hash_move: best move stored in the transposition table for the position, -1 if there is none
+        """
+        return self._hash_move_first(columns, hash_move)
+
+    def cutoff(self, position: BitBoard, column: PlayerAction, player: BoardPiece, depth: int):
+        """
+        Called when playing column in position caused a cut-off (position is restored already)
+        """
+        pass
+
+    def new_search(self):
+        """
+        Called before the search for a new move of the game
+        """
+        pass
+
+    def _hash_move_first(self, columns: List[int], hash_move: int) -> List[int]:
+        if self.hash_move_first and hash_move in columns:
+            columns.remove(hash_move)
+            columns.insert(0, hash_move)
+        return columns
+
+
+class CenterFirstOrdering(MoveOrdering):
+    """
+    Static order, central columns first (they take part in the most windows)
+    """
+
+    def order(self, columns: List[int], position: BitBoard, player: BoardPiece, hash_move: int) -> List[int]:
+        columns = [col for col in CENTER_ORDER if col in columns]
+        return self._hash_move_first(columns, hash_move)
+
+
+class KillerHistoryOrdering(MoveOrdering):
+    def __init__(self, hash_move_first: bool = True, n_killers: int = 2):
+        """
+        Dynamic order: hash move, killer moves of the same ply (moves which caused cut-offs in sibling nodes),
+        then the remaining moves by their history score (sum of depth**2 of all cut-offs caused by the move),
+        ties are broken center first
+        """
+        super().__init__(hash_move_first)
+        self.n_killers = n_killers
+        self.killers = [[] for _ in range(ROWS * COLS + 1)]  # killer columns by number of pieces on the board
+        self.history = [[0] * (COLS * COL_BITS) for _ in range(3)]  # score by [player][bit index of the cell]
+
+    def order(self, columns: List[int], position: BitBoard, player: BoardPiece, hash_move: int) -> List[int]:
+        history = self.history[player]
+        heights = position.heights
+        columns = sorted(
+            columns, key=lambda col: (-history[heights[col]], CENTER_ORDER.index(col))
+        )
+        for killer in reversed(self.killers[position.n_moves]):
+            if killer in columns:
+                columns.remove(killer)
+                columns.insert(0, killer)
+        return self._hash_move_first(columns, hash_move)
+
+    def cutoff(self, position: BitBoard, column: PlayerAction, player: BoardPiece, depth: int):
+        self.history[player][position.heights[column]] += depth * depth
+        killers = self.killers[position.n_moves]
+        if column not in killers:
+            killers.insert(0, column)
+            del killers[self.n_killers:]
+
+    def new_search(self):
+        """killers belong to the old root, history scores are aged (halved)"""
+        self.killers = [[] for _ in range(ROWS * COLS + 1)]
+        for player_history in self.history:
+            for cell in range(len(player_history)):
+                player_history[cell] //= 2
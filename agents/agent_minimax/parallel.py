@@ -0,0 +1,149 @@
+import itertools
+import os
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Optional
+from agents.common import BoardPiece, PlayerAction, PLAYER1, PLAYER2
+from agents.bitboard import BitBoard
+from agents.pool import get_pool, default_n_workers
+from agents.agent_minimax.minimax import alpha_beta_bitboard, search_position, SearchStats
+from agents.agent_minimax.ordering import MoveOrdering, CenterFirstOrdering, KillerHistoryOrdering
+from agents.agent_minimax.transposition import TranspositionTable
+
+"""
+Parallel alpha-beta search, splitting the moves at the root between the processes of a persistent pool
+(Young Brothers Wait): the first root move is searched alone, the remaining moves are searched in parallel with
+the best value found so far as lower bound. Every worker process of the persistent pool (see agents.pool) keeps
+its own transposition table and move ordering, they are reset when a task of a new search arrives: entries of an
+earlier (e.g. deeper) search would otherwise cut off the current one with values of another depth. The iterations
+of an iterative deepening share one search id (see new_search_id), so they build on the entries of the previous
+iterations like the serial search.
+"""
+
+_worker_tt = None  # transposition table of the worker process
+_worker_ordering = None  # move ordering of the worker process
+_worker_search = None  # id of the search the worker tables belong to
+_search_ids = itertools.count()  # ids of the searches started by this process
+
+
+def new_search_id() -> tuple:
+    """id of a new search, unique across the processes sharing the pool"""
+    return os.getpid(), next(_search_ids)
+
+
+def _search_root_move(
+        position: BitBoard, column: PlayerAction, player: BoardPiece, depth: int, alpha, beta,
+        deadline: Optional[float], pvs: bool, search_id=None
+):
+    """
+    Worker task: value of playing column in position, searched with the window (alpha, beta); the transposition
+    table and move ordering of the worker are reset if search_id differs from the one of the previous task
+    Return
+    -----------
+    Tuple [column, heuristic_value from the view of player, SearchStats of the task (depths from position)]
+    """
+    global _worker_tt, _worker_ordering, _worker_search
+    if _worker_tt is None:
+        _worker_tt = TranspositionTable()
+        _worker_ordering = KillerHistoryOrdering()
+    if search_id != _worker_search:
+        _worker_tt.clear()
+        _worker_ordering.new_search()
+        _worker_search = search_id
+
+    opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+    position = search_position(position)
+    stats = SearchStats()
+    stats.root_moves = position.n_moves
+    position.play(column, player)
+    _, value = alpha_beta_bitboard(
+        position, depth - 1, opponent, -beta, -alpha, _worker_tt, deadline, _worker_ordering, pvs, stats
+    )
+    return column, -value, stats
+
+
+def parallel_alpha_beta(
+        board, depth: int, player: BoardPiece, n_workers: Optional[int] = None, deadline: Optional[float] = None,
+        ordering: Optional[MoveOrdering] = None, pvs: bool = False, first_move: int = -1,
+        stats: Optional[SearchStats] = None, search_id: Optional[tuple] = None
+):
+    """
+    Root-split alpha-beta search on a process pool, returns the same move and value as alpha_beta_bitboard
+    with the same order of the root moves
+    Parameters
+    -----------
+    board: np.ndarray or BitBoard
+        board reflecting current game state
+    depth: int
+        depth explored by the algorithm
+    player: BoardPiece
+        player to move, the value is returned from the view of this player
+    n_workers: int, optional
+        number of worker processes, all cores by default
+    deadline: float, optional
+        time.time() at which the search is aborted by raising SearchTimeout
+    ordering: MoveOrdering, optional
+        ordering of the root moves (CenterFirstOrdering by default)
+    pvs: bool
+        use principal variation search in the workers
+    first_move: int
+        move searched first (e.g. best move of the previous iteration), -1 for none
+    stats: SearchStats, optional
+        the counters of the worker tasks are merged into it (the root counts as one node)
+    search_id: tuple, optional
+        id of the search (see new_search_id), the worker tables are kept while it stays the same, a new search
+        with empty worker tables by default
+
+    Return
+    -----------
+    Tuple [action (best column), heuristic_value]
+    """
+
+    position = BitBoard.from_array(board) if isinstance(board, np.ndarray) else board
+    opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+
+    """terminal positions and leaves are not worth distributing"""
+    if depth == 0 or position.is_full() or position.connected_four(opponent):
+        return alpha_beta_bitboard(search_position(position), depth, player, -np.inf, np.inf, stats=stats)
+
+    if ordering is None:
+        ordering = CenterFirstOrdering()
+    columns = ordering.order(position.valid_columns(), position, player, first_move)
+    position = BitBoard.from_position(position)  # plain bitboard is sent to the workers
+    n_workers = default_n_workers() if n_workers is None else n_workers
+    pool = get_pool(n_workers)
+    search_id = new_search_id() if search_id is None else search_id
+
+    """eldest brother: the first move is searched alone with the full window to get a bound"""
+    column, alpha, task_stats = pool.submit(
+        _search_root_move, position, columns[0], player, depth, -np.inf, np.inf, deadline, pvs, search_id
+    ).result()
+    values = {column: alpha}
+    if stats is None:
+        stats = SearchStats()
+    stats.nodes += 1
+    stats.merge(task_stats)
+
+    """younger brothers: searched in parallel, every submitted task gets the best value so far as bound"""
+    waiting = list(columns[1:])
+    running = set()
+    try:
+        while waiting or running:
+            while waiting and len(running) < n_workers:
+                running.add(pool.submit(
+                    _search_root_move, position, waiting.pop(0), player, depth, alpha, np.inf, deadline, pvs, search_id
+                ))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                column, value, task_stats = future.result()
+                values[column] = value
+                stats.merge(task_stats)
+                alpha = max(alpha, value)
+    finally:
+        for future in running:
+            future.cancel()
+
+    """first move in root order with the best value, the same tie break as the serial search"""
+    best_value = max(values.values())
+    best_column = next(column for column in columns if values[column] == best_value)
+    return best_column, best_value
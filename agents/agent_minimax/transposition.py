@@ -0,0 +1,76 @@
+from typing import Optional, NamedTuple
+
+"""
+Transposition table for the alpha-beta search, indexed by the Zobrist hash of the position (see agents.bitboard).
+The table has a fixed number of slots (size cap), a slot is chosen by key % size and the full key is stored
+to detect collisions of different positions in the same slot.
+"""
+
+EXACT = 0  # value is the exact minimax value of the position
+LOWER_BOUND = 1  # search failed high (value >= beta), true value is at least value
+UPPER_BOUND = 2  # search failed low (value <= alpha), true value is at most value
+
+DEFAULT_TT_SIZE = 1 << 20  # number of slots
+
+
+class TTEntry(NamedTuple):
+    key: int  # Zobrist key of the position
+    depth: int  # remaining search depth the value was computed with
+    value: float  # value from the view of the player to move
+    flag: int  # EXACT, LOWER_BOUND or UPPER_BOUND
+    move: int  # best (or refuting) move found, -1 if none
+    generation: int  # search (move of the game) in which the entry was stored
+
+
+class TranspositionTable:
+    def __init__(self, size: int = DEFAULT_TT_SIZE):
+        """
+        Transposition table with a fixed number of slots
+        Replacement policy: a slot is overwritten if it is empty, holds the same position, was stored in an
+        earlier search (generation) or was searched less deep than the new entry (depth-preferred)
+        :type size: int
+        """
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+        self.n_entries = 0
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """
+        Return the entry stored for key, or None if the position is not in the table
+        """
+        self.probes += 1
+        entry = self.slots[key % self.size]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, value: float, flag: int, move: int):
+        """
+        Store a search result for key, according to the replacement policy
+        """
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is None:
+            self.n_entries += 1
+        elif entry.key != key and entry.generation == self.generation and entry.depth > depth:
+            return  # keep the deeper entry of the current search
+        self.slots[index] = TTEntry(key, depth, value, flag, move, self.generation)
+
+    def new_search(self):
+        """
+        Mark all current entries as old, they are kept for lookups but replaced first
+        """
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.n_entries = 0
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return self.n_entries
@@ -1,2 +1,2 @@
 from .random import generate_move_random as generate_move
-
+from .random import generate_moves_random_batch as generate_moves_batch
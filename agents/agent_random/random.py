@@ -2,27 +2,55 @@ import numpy as np
 from agents.common import *
 
 def generate_move_random(
-    board: np.ndarray, saved_state: Optional[SavedState]
+    board: np.ndarray, player: BoardPiece, saved_state: Optional[SavedState]
 ) -> Tuple[PlayerAction, Optional[SavedState]]:
     """return a randomly chosen valid column as `action`
     Parameters
     -----------
     board: np.ndarray
         board reflecting current game state
+    player: BoardPiece
+        player to move (not needed for a random move, part of the GenMove signature)
+    saved_state: SavedState
+        returned unchanged
     Return
     -----------
-    action: int
+    action: PlayerAction
     """
 
     #check if board is already full
-    if np.all(board != 0) == True:
+    valid_columns = np.flatnonzero(board[-1] == NO_PLAYER)
+    if len(valid_columns) == 0:
         print("Error-generating_random_move, board is full")
-        return -1, saved_state
+        return PlayerAction(-1), saved_state
 
-    action = np.random.randint(0,7,1)
-
-    while board[5,action] != 0:
-        action = np.random.randint(0, 7, 1)
+    action = PlayerAction(np.random.choice(valid_columns))
 
     return action, saved_state
 
+
+def generate_moves_random_batch(
+    boards: np.ndarray, players: np.ndarray, saved_states: Optional[list] = None
+) -> Tuple[np.ndarray, Optional[list]]:
+    """return a randomly chosen valid column for every board of a batch of games
+    Parameters
+    -----------
+    boards: np.ndarray
+        boards of shape (N, rows, cols), one per game
+    players: np.ndarray
+        player to move in every game (not needed for random moves, part of the GenMoveBatch signature)
+    saved_states: list
+        returned unchanged
+    Return
+    -----------
+    actions: np.ndarray
+        array (N,) of PlayerAction, -1 for full boards
+    """
+
+    valid = valid_moves_mask(boards)
+    keys = np.random.random(valid.shape)
+    keys[~valid] = -1
+    actions = np.argmax(keys, axis=1).astype(PlayerAction)
+    actions[~valid.any(axis=1)] = -1
+
+    return actions, saved_states
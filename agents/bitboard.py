@@ -0,0 +1,263 @@
+import numpy as np
+import random
+from typing import List, Tuple
+from agents.common import BoardPiece, PlayerAction, PLAYER1, PLAYER2
+
+"""
+Bitboard representation of a connect-4 position.
+Every column uses ROWS + 1 bits (column-major), bit index = col * COL_BITS + row, row 0 is the bottom row
+(same as board[0, :] in the ndarray representation). The extra sentinel bit on top of each column keeps
+the shifts used for the win detection from wrapping into the next column.
+"""
+
+ROWS = 6
+COLS = 7
+COL_BITS = ROWS + 1
+
+BOTTOM_MASK = sum(1 << (c * COL_BITS) for c in range(COLS))  # lowest cell of every column
+BOARD_MASK = BOTTOM_MASK * ((1 << ROWS) - 1)  # all playable cells
+TOP_MASK = BOTTOM_MASK << (ROWS - 1)  # highest playable cell of every column
+
+""" bit value of every cell of the ndarray board, used for the conversion ndarray <-> bitboard"""
+CELL_BITS = np.array([[1 << (c * COL_BITS + r) for c in range(COLS)] for r in range(ROWS)], dtype=np.uint64)
+
+""" shifts for the vertical, horizontal and the two diagonal directions """
+DIRECTIONS = (1, COL_BITS, COL_BITS - 1, COL_BITS + 1)
+
+
+def _window_masks(window_length: int = 4) -> tuple:
+    """ bitmasks of all windows of window_length cells in a row (horizontal, vertical and diagonal) """
+    masks = []
+    for c in range(COLS):
+        for r in range(ROWS):
+            for dc, dr in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                end_c, end_r = c + dc * (window_length - 1), r + dr * (window_length - 1)
+                if 0 <= end_c < COLS and 0 <= end_r < ROWS:
+                    masks.append(sum(1 << ((c + dc * i) * COL_BITS + r + dr * i) for i in range(window_length)))
+    return tuple(masks)
+
+
+WINDOW_MASKS = _window_masks()  # 69 windows for the 6x7 board
+
+""" Zobrist keys: one random 64 bit number per (player, bit index), fixed seed so hashes are reproducible"""
+_zobrist_rng = random.Random(20210126)
+ZOBRIST = [[0] * (COLS * COL_BITS)] + [
+    [_zobrist_rng.getrandbits(64) for _ in range(COLS * COL_BITS)] for _ in (PLAYER1, PLAYER2)
+]
+ZOBRIST_PLAYER2 = _zobrist_rng.getrandbits(64)  # xor-ed into the key if PLAYER2 is to move
+
+""" left-right symmetry: bit index of the mirrored cell (column col -> COLS - 1 - col) of every bit index"""
+MIRROR_BIT = [(COLS - 1 - index // COL_BITS) * COL_BITS + index % COL_BITS for index in range(COLS * COL_BITS)]
+COLUMN_MASK = (1 << COL_BITS) - 1
+
+
+def mirror_bits(bits: int) -> int:
+    """ bitmask of the cells of bits mirrored at the central column """
+    mirrored = 0
+    for col in range(COLS):
+        mirrored |= ((bits >> (col * COL_BITS)) & COLUMN_MASK) << ((COLS - 1 - col) * COL_BITS)
+    return mirrored
+
+
+def mirror_action(action: PlayerAction) -> PlayerAction:
+    """ column of the mirrored position corresponding to action """
+    return PlayerAction(COLS - 1 - action)
+
+
+def connected_four_bits(bits: int) -> bool:
+    """
+    shift-and-mask check for four pieces in a row in the bitmask of one player
+    Parameters
+    -----------
+    bits: int
+        bitmask of the pieces of one player
+
+    Return
+    -----------
+    True if the pieces contain four in a row in any direction
+    """
+    for shift in DIRECTIONS:
+        pairs = bits & (bits >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
+class BitBoard:
+    """
+    Connect-4 position stored as one bitmask per player plus the height of every column
+    pieces[PLAYER1], pieces[PLAYER2]: bitmasks of the pieces of the players (pieces[NO_PLAYER] is unused)
+    heights[col]: bit index of the next free cell in column col
+    n_moves: number of pieces on the board
+    hash: Zobrist hash of the pieces, updated incrementally by play and undo
+    mirror_hash: Zobrist hash of the mirrored position (see mirrored), updated the same way
+    """
+    __slots__ = ("pieces", "heights", "n_moves", "hash", "mirror_hash")
+
+    def __init__(self):
+        self.pieces = [0, 0, 0]
+        self.heights = [c * COL_BITS for c in range(COLS)]
+        self.n_moves = 0
+        self.hash = 0
+        self.mirror_hash = 0
+
+    @classmethod
+    def from_array(cls, board: np.ndarray) -> "BitBoard":
+        """
+        lossless conversion of an ndarray board (shape (6, 7), dtype BoardPiece) into a bitboard,
+        other board shapes (GameConfig) are not supported by the bitboard
+        """
+        if board.shape != (ROWS, COLS):
+            raise ValueError(f"the bitboard holds {ROWS}x{COLS} boards, not {board.shape[0]}x{board.shape[1]}")
+        position = cls()
+        position.pieces[PLAYER1] = int(CELL_BITS[board == PLAYER1].sum())
+        position.pieces[PLAYER2] = int(CELL_BITS[board == PLAYER2].sum())
+        column_counts = np.count_nonzero(board, axis=0)
+        position.heights = [c * COL_BITS + int(n) for c, n in enumerate(column_counts)]
+        position.n_moves = int(column_counts.sum())
+        for player in (PLAYER1, PLAYER2):
+            for row, col in zip(*np.nonzero(board == player)):
+                position.hash ^= ZOBRIST[player][col * COL_BITS + row]
+                position.mirror_hash ^= ZOBRIST[player][MIRROR_BIT[col * COL_BITS + row]]
+        return position
+
+    @classmethod
+    def from_position(cls, position: "BitBoard") -> "BitBoard":
+        """
+        copy of position as an instance of cls (e.g. a plain BitBoard of a subclass instance)
+        """
+        new_position = cls.__new__(cls)
+        new_position.pieces = position.pieces.copy()
+        new_position.heights = position.heights.copy()
+        new_position.n_moves = position.n_moves
+        new_position.hash = position.hash
+        new_position.mirror_hash = position.mirror_hash
+        return new_position
+
+    def to_array(self) -> np.ndarray:
+        """
+        lossless conversion of the bitboard into an ndarray board (shape (6, 7), dtype BoardPiece)
+        """
+        board = np.zeros((ROWS, COLS), dtype=BoardPiece)
+        board[(CELL_BITS & np.uint64(self.pieces[PLAYER1])) != 0] = PLAYER1
+        board[(CELL_BITS & np.uint64(self.pieces[PLAYER2])) != 0] = PLAYER2
+        return board
+
+    def copy(self) -> "BitBoard":
+        position = type(self).__new__(type(self))
+        position.pieces = self.pieces.copy()
+        position.heights = self.heights.copy()
+        position.n_moves = self.n_moves
+        position.hash = self.hash
+        position.mirror_hash = self.mirror_hash
+        return position
+
+    def mirrored(self) -> "BitBoard":
+        """ copy of the position mirrored at the central column (left-right symmetry) """
+        position = self.copy()
+        position.pieces = [0, mirror_bits(self.pieces[PLAYER1]), mirror_bits(self.pieces[PLAYER2])]
+        position.heights = [
+            col * COL_BITS + self.heights[COLS - 1 - col] - (COLS - 1 - col) * COL_BITS for col in range(COLS)
+        ]
+        position.hash, position.mirror_hash = self.mirror_hash, self.hash
+        return position
+
+    def key(self) -> tuple:
+        """ hashable key identifying the position """
+        return self.pieces[PLAYER1], self.pieces[PLAYER2]
+
+    def zobrist_key(self, player: BoardPiece) -> int:
+        """ Zobrist hash of the position with player to move """
+        return self.hash ^ ZOBRIST_PLAYER2 if player == PLAYER2 else self.hash
+
+    def compact_key(self, player: BoardPiece) -> int:
+        """
+        unique 64 bit key of the position with player to move (no collisions, unlike the Zobrist hash):
+        pieces of PLAYER1 plus the occupied cells plus the bottom row, which marks the height of every column
+        with a single bit above the pieces, bit 63 is set if PLAYER2 is to move
+        """
+        key = self.pieces[PLAYER1] + self.occupied() + BOTTOM_MASK
+        return key | (1 << 63) if player == PLAYER2 else key
+
+    def canonical_key(self, player: BoardPiece) -> Tuple[int, bool]:
+        """
+        compact_key of the canonical form of the position: the smaller key of the position and its mirror image,
+        both have the same value (moves map with mirror_action)
+        Return
+        -----------
+        Tuple [key, True if the key belongs to the mirrored position]
+        """
+        key = self.compact_key(player)
+        mirrored_key = mirror_bits(key & ~(1 << 63)) | (key & (1 << 63))
+        return (mirrored_key, True) if mirrored_key < key else (key, False)
+
+    def canonical_zobrist_key(self, player: BoardPiece) -> Tuple[int, bool]:
+        """
+        Zobrist hash of the canonical form of the position with player to move, see canonical_key
+        Return
+        -----------
+        Tuple [hash, True if the hash belongs to the mirrored position]
+        """
+        key, mirrored_key = self.hash, self.mirror_hash
+        if player == PLAYER2:
+            key, mirrored_key = key ^ ZOBRIST_PLAYER2, mirrored_key ^ ZOBRIST_PLAYER2
+        return (mirrored_key, True) if mirrored_key < key else (key, False)
+
+    def occupied(self) -> int:
+        """ bitmask of all occupied cells """
+        return self.pieces[PLAYER1] | self.pieces[PLAYER2]
+
+    def can_play(self, action: PlayerAction) -> bool:
+        return self.heights[action] < action * COL_BITS + ROWS
+
+    def play(self, action: PlayerAction, player: BoardPiece) -> "BitBoard":
+        """
+        O(1) move application: drop a piece of player into column action (in place), the position is returned
+        """
+        index = self.heights[action]
+        self.pieces[player] |= 1 << index
+        self.hash ^= ZOBRIST[player][index]
+        self.mirror_hash ^= ZOBRIST[player][MIRROR_BIT[index]]
+        self.heights[action] = index + 1
+        self.n_moves += 1
+        return self
+
+    def undo(self, action: PlayerAction) -> "BitBoard":
+        """
+        O(1) inverse of play: remove the topmost piece of column action (in place), the position is returned
+        """
+        index = self.heights[action] - 1
+        bit = 1 << index
+        player = PLAYER1 if self.pieces[PLAYER1] & bit else PLAYER2
+        self.pieces[player] ^= bit
+        self.hash ^= ZOBRIST[player][index]
+        self.mirror_hash ^= ZOBRIST[player][MIRROR_BIT[index]]
+        self.heights[action] = index
+        self.n_moves -= 1
+        return self
+
+    def valid_moves_mask(self) -> int:
+        """ bitmask of the valid columns, bit c is set if column c is not full """
+        heights = self.heights
+        mask = 0
+        for col in range(COLS):
+            if heights[col] < col * COL_BITS + ROWS:
+                mask |= 1 << col
+        return mask
+
+    def valid_columns(self) -> List[int]:
+        """ list of all columns with possible valid moves, equivalent of get_valid_columns """
+        heights = self.heights
+        return [col for col in range(COLS) if heights[col] < col * COL_BITS + ROWS]
+
+    def is_full(self) -> bool:
+        return self.n_moves == ROWS * COLS
+
+    def connected_four(self, player: BoardPiece) -> bool:
+        return connected_four_bits(self.pieces[player])
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, BitBoard) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
@@ -0,0 +1,192 @@
+import argparse
+import numpy as np
+import os
+import time
+from typing import Optional, Tuple
+from agents.common import BoardPiece, PlayerAction, PLAYER1, PLAYER2, initialize_game_state
+from agents.bitboard import BitBoard, mirror_action
+
+"""
+Opening book: exact values and best moves of positions, precomputed by the perfect-play solver
+(see agents.agent_minimax.minimax.solve) and stored on disk as a sorted NumPy array of BOOK_DTYPE records.
+The file is memory-mapped (np.load with mmap_mode), a lookup is a binary search on the keys, so the book is
+shared by all processes mapping the same file and costs no search time.
+The key of a position is the canonical (left-right symmetric) BitBoard.compact_key (see book_key), mirror images
+share a record, the move is stored for the canonical position and mapped back by lookup.
+
+Building a book for all positions up to n plies from the empty board (or from another position):
+    python -m agents.book build book.npy --plies 4 [--runtime 60]
+"""
+
+BOOK_DTYPE = np.dtype([("key", "<u8"), ("value", "<i4"), ("move", "i1")])
+BOOK_ENV = "CONNECT4_BOOK"  # environment variable with the path of the default book
+
+
+def book_key(position: BitBoard, player: BoardPiece) -> Tuple[int, bool]:
+    """
+    key of position with player to move in the book, True if the key belongs to the mirrored position
+    (see BitBoard.canonical_key)
+    """
+    return position.canonical_key(player)
+
+
+class OpeningBook:
+    def __init__(self, path: str):
+        """
+        Read-only book memory-mapped from the file at path (written by write_book)
+        """
+        self.path = path
+        self.records = np.load(path, mmap_mode="r")
+        if self.records.dtype != BOOK_DTYPE:
+            raise ValueError(f"{path} is not an opening book (dtype {self.records.dtype})")
+        self.keys = self.records["key"]
+
+    def lookup(self, board, player: BoardPiece) -> Optional[Tuple[PlayerAction, int]]:
+        """
+        Return (best move, exact value for player) of the position, None if it is not in the book
+        :type board: np.ndarray or BitBoard
+        """
+        position = board if isinstance(board, BitBoard) else BitBoard.from_array(board)
+        key, mirrored = book_key(position, player)
+        key = np.uint64(key)
+        index = int(np.searchsorted(self.keys, key))
+        if index == len(self.keys) or self.keys[index] != key:
+            return None
+        record = self.records[index]
+        move = PlayerAction(record["move"])
+        return mirror_action(move) if mirrored and move >= 0 else move, int(record["value"])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, key: int) -> bool:
+        index = int(np.searchsorted(self.keys, np.uint64(key)))
+        return index < len(self.keys) and self.keys[index] == key
+
+
+_books = {}  # books mapped by this process, by path
+
+
+def get_book(book=None) -> Optional[OpeningBook]:
+    """
+    Return the book to consult: an OpeningBook is returned as it is, a path is mapped once per process,
+    None stands for the book at the path in the environment variable CONNECT4_BOOK (None if it is not set),
+    False for no book
+    """
+    if book is False:
+        return None
+    if isinstance(book, OpeningBook):
+        return book
+    if book is None:
+        book = os.environ.get(BOOK_ENV)
+        if not book:
+            return None
+    if book not in _books:
+        _books[book] = OpeningBook(book)
+    return _books[book]
+
+
+def enumerate_positions(position: BitBoard, player: BoardPiece, plies: int) -> dict:
+    """
+    all positions (not finished games) reachable from position in at most plies moves
+    Return
+    -----------
+    dict book_key -> (position, player to move), one of every pair of mirror images
+    """
+    positions = {}
+    frontier = [(position.copy(), player)]
+    for ply in range(plies + 1):
+        next_frontier = []
+        for current, to_move in frontier:
+            key, _ = book_key(current, to_move)
+            if key in positions:
+                continue
+            positions[key] = (current, to_move)
+            if ply == plies:
+                continue
+            opponent = PLAYER2 if to_move == PLAYER1 else PLAYER1
+            for column in current.valid_columns():
+                child = current.copy().play(column, to_move)
+                if not child.connected_four(to_move) and not child.is_full():
+                    next_frontier.append((child, opponent))
+        frontier = next_frontier
+    return positions
+
+
+def build_book(
+        plies: int, board: Optional[np.ndarray] = None, player: BoardPiece = PLAYER1,
+        runtime: Optional[float] = None, verbose: bool = False
+) -> np.ndarray:
+    """
+    Solve all positions up to plies moves from board (the empty board by default) with the perfect-play
+    solver, the deepest positions first, so the shared transposition table makes the shallower ones cheap
+    Parameters
+    -----------
+    plies: int
+        number of moves from board
+    board: np.ndarray, optional
+        start position, the empty board if None
+    player: BoardPiece
+        player to move in board
+    runtime: float, optional
+        time budget in seconds per position, positions which are not solved in time are left out
+    verbose: bool
+        print the progress
+
+    Return
+    -----------
+    records of the solved positions (BOOK_DTYPE), sorted by key
+    """
+    from agents.agent_minimax.minimax import solve, SearchTimeout
+    from agents.agent_minimax.transposition import TranspositionTable
+
+    position = BitBoard.from_array(initialize_game_state() if board is None else board)
+    positions = enumerate_positions(position, player, plies)
+    tt = TranspositionTable()
+
+    records = []
+    for key, (current, to_move) in sorted(positions.items(), key=lambda item: -item[1][0].n_moves):
+        deadline = None if runtime is None else time.time() + runtime
+        try:
+            move, value = solve(current, to_move, tt, deadline=deadline)
+        except SearchTimeout:
+            continue
+        if book_key(current, to_move)[1] and move >= 0:
+            move = mirror_action(move)  # the move of the canonical position is stored
+        records.append((key, value, move))
+        if verbose:
+            print(f"{len(records)}/{len(positions)} solved")
+
+    book = np.array(records, dtype=BOOK_DTYPE)
+    book.sort(order="key")
+    return book
+
+
+def write_book(path: str, records: np.ndarray):
+    """
+    Write the records (BOOK_DTYPE, sorted by key) to path, merged with the records of an existing book
+    """
+    if os.path.exists(path):
+        old_records = np.load(path)
+        records = np.concatenate([old_records[~np.isin(old_records["key"], records["key"])], records])
+        records.sort(order="key")
+    np.save(path, records)
+    _books.pop(path, None)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="build an opening book for connect 4")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="solve all positions up to a number of plies")
+    build_parser.add_argument("path", help="book file (.npy), existing records are kept")
+    build_parser.add_argument("--plies", type=int, default=4, help="number of plies from the empty board")
+    build_parser.add_argument("--runtime", type=float, default=None, help="time budget per position (seconds)")
+    args = parser.parse_args(args)
+
+    records = build_book(args.plies, runtime=args.runtime, verbose=True)
+    write_book(args.path, records)
+    print(f"{len(records)} positions written to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import numpy as np
 from enum import Enum
 import copy
-from typing import Optional, Callable, Tuple
+from functools import lru_cache
+from typing import Optional, Callable, Tuple, NamedTuple
+from agents import kernels
 # from numpy.core._multiarray_umath import ndarray
 
 
@@ -27,10 +29,65 @@ GenMove = Callable[
         Tuple[PlayerAction, Optional[SavedState]]  # Return type of the generate_move function
         ]
 
+GenMoveBatch = Callable[
+        [np.ndarray, np.ndarray, Optional[list]],  # boards (N, rows, cols), players (N,), saved states (N)
+        Tuple[np.ndarray, Optional[list]]  # actions (N,) and saved states of a batched generate_moves function
+        ]
+
+
+class GameConfig(NamedTuple):
+    """
+    Geometry and rule of a game variant: board of rows x cols, connect_n pieces in a row win.
+    Functions working on a board read rows and cols from board.shape and take connect_n as argument,
+    the tables derived from a config (see line_indices) are computed once and cached.
+    """
+    rows: int = 6
+    cols: int = 7
+    connect_n: int = 4
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.cols
+
+
+DEFAULT_CONFIG = GameConfig()  # standard connect 4, the only variant the bitboard agents (minimax, mcts) play
+PIECE_SYMBOLS = (" ", "x", "o")  # symbols of NO_PLAYER, PLAYER1 and PLAYER2 in pretty_print_board
 
-def initialize_game_state() -> np.ndarray:
-    """Returns an ndarray, shape (6, 7) and data type (dtype) BoardPiece, initialized to 0 (NO_PLAYER). """
-    return np.zeros((6, 7), dtype=BoardPiece)
+
+def initialize_game_state(config: GameConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """Returns an ndarray, shape (config.rows, config.cols), (6, 7) by default, and data type (dtype) BoardPiece,
+    initialized to 0 (NO_PLAYER). """
+    return np.zeros(config.shape, dtype=BoardPiece)
+
+
+@lru_cache(maxsize=None)
+def line_indices(config: GameConfig = DEFAULT_CONFIG) -> np.ndarray:
+    """
+    Precomputed index table of all lines of config.connect_n cells of the board (horizontal, vertical and both
+    diagonals), computed once per config
+    Return
+    -----------
+    indices: np.ndarray
+        read-only array of shape (n_lines, connect_n) with the flat indices (row * cols + column) of the cells of
+        every line, (69, 4) for the standard board
+    """
+    rows, cols, connect_n = config
+    cells = np.arange(rows * cols).reshape(rows, cols)
+    slide = connect_n - 1
+    steps = np.arange(connect_n)
+    lines = []
+    for r in range(rows):
+        for c in range(cols):
+            if c + slide < cols:
+                lines.append(cells[r, c + steps])  # horizontal
+            if r + slide < rows:
+                lines.append(cells[r + steps, c])  # vertical
+            if r + slide < rows and c + slide < cols:
+                lines.append(cells[r + steps, c + steps])  # positive slope diagonal
+                lines.append(cells[r + slide - steps, c + steps])  # negative slope diagonal
+    indices = np.array(lines, dtype=np.intp).reshape(-1, connect_n)
+    indices.setflags(write=False)
+    return indices
 
 
 def pretty_print_board(board: np.ndarray) -> str:
@@ -52,7 +109,8 @@ def pretty_print_board(board: np.ndarray) -> str:
             else:
                 return "Invalid Input"
 
-    pretty_board = ["|===============|"]
+    frame = "|" + "=" * (2 * board.shape[1] + 1) + "|"
+    pretty_board = [frame]
 
     """ generate and add the strings for each row of the board array"""
     for row in flipped_board:
@@ -60,8 +118,8 @@ def pretty_print_board(board: np.ndarray) -> str:
         joined_row = "| " + joined_row + " |"
         pretty_board.append(joined_row)
 
-    pretty_board.append("|===============|")
-    pretty_board.append("| 0 1 2 3 4 5 6 |")
+    pretty_board.append(frame)
+    pretty_board.append("| " + " ".join(str(col % 10) for col in range(board.shape[1])) + " |")
     pretty_board = "\n".join(pretty_board)
 
     return pretty_board
@@ -71,97 +129,206 @@ def string_to_board(pp_board: str) -> np.ndarray:
     """
     Takes the output of pretty_print_board and turns it back into an ndarray.
     This is quite useful for debugging, when the agent crashed and you have the last
-    board state as a string.
-    """
-    board_as_array = np.zeros((6, 7), dtype=BoardPiece)
-
-    """transform string to array for better handling"""
-    board = np.array(list(pp_board))
-    """remove newlines comands from string, and reshape back to row x columns and remove pretty boarders"""
-    newline_indices = np.argwhere(board == "\n")
-    board = np.delete(board, newline_indices)
-    board = board.reshape((9, 17))
-    boarder_indices = [0, 7, 8]
-    board = np.delete(board, boarder_indices, 0)
-
-    """ remove surplus gaps, for every x place 1 and every o place 2 the initialized 0-array  """
-    gap_indices = (0, 1, 3, 5, 7, 9, 11, 13, 15, 16, 17)
-
-    for r, row in enumerate(board):
-        string_to_int = np.delete(row, gap_indices)
-        x_indices = np.argwhere(string_to_int == "x")
-        board_as_array[r, x_indices] = 1
-        o_indices = np.argwhere(string_to_int == "o")
-        board_as_array[r, o_indices] = 2
-
-    """flip and return the array"""
-    board_as_array = np.flipud(board_as_array)
+    board state as a string. The shape of the board is read from the string (any GameConfig).
+    """
+    lines = pp_board.split("\n")
+    """the rows are framed by a line of "=" above and below, followed by the column numbers"""
+    rows = lines[1:-2]
+    n_cols = (len(lines[0]) - 3) // 2
+    board_as_array = np.zeros((len(rows), n_cols), dtype=BoardPiece)
+
+    """the pieces are at every second character after "| ", the top row comes first"""
+    for r, row in enumerate(reversed(rows)):
+        for c, symbol in enumerate(row[2:2 * n_cols + 1:2]):
+            board_as_array[r, c] = PIECE_SYMBOLS.index(symbol)
+
     return board_as_array
 
 
-def apply_player_action(board: np.ndarray, action: PlayerAction, player: BoardPiece, copying=False) -> np.ndarray:
+def canonical_board(board: np.ndarray, player: BoardPiece) -> Tuple[np.ndarray, int, bool]:
+    """
+    Returns the canonical form of board with player to move under the left-right symmetry, its key and a mirror
+    flag: the board or its mirror image, whichever has the smaller BitBoard.canonical_key (standard 6x7 board
+    only). Both have the same game value, so caches keyed on the key hold one entry for both; a move of the
+    canonical board maps back to board with mirror_player_action if the flag is True.
+    """
+    from agents.bitboard import BitBoard
+    position = BitBoard.from_array(board)
+    key, mirrored = position.canonical_key(player)
+    return (position.mirrored().to_array() if mirrored else board), key, mirrored
+
+
+def mirror_player_action(action: PlayerAction, board: np.ndarray) -> PlayerAction:
+    """
+    Returns the column of the mirrored board (np.fliplr(board)) corresponding to action on board, and vice versa.
+    """
+    return PlayerAction(board.shape[1] - 1 - action)
+
+
+def column_heights(board: np.ndarray) -> np.ndarray:
+    """
+    Returns the column-height index of board: the number of pieces in every column, which is
+    the row the next piece dropped into the column lands in.
+    """
+    return np.count_nonzero(board, axis=0)
+
+
+def apply_player_action(
+    board: np.ndarray, action: PlayerAction, player: BoardPiece, copying=False, heights: Optional[np.ndarray] = None
+) -> np.ndarray:
     """
     Sets board[i, action] = player, where i is the lowest open row. The modified
     board is returned. If copy is True, copy the board before modifying.
+    If the column-height index `heights` (see column_heights) is given, i is read from it
+    instead of searching the column, and it is updated.
     """
     if copying:
         board = board.copy()
 
     rows, cols = board.shape
-    col_array = np.arange(0, cols, 1)
 
-    if action in col_array:
+    if 0 <= action < cols:
         if player == PLAYER1 or player == PLAYER2:
-
-            for row in range(rows):
-                if board[row, action] == NO_PLAYER:
+            if heights is None and kernels.ENABLED:
+                kernels.drop_piece_kernel(board, action, player)
+            elif heights is not None:
+                row = heights[action]
+                if row < rows:
                     board[row, action] = player
-                    break
+                    heights[action] = row + 1
+            else:
+                for row in range(rows):
+                    if board[row, action] == NO_PLAYER:
+                        board[row, action] = player
+                        break
     else:
         print("invalid input to common.apply_player_action")
 
     return board
 
 
+def undo_player_action(board: np.ndarray, action: PlayerAction, heights: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Inverse of apply_player_action (in place): removes the topmost piece of column `action`.
+    The modified board is returned. If the column-height index `heights` is given,
+    the row is read from it instead of searching the column, and it is updated.
+    """
+    if heights is not None:
+        row = heights[action] - 1
+    else:
+        row = np.count_nonzero(board[:, action]) - 1
+
+    if row >= 0:
+        board[row, action] = NO_PLAYER
+        if heights is not None:
+            heights[action] = row
+
+    return board
+
+
 def connected_four(
-    board: np.ndarray, player: BoardPiece, _last_action: Optional[PlayerAction] = None, connect_n=4
+    board: np.ndarray, player: BoardPiece, last_action: Optional[PlayerAction] = None,
+    connect_n: int = DEFAULT_CONFIG.connect_n
 ) -> bool:
     """
     search board for connect_n pieces in a row, if this is the case return True
+    if last_action is given and the topmost piece in that column belongs to player, only the four lines
+    through this piece are checked (a new connect_n can only contain the piece placed last)
     """
 
+    if kernels.ENABLED:
+        if last_action is not None:
+            row = kernels.column_top_kernel(board, last_action)
+            if row >= 0 and board[row, last_action] == player:
+                return kernels.connected_through_kernel(board, player, row, last_action, connect_n)
+        return kernels.connected_four_kernel(board, player, connect_n)
+
+    if last_action is not None:
+        row = np.count_nonzero(board[:, last_action]) - 1
+        if row >= 0 and board[row, last_action] == player:
+            return connected_through(board, player, row, last_action, connect_n)
+
+    """all lines of the board at once, from the cached line table of the board shape"""
+    lines = board.reshape(-1)[line_indices(GameConfig(*board.shape, connect_n))]
+    return bool(np.any(np.all(lines == player, axis=1)))
+
+
+def connected_through(
+    board: np.ndarray, player: BoardPiece, row: int, col: int, connect_n: int = DEFAULT_CONFIG.connect_n
+) -> bool:
+    """
+    check the horizontal, vertical and both diagonal lines through board[row, col] for connect_n pieces
+    of player in a row (board[row, col] is expected to belong to player)
+    """
     rows, cols = board.shape
-    rows_edge = rows - connect_n + 1
-    cols_edge = cols - connect_n + 1
-    for i in range(rows):
-        for j in range(cols_edge):
-            if np.all(board[i, j:j + connect_n] == player):
-                return True
-    for i in range(rows_edge):
-        for j in range(cols):
-            if np.all(board[i:i + connect_n, j] == player):
-                return True
-    for i in range(rows_edge):
-        for j in range(cols_edge):
-            block = board[i:i + connect_n, j:j + connect_n]
-            if np.all(np.diag(block) == player):
-                return True
-            if np.all(np.diag(block[::-1, :]) == player):
-                return True
+
+    """ nothing can be on top of the piece placed last, so the vertical line only needs to be followed down"""
+    if row >= connect_n - 1 and np.all(board[row - connect_n + 1:row, col] == player):
+        return True
+
+    for d_row, d_col in ((0, 1), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            r, c = row + sign * d_row, col + sign * d_col
+            while 0 <= r < rows and 0 <= c < cols and board[r, c] == player:
+                count += 1
+                r, c = r + sign * d_row, c + sign * d_col
+        if count >= connect_n:
+            return True
     return False
 
 
-def check_end_state(board: np.ndarray, player: BoardPiece, last_action: Optional[PlayerAction] = None) -> GameState:
+def valid_moves_mask(boards: np.ndarray) -> np.ndarray:
+    """
+    Returns the legal moves of a stack of boards (N, rows, cols) as bool array (N, cols): a column is legal
+    while its top cell is empty.
+    """
+    return boards[:, -1, :] == NO_PLAYER
+
+
+def apply_player_actions(boards: np.ndarray, actions: np.ndarray, players) -> np.ndarray:
+    """
+    Batched apply_player_action (in place): drops a piece of players[i] into column actions[i] of boards[i] for
+    a stack of boards (N, rows, cols), players is one player for all boards or an array (N,). Full columns are
+    left unchanged. The modified boards are returned.
+    """
+    n_boards = len(boards)
+    players = np.broadcast_to(np.asarray(players, dtype=BoardPiece), (n_boards,))
+    index = np.arange(n_boards)
+    rows = np.count_nonzero(boards[index, :, actions], axis=1)
+    legal = rows < boards.shape[1]
+    boards[index[legal], rows[legal], actions[legal]] = players[legal]
+    return boards
+
+
+def connected_four_boards(boards: np.ndarray, players, connect_n: int = DEFAULT_CONFIG.connect_n) -> np.ndarray:
+    """
+    Batched connected_four: checks a stack of boards (N, rows, cols) at once on the cached line table
+    (see line_indices), players is one player for all boards or an array (N,).
+    Returns a bool array (N,), True where players[i] has connect_n pieces in a row on boards[i].
+    """
+    n_boards, rows, cols = boards.shape
+    players = np.broadcast_to(np.asarray(players, dtype=BoardPiece), (n_boards,))[:, np.newaxis, np.newaxis]
+    lines = boards.reshape(n_boards, -1)[:, line_indices(GameConfig(rows, cols, connect_n))]
+    return np.any(np.all(lines == players, axis=2), axis=1)
+
+
+def check_end_state(
+    board: np.ndarray, player: BoardPiece, last_action: Optional[PlayerAction] = None,
+    connect_n: int = DEFAULT_CONFIG.connect_n
+) -> GameState:
     """
     Returns the current game state for the current `player`, i.e. has their last
     action won (GameState.IS_WIN) or drawn (GameState.IS_DRAW) the game,
     or is play still on-going (GameState.STILL_PLAYING)?
+    If `last_action` is given, only the lines through the piece placed last are checked for a win.
+    connect_n: number of pieces in a row which win (GameConfig.connect_n)
     """
-    if connected_four(board, player, last_action) is True:
+    if connected_four(board, player, last_action, connect_n) is True:
         return GameState.IS_WIN
 
-    if np.any(board == 0):
-        return GameState.STILL_PLAYING
-
-    if np.all(board != 0):
+    """ pieces are stacked from the bottom, so the board is full as soon as the top row is full"""
+    if np.all(board[-1] != NO_PLAYER):
         return GameState.IS_DRAW
+
+    return GameState.STILL_PLAYING
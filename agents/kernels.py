@@ -0,0 +1,175 @@
+import os
+import numpy as np
+
+"""
+Optional compiled kernels of the hot loops, JIT-compiled with numba (nopython mode) if it is installed.
+The public functions (common.connected_four, common.apply_player_action, minimax.get_valid_columns,
+minimax.evaluate_board, montecarlo.random_rollout) call the kernels if ENABLED and fall back to their
+NumPy/pure-Python implementation otherwise, their signatures and results do not change.
+Without numba the kernels are plain Python functions, so they can still be tested against the fallbacks.
+Setting the environment variable CONNECT4_JIT=0 disables the kernels even if numba is installed.
+
+The kernels only use scalar loops over int8 boards and int64 bitboards (numba compiles these to machine code),
+the player constants are repeated here because agents.common imports this module.
+"""
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """stand-in for numba.njit, returns the function unchanged (also when used as @njit(...))"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+JIT_ENV = "CONNECT4_JIT"  # environment variable, "0" disables the kernels
+ENABLED = HAS_NUMBA and os.environ.get(JIT_ENV, "1") != "0"
+
+_NO_PLAYER = 0
+_PLAYER1 = 1
+_PLAYER2 = 2
+DRAW = -1  # GameState.IS_DRAW.value, result of a drawn rollout
+
+_ROWS = 6
+_COLS = 7
+_COL_BITS = _ROWS + 1
+_TOP_BITS = np.array([c * _COL_BITS + _ROWS for c in range(_COLS)], dtype=np.int64)  # sentinel bit of every column
+
+
+@njit(cache=True)
+def connected_four_kernel(board, player, connect_n=4):
+    """connect_n pieces of player in a row anywhere on board (see common.connected_four)"""
+    rows, cols = board.shape
+    for r in range(rows):
+        for c in range(cols):
+            if board[r, c] != player:
+                continue
+            for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_r = r + (connect_n - 1) * d_row
+                end_c = c + (connect_n - 1) * d_col
+                if end_r >= rows or end_c < 0 or end_c >= cols:
+                    continue
+                count = 1
+                while count < connect_n and board[r + count * d_row, c + count * d_col] == player:
+                    count += 1
+                if count == connect_n:
+                    return True
+    return False
+
+
+@njit(cache=True)
+def connected_through_kernel(board, player, row, col, connect_n=4):
+    """connect_n pieces of player in a line through board[row, col] (see common.connected_through)"""
+    rows, cols = board.shape
+    for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            r = row + sign * d_row
+            c = col + sign * d_col
+            while 0 <= r < rows and 0 <= c < cols and board[r, c] == player:
+                count += 1
+                r += sign * d_row
+                c += sign * d_col
+        if count >= connect_n:
+            return True
+    return False
+
+
+@njit(cache=True)
+def drop_piece_kernel(board, action, player):
+    """set the lowest empty cell of column action to player, return its row (-1 if the column is full)"""
+    for row in range(board.shape[0]):
+        if board[row, action] == _NO_PLAYER:
+            board[row, action] = player
+            return row
+    return -1
+
+
+@njit(cache=True)
+def column_top_kernel(board, action):
+    """row of the topmost piece of column action, -1 for an empty column"""
+    for row in range(board.shape[0] - 1, -1, -1):
+        if board[row, action] != _NO_PLAYER:
+            return row
+    return -1
+
+
+@njit(cache=True)
+def valid_columns_kernel(board):
+    """columns with an empty top cell, in increasing order"""
+    cols = board.shape[1]
+    columns = np.empty(cols, dtype=np.int64)
+    n = 0
+    for c in range(cols):
+        if board[board.shape[0] - 1, c] == _NO_PLAYER:
+            columns[n] = c
+            n += 1
+    return columns[:n]
+
+
+@njit(cache=True)
+def evaluate_board_kernel(board, player, indices, score_table):
+    """
+    sum of the window scores of board for player (see minimax.evaluate_board), indices: window index table
+    (minimax.window_indices), score_table: score by (# pieces of player, # pieces of the opponent)
+    """
+    flat = board.ravel()
+    opponent = _PLAYER2 if player == _PLAYER1 else _PLAYER1
+    score = 0
+    for w in range(indices.shape[0]):
+        own = 0
+        other = 0
+        for i in range(indices.shape[1]):
+            piece = flat[indices[w, i]]
+            if piece == player:
+                own += 1
+            elif piece == opponent:
+                other += 1
+        score += score_table[own, other]
+    return score
+
+
+@njit(cache=True)
+def _connected_four_bits(bits):
+    for shift in (1, _COL_BITS, _COL_BITS - 1, _COL_BITS + 1):
+        pairs = bits & (bits >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
+@njit(cache=True)
+def rollout_kernel(player1_bits, player2_bits, heights, last_player, seed):
+    """
+    random game on a bitboard (see agents.bitboard, heights: next bit index of every column) from the position
+    after last_player moved, until a player connects four or the board is full; seed seeds the generator,
+    so the rollouts stay reproducible with random.seed
+    Return
+    -----------
+    winner (PLAYER1 or PLAYER2), -1 for a draw
+    """
+    np.random.seed(seed)
+    pieces = np.array([0, player1_bits, player2_bits], dtype=np.int64)
+    heights = heights.copy()
+    if _connected_four_bits(pieces[last_player]):
+        return last_player
+
+    player = last_player
+    columns = np.empty(_COLS, dtype=np.int64)
+    while True:
+        n = 0
+        for c in range(_COLS):
+            if heights[c] < _TOP_BITS[c]:
+                columns[n] = c
+                n += 1
+        if n == 0:
+            return DRAW
+        player = _PLAYER1 if player == _PLAYER2 else _PLAYER2
+        column = columns[np.random.randint(n)]
+        pieces[player] |= np.int64(1) << heights[column]
+        heights[column] += 1
+        if _connected_four_bits(pieces[player]):
+            return player
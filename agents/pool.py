@@ -0,0 +1,34 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+"""
+Persistent process pools shared by the parallel searches of the agents, one pool per number of workers.
+The worker processes live as long as the pool, so state kept in module globals of a worker (e.g. a
+transposition table) survives between tasks.
+"""
+
+_pools = {}  # persistent process pools by number of workers
+
+
+def default_n_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def get_pool(n_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Return the persistent process pool with n_workers worker processes (created on first use)
+    """
+    n_workers = default_n_workers() if n_workers is None else n_workers
+    if n_workers not in _pools:
+        _pools[n_workers] = ProcessPoolExecutor(max_workers=n_workers)
+    return _pools[n_workers]
+
+
+def shutdown_pools():
+    """
+    Shut down all persistent process pools
+    """
+    for pool in _pools.values():
+        pool.shutdown(cancel_futures=True)
+    _pools.clear()
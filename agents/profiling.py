@@ -0,0 +1,44 @@
+import cProfile
+import pstats
+from contextlib import contextmanager
+from typing import Optional
+
+"""
+Profiling of the agents with cProfile: profile() wraps any code (e.g. arena.py --profile wraps a tournament),
+the profile is printed and can be saved for pstats, snakeviz or gprof2dot.
+The phases of the searches are separate functions (mcts_select, mcts_expand, random_rollout,
+mcts_backpropagation; alpha_beta_bitboard, evaluate_bitboard, ...), so they show up as such in a profile or in
+the flame graph of a sampling profiler, which needs no support in the code:
+    py-spy record -o profile.svg -- python arena.py mcts minimax --games 10
+"""
+
+DEFAULT_SORT = "cumulative"
+DEFAULT_LINES = 30
+
+
+@contextmanager
+def profile(output: Optional[str] = None, sort: str = DEFAULT_SORT, n_lines: int = DEFAULT_LINES, stream=None):
+    """
+    Profile the code in the with block with cProfile (only this process, not the workers of a process pool)
+    Parameters
+    -----------
+    output: str, optional
+        path the raw profile is saved to (pstats format)
+    sort: str
+        sort key of the printed statistics (see pstats.Stats.sort_stats)
+    n_lines: int
+        number of functions printed, 0 to print nothing
+    stream: file, optional
+        stream the statistics are printed to, sys.stdout by default
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output is not None:
+            profiler.dump_stats(output)
+        if n_lines:
+            pstats.Stats(profiler, stream=stream).sort_stats(sort).print_stats(n_lines)
+
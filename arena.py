@@ -0,0 +1,283 @@
+import argparse
+import csv
+import importlib
+import json
+import random
+import time
+import numpy as np
+from concurrent.futures import as_completed
+from typing import Optional, List, Tuple
+from agents.common import PLAYER1, PLAYER2, NO_PLAYER, GameState, GenMove, GameConfig, DEFAULT_CONFIG
+from agents.common import initialize_game_state, apply_player_action, check_end_state
+
+"""
+Headless arena: plays many games between two GenMove agents, on a process pool (see agents.pool), and reports
+the result of the first agent as win rate with confidence interval and Elo difference.
+Every game is seeded deterministically (random and np.random of the process playing it), the agents change
+colours from game to game, every move has a time limit (an agent exceeding it or playing an illegal move loses
+the game) and the results are streamed to a JSONL or CSV file while the games finish. The search statistics of
+every move (MctsStats or SearchStats in the saved_state of the agent) are recorded with the game, --profile runs
+the games in this process under cProfile (see agents.profiling). Other board sizes and connect-n rules are
+played with --rows, --cols and --connect (only agents working on the ndarray board support them, e.g. random).
+
+Agents are given by name (see AGENTS) or as dotted path of a GenMove function, with keyword arguments:
+    python arena.py mcts:runtime=0.5,rollouts=8 minimax:runtime=0.5 --games 200 --workers 8 --output games.jsonl
+"""
+
+AGENTS = {
+    "random": "agents.agent_random.generate_move",
+    "minimax": "agents.agent_minimax.generate_move_minimax",
+    "mcts": "agents.agent_mct.generate_move",
+}
+GENERIC_AGENTS = ("random",)  # agents playing on any GameConfig, the others search on the 6x7 BitBoard
+RESULTS = ("win", "draw", "loss")  # result of a game for the first agent
+Z_95 = 1.959963984540054  # two sided 95% quantile of the normal distribution
+
+
+def parse_agent(spec: str) -> Tuple[GenMove, dict]:
+    """
+    Return the generate_move function and the keyword arguments of an agent spec "name:key=value,key=value",
+    name is a key of AGENTS or the dotted path of a GenMove function, values are parsed as JSON if possible
+    """
+    name, _, arguments = spec.partition(":")
+    path = AGENTS.get(name, name)
+    module_name, _, function_name = path.rpartition(".")
+    if not module_name:
+        raise ValueError(f"unknown agent {name!r}, expected one of {sorted(AGENTS)} or a dotted path")
+    generate_move = getattr(importlib.import_module(module_name), function_name)
+
+    kwargs = {}
+    for argument in filter(None, arguments.split(",")):
+        key, _, value = argument.partition("=")
+        try:
+            kwargs[key] = json.loads(value)
+        except json.JSONDecodeError:
+            kwargs[key] = value
+    return generate_move, kwargs
+
+
+def supports_config(spec: str, config: GameConfig) -> bool:
+    """
+    True if the agent of spec can play on the boards of config (every agent plays on DEFAULT_CONFIG)
+    """
+    if config == DEFAULT_CONFIG:
+        return True
+    generate_move, _ = parse_agent(spec)
+    return any(generate_move is parse_agent(name)[0] for name in GENERIC_AGENTS)
+
+
+def play_game(agent_1: str, agent_2: str, seed: int, move_time: Optional[float] = None,
+              agent_1_first: bool = True, config: GameConfig = DEFAULT_CONFIG) -> dict:
+    """
+    Play one game between the agent specs agent_1 and agent_2
+    Parameters
+    -----------
+    agent_1, agent_2: agent specs (see parse_agent)
+    seed: seed of random and np.random for this game
+    move_time: time limit per move in seconds, None for no limit
+    agent_1_first: agent_1 plays PLAYER1 (moves first)
+    config: board size and number of pieces in a row which win
+
+    Return
+    -----------
+    record of the game: seed, agents, moves, move times, search statistics of the moves (as_dict of the stats in
+    the saved_state of the agent, None if there are none), result for agent_1 (RESULTS) and the reason of the end
+    ("connect4", "draw", "timeout" or "illegal")
+    """
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    agents = {}
+    for spec, player in ((agent_1, PLAYER1), (agent_2, PLAYER2)) if agent_1_first else \
+            ((agent_1, PLAYER2), (agent_2, PLAYER1)):
+        agents[player] = parse_agent(spec)
+    saved_state = {PLAYER1: None, PLAYER2: None}
+    board = initialize_game_state(config)
+    moves, times, stats = [], [], []
+    player, winner, reason = PLAYER1, None, None
+
+    while reason is None:
+        generate_move, kwargs = agents[player]
+        start = time.perf_counter()
+        action, saved_state[player] = generate_move(board.copy(), player, saved_state[player], **kwargs)
+        elapsed = time.perf_counter() - start
+        moves.append(int(action))
+        times.append(round(elapsed, 6))
+        move_stats = getattr(saved_state[player], "stats", None)
+        stats.append(None if move_stats is None else move_stats.as_dict())
+
+        opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+        if move_time is not None and elapsed > move_time:
+            winner, reason = opponent, "timeout"
+        elif not (0 <= action < board.shape[1] and board[-1, action] == NO_PLAYER):
+            winner, reason = opponent, "illegal"
+        else:
+            apply_player_action(board, action, player)
+            end_state = check_end_state(board, player, action, config.connect_n)
+            if end_state == GameState.IS_WIN:
+                winner, reason = player, "connect4"
+            elif end_state == GameState.IS_DRAW:
+                reason = "draw"
+        player = opponent
+
+    agent_1_player = PLAYER1 if agent_1_first else PLAYER2
+    result = "draw" if winner is None else ("win" if winner == agent_1_player else "loss")
+    return {
+        "seed": seed, "agent_1": agent_1, "agent_2": agent_2, "agent_1_first": agent_1_first, "config": list(config),
+        "moves": moves, "times": times, "stats": stats, "result": result, "reason": reason,
+    }
+
+
+class ResultWriter:
+    def __init__(self, path: Optional[str]):
+        """
+        Streams game records to path: JSON lines, or CSV if path ends with .csv (moves and times joined by " ",
+        stats as JSON), nothing if path is None
+        """
+        self.file = None if path is None else open(path, "w", newline="")
+        self.csv_writer = None
+        self.is_csv = path is not None and path.endswith(".csv")
+
+    def write(self, record: dict):
+        if self.file is None:
+            return
+        if self.is_csv:
+            row = dict(record, moves=" ".join(map(str, record["moves"])), times=" ".join(map(str, record["times"])),
+                       stats=json.dumps(record["stats"]))
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.file, fieldnames=list(row))
+                self.csv_writer.writeheader()
+            self.csv_writer.writerow(row)
+        else:
+            self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def game_seeds(seed: Optional[int], n_games: int) -> List[int]:
+    """deterministic seeds of the games of a tournament"""
+    rng = random.Random(seed)
+    return [rng.getrandbits(63) for _ in range(n_games)]
+
+
+def run_tournament(
+        agent_1: str, agent_2: str, n_games: int, n_workers: int = 1, seed: Optional[int] = 0,
+        move_time: Optional[float] = None, output: Optional[str] = None, config: GameConfig = DEFAULT_CONFIG
+) -> List[dict]:
+    """
+    Play n_games games between agent_1 and agent_2, agent_1 moves first in the even games
+    Parameters
+    -----------
+    agent_1, agent_2: agent specs (see parse_agent)
+    n_games: number of games
+    n_workers: number of processes, the games are played in this process if 1
+    seed: seed of the tournament, the games are seeded from it
+    move_time: time limit per move in seconds, None for no limit
+    output: path of the JSONL (or .csv) file the records are streamed to
+    config: board size and number of pieces in a row which win
+
+    Return
+    -----------
+    records of all games (see play_game) in the order they finished
+    """
+    games = [
+        (agent_1, agent_2, game_seed, move_time, i % 2 == 0, config)
+        for i, game_seed in enumerate(game_seeds(seed, n_games))
+    ]
+    writer = ResultWriter(output)
+    records = []
+    try:
+        if n_workers == 1:
+            results = (play_game(*game) for game in games)
+        else:
+            from agents.pool import get_pool
+            pool = get_pool(n_workers)
+            results = (future.result() for future in as_completed([pool.submit(play_game, *game) for game in games]))
+        for record in results:
+            writer.write(record)
+            records.append(record)
+    finally:
+        writer.close()
+    return records
+
+
+def elo_difference(score: float) -> float:
+    """Elo difference corresponding to the expected score (0..1) of the first agent"""
+    if score <= 0:
+        return -np.inf
+    if score >= 1:
+        return np.inf
+    return -400 * np.log10(1 / score - 1)
+
+
+def wilson_interval(score: float, n_games: int, z: float = Z_95) -> Tuple[float, float]:
+    """
+    Wilson score interval of the score (draws count half), unlike the normal approximation it is not empty for
+    a score of 0 or 1
+    """
+    if n_games == 0:
+        return np.nan, np.nan
+    denominator = 1 + z * z / n_games
+    center = (score + z * z / (2 * n_games)) / denominator
+    margin = z / denominator * np.sqrt(score * (1 - score) / n_games + z * z / (4 * n_games * n_games))
+    return max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+def summarize(records: List[dict]) -> dict:
+    """
+    Results of agent_1: wins, draws, losses, score (wins + draws / 2 per game), its 95% confidence interval
+    (see wilson_interval) and the Elo difference with confidence interval
+    """
+    n_games = len(records)
+    counts = {result: sum(record["result"] == result for record in records) for result in RESULTS}
+    score = (counts["win"] + counts["draw"] / 2) / n_games if n_games else np.nan
+    interval = wilson_interval(score, n_games)
+    return {
+        "games": n_games, "wins": counts["win"], "draws": counts["draw"], "losses": counts["loss"],
+        "score": score, "score_interval": interval,
+        "elo": elo_difference(score), "elo_interval": tuple(elo_difference(s) for s in interval),
+        "timeouts": sum(record["reason"] == "timeout" for record in records),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="play games between two connect 4 agents")
+    parser.add_argument("agent_1", help="agent spec name[:key=value,...], name in %s or dotted path" % sorted(AGENTS))
+    parser.add_argument("agent_2", help="agent spec of the opponent")
+    parser.add_argument("--games", type=int, default=100, help="number of games")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the tournament")
+    parser.add_argument("--move-time", type=float, default=None, help="time limit per move (seconds)")
+    parser.add_argument("--output", default=None, help="JSONL (or .csv) file for the game records")
+    parser.add_argument("--rows", type=int, default=DEFAULT_CONFIG.rows, help="number of rows of the board")
+    parser.add_argument("--cols", type=int, default=DEFAULT_CONFIG.cols, help="number of columns of the board")
+    parser.add_argument("--connect", type=int, default=DEFAULT_CONFIG.connect_n, help="pieces in a row which win")
+    parser.add_argument("--profile", default=None, metavar="PATH",
+                        help="play the games in this process under cProfile, print it and save it to PATH")
+    args = parser.parse_args(args)
+    config = GameConfig(args.rows, args.cols, args.connect)
+
+    if args.profile is not None:
+        from agents.profiling import profile
+        with profile(args.profile):
+            records = run_tournament(
+                args.agent_1, args.agent_2, args.games, 1, args.seed, args.move_time, args.output, config
+            )
+    else:
+        records = run_tournament(
+            args.agent_1, args.agent_2, args.games, args.workers, args.seed, args.move_time, args.output, config
+        )
+    summary = summarize(records)
+    print(f"{args.agent_1} vs {args.agent_2}: +{summary['wins']} ={summary['draws']} -{summary['losses']} "
+          f"({summary['timeouts']} timeouts)")
+    low, high = summary["score_interval"]
+    print(f"score {summary['score']:.3f} (95% CI {low:.3f} - {high:.3f})")
+    low, high = summary["elo_interval"]
+    print(f"Elo {summary['elo']:+.0f} (95% CI {low:+.0f} - {high:+.0f})")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import sys
+from benchmarks.suite import BENCHMARKS, DEFAULT_REPEAT, DEFAULT_THRESHOLD, run_benchmarks, save_results, \
+    load_results, compare_results
+
+"""
+Command line of the benchmark suite:
+    python -m benchmarks run [--only NAME ...] [--repeat 5] [--save results.json]
+    python -m benchmarks compare baseline.json [results.json] [--threshold 0.1]
+compare runs the benchmarks if no results are given and exits with status 1 if there is a regression.
+"""
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="benchmarks of the hot paths")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--save", default=None, help="save the results to this JSON file (e.g. a baseline)")
+    compare_parser = subparsers.add_parser("compare", help="compare results with a baseline")
+    compare_parser.add_argument("baseline", help="JSON file saved by run --save")
+    compare_parser.add_argument("current", nargs="?", default=None, help="results to compare, run if not given")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="relative slow down reported as regression")
+    for subparser in (run_parser, compare_parser):
+        subparser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=None,
+                               help="run only these benchmarks")
+        subparser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="repeats, the fastest counts")
+    args = parser.parse_args(args)
+
+    if args.command == "run":
+        results = run_benchmarks(args.only, args.repeat, verbose=True)
+        if args.save is not None:
+            save_results(args.save, results)
+        return 0
+
+    baseline = load_results(args.baseline)
+    if args.current is None:
+        current = run_benchmarks(args.only or [name for name in BENCHMARKS if name in baseline], args.repeat,
+                                 verbose=True)
+    else:
+        current = load_results(args.current)
+    regressions = compare_results(baseline, current, args.threshold, verbose=True)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
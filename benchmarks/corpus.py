@@ -0,0 +1,31 @@
+import numpy as np
+from typing import Dict, List
+from agents.common import BoardPiece, PLAYER1, PLAYER2, initialize_game_state, apply_player_action
+
+"""
+Fixed corpus of positions for the benchmarks: games of random moves (generated once with
+np.random.default_rng(seed), seeds 0-3) stored as move sequences, none of them is finished.
+early: 4 pieces, mid: 14 pieces, late: 26 pieces; PLAYER1 is to move in all of them.
+"""
+
+CORPUS = {
+    "early": ["5431", "3356", "5102", "5011"],
+    "mid": ["54312000154634", "33560156126215", "51022530245561", "50111564002343"],
+    "late": ["25432522611440025251156005", "33560156126215124300655351", "51022530245561603114231153",
+             "34415565124446260066202063"],
+}
+
+
+def board_from_moves(moves: str) -> np.ndarray:
+    """board after playing the columns in moves (a string of digits), PLAYER1 first"""
+    board = initialize_game_state()
+    player = PLAYER1
+    for move in moves:
+        apply_player_action(board, BoardPiece(int(move)), player)
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+    return board
+
+
+def corpus_boards(phases=("early", "mid", "late")) -> Dict[str, List[np.ndarray]]:
+    """boards of the corpus by game phase"""
+    return {phase: [board_from_moves(moves) for moves in CORPUS[phase]] for phase in phases}
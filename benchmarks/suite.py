@@ -0,0 +1,249 @@
+import json
+import platform
+import random
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional
+from agents.common import PLAYER1, PLAYER2, connected_four, check_end_state, apply_player_action, \
+    undo_player_action, column_heights
+from agents.bitboard import BitBoard
+from agents.agent_minimax.minimax import get_valid_columns, evaluate_board, alpha_beta_bitboard, search_position, \
+    SearchStats, generate_moves_minimax_batch
+from agents.agent_minimax.ordering import KillerHistoryOrdering
+from agents.agent_minimax.transposition import TranspositionTable
+from agents.agent_mct.montecarlo import Node, mcts_run, MctsStats
+from agents.agent_mct.rollout import batched_rollouts
+from benchmarks.corpus import corpus_boards
+
+"""
+Benchmarks of the hot paths: every benchmark runs a fixed amount of work on the positions of the corpus
+(see benchmarks.corpus) with fixed seeds and returns the number of operations it did (calls, positions, playouts).
+The runner keeps the fastest of several repeats as time per operation; results are saved as JSON and compared
+against a saved baseline, an operation which got slower by more than the threshold is a regression.
+Counts that depend on the algorithm rather than on the work asked for (like the nodes of a fixed depth search,
+which better move ordering lowers) are no operations: they are reported as metrics (see report_metric) and shown
+next to the times, but never count as regression.
+"""
+
+BENCHMARKS: Dict[str, Callable[[], int]] = {}  # benchmark functions by name
+UNITS: Dict[str, str] = {}  # unit of the operations of every benchmark
+METRICS: Dict[str, dict] = {}  # metrics reported by the last run of every benchmark
+SEED = 0
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.1  # relative slow down reported as regression
+
+_boards = {}
+
+
+def boards(phase: Optional[str] = None) -> List[np.ndarray]:
+    """boards of the corpus (all phases if phase is None), built once"""
+    if not _boards:
+        _boards.update(corpus_boards())
+    if phase is None:
+        return [board for phase_boards in _boards.values() for board in phase_boards]
+    return _boards[phase]
+
+
+def benchmark(name: str, unit: str = "call"):
+    """register the decorated function as benchmark name, its operations are counted in unit"""
+    def register(function: Callable[[], int]) -> Callable[[], int]:
+        BENCHMARKS[name] = function
+        UNITS[name] = unit
+        return function
+    return register
+
+
+def report_metric(name: str, metric: str, value):
+    """report metric of benchmark name, saved with its results"""
+    METRICS.setdefault(name, {})[metric] = value
+
+
+@benchmark("connected_four")
+def bench_connected_four() -> int:
+    all_boards = boards()
+    for _ in range(20):
+        for board in all_boards:
+            connected_four(board, PLAYER1)
+    return 20 * len(all_boards)
+
+
+@benchmark("connected_four_last_action")
+def bench_connected_four_last_action() -> int:
+    all_boards = boards()
+    for _ in range(50):
+        for board in all_boards:
+            for column in range(7):
+                connected_four(board, PLAYER1, column)
+    return 50 * 7 * len(all_boards)
+
+
+@benchmark("check_end_state")
+def bench_check_end_state() -> int:
+    all_boards = boards()
+    for _ in range(20):
+        for board in all_boards:
+            check_end_state(board, PLAYER2)
+    return 20 * len(all_boards)
+
+
+@benchmark("evaluate_board")
+def bench_evaluate_board() -> int:
+    all_boards = boards()
+    for _ in range(20):
+        for board in all_boards:
+            evaluate_board(board, PLAYER1)
+    return 20 * len(all_boards)
+
+
+@benchmark("get_valid_columns")
+def bench_get_valid_columns() -> int:
+    all_boards = boards()
+    for _ in range(50):
+        for board in all_boards:
+            get_valid_columns(board)
+    return 50 * len(all_boards)
+
+
+@benchmark("apply_player_action")
+def bench_apply_player_action() -> int:
+    """apply and undo with the column-height index (the in-place make/unmake of the search)"""
+    n = 0
+    for board in boards():
+        board = board.copy()
+        heights = column_heights(board)
+        columns = get_valid_columns(board)
+        for _ in range(50):
+            for column in columns:
+                apply_player_action(board, column, PLAYER1, heights=heights)
+                undo_player_action(board, column, heights)
+        n += 50 * len(columns)
+    return n
+
+
+@benchmark("bitboard_play_undo")
+def bench_bitboard_play_undo() -> int:
+    n = 0
+    for board in boards():
+        position = BitBoard.from_array(board)
+        columns = position.valid_columns()
+        for _ in range(200):
+            for column in columns:
+                position.play(column, PLAYER1)
+                position.connected_four(PLAYER1)
+                position.undo(column)
+        n += 200 * len(columns)
+    return n
+
+
+@benchmark("minimax_search", unit="position")
+def bench_minimax_search() -> int:
+    """fixed depth alpha-beta search of the mid game positions, the searched nodes are reported as metric"""
+    stats = SearchStats()
+    for board in boards("mid"):
+        stats.root_moves = None
+        alpha_beta_bitboard(search_position(board), 5, PLAYER1, -np.inf, np.inf, TranspositionTable(1 << 16), None,
+                            KillerHistoryOrdering(), stats=stats)
+    report_metric("minimax_search", "nodes", stats.nodes)
+    return len(boards("mid"))
+
+
+@benchmark("mcts_playouts", unit="playout")
+def bench_mcts_playouts() -> int:
+    """fixed number of iterations from the early positions"""
+    n = 0
+    for board in boards("early"):
+        stats = MctsStats()
+        mcts_run(Node(board, PLAYER1), runtime=None, max_iterations=300, stats=stats)
+        n += stats.simulations
+    return n
+
+
+@benchmark("minimax_batch", unit="game")
+def bench_minimax_batch() -> int:
+    """one move of the batched depth 2 search for 64 copies of every corpus position"""
+    all_boards = np.repeat(np.stack(boards()), 64, axis=0)
+    generate_moves_minimax_batch(all_boards, PLAYER1, None, depth=2)
+    return len(all_boards)
+
+
+@benchmark("batched_rollouts", unit="playout")
+def bench_batched_rollouts() -> int:
+    rng = np.random.default_rng(SEED)
+    for board in boards("early"):
+        batched_rollouts(BitBoard.from_array(board), PLAYER2, 256, rng)
+    return 256 * len(boards("early"))
+
+
+def run_benchmarks(names: Optional[List[str]] = None, repeat: int = DEFAULT_REPEAT, verbose: bool = False) -> dict:
+    """
+    Run the benchmarks (all if names is None), each repeat times with the same seeds
+    Return
+    -----------
+    results by name: unit, operations per run, fastest time per operation (seconds), operations per second and
+    the reported metrics (if any)
+    """
+    results = {}
+    for name in BENCHMARKS if names is None else names:
+        times = []
+        METRICS.pop(name, None)
+        for _ in range(repeat):
+            random.seed(SEED)
+            np.random.seed(SEED)
+            start = time.perf_counter()
+            n_ops = BENCHMARKS[name]()
+            times.append((time.perf_counter() - start) / n_ops)
+        best = min(times)
+        results[name] = {"unit": UNITS[name], "ops": n_ops, "seconds_per_op": best, "ops_per_second": 1 / best}
+        if name in METRICS:
+            results[name]["metrics"] = METRICS[name]
+        if verbose:
+            metrics = "".join(f"  {metric} {value}" for metric, value in METRICS.get(name, {}).items())
+            print(f"{name:<28} {best * 1e6:12.3f} us/{UNITS[name]:<8} {1 / best:14.0f} {UNITS[name]}s/s{metrics}")
+    return results
+
+
+def save_results(path: str, results: dict):
+    """save results (see run_benchmarks) with the environment they were measured in"""
+    data = {
+        "environment": {"python": platform.python_version(), "numpy": np.__version__,
+                        "machine": platform.machine(), "processor": platform.processor(), "time": time.time()},
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD,
+                    verbose: bool = False) -> List[str]:
+    """
+    Compare the time per operation of the benchmarks in both results, changed metrics are only printed
+    Return
+    -----------
+    names of the benchmarks that got slower by more than threshold (relative)
+    """
+    regressions = []
+    for name in current:
+        if name not in baseline:
+            continue
+        ratio = current[name]["seconds_per_op"] / baseline[name]["seconds_per_op"]
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            status = "REGRESSION"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = ""
+        if verbose:
+            baseline_metrics = baseline[name].get("metrics", {})
+            metrics = "".join(
+                f"  {metric} {baseline_metrics[metric]} -> {value}"
+                for metric, value in current[name].get("metrics", {}).items()
+                if metric in baseline_metrics and baseline_metrics[metric] != value
+            )
+            print(f"{name:<28} {ratio:8.3f}x time  {status}{metrics}")
+    return regressions
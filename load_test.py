@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import numpy as np
+from typing import Optional, List
+from server import GameServer, DEFAULT_PORT, DEFAULT_DEADLINE
+
+"""
+Load-test client of the game server: plays many games at once, the client side playing random legal moves against
+the agent of the server, and reports the throughput (agent moves per second) and the latency of the move requests
+(median and tail percentiles). With --spawn the server is started in this process on a free port.
+
+    python load_test.py --sessions 200 --concurrency 50 --agent mcts:runtime=0.2 --spawn --workers 4
+"""
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Client:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Connection to the game server, requests can be sent concurrently, the responses are matched by their id
+        """
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.receiver = asyncio.create_task(self.receive())
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = DEFAULT_PORT, path: Optional[str] = None):
+        if path is not None:
+            return cls(*await asyncio.open_unix_connection(path))
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def receive(self):
+        while line := await self.reader.readline():
+            response = json.loads(line)
+            future = self.pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("connection closed by the server"))
+
+    async def request(self, op: str, **arguments) -> dict:
+        """
+        send a request and wait for its response, errors of the server are raised as RuntimeError and a closed
+        connection as ConnectionError
+        """
+        if self.receiver.done():
+            raise ConnectionError("connection closed by the server")
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write((json.dumps(dict(arguments, id=request_id, op=op)) + "\n").encode())
+        await self.writer.drain()
+        response = await future
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
+
+
+async def play_session(client: Client, agent: str, deadline: float, rng: random.Random, latencies: List[float],
+                       config: Optional[list] = None) -> dict:
+    """
+    Play one game of random moves against agent, append the latency of every move request to latencies;
+    a game is abandoned (result "error") when the server answers a request with an error or the connection is lost
+    Return
+    ----------------
+    dict with the result for the client, the number of agent moves and of missed deadlines
+    """
+    arguments = {"agent": agent, "agent_player": rng.choice((1, 2)), "deadline": deadline}
+    if config is not None:
+        arguments["config"] = config
+    try:
+        response = await client.request("new", **arguments)
+    except (RuntimeError, ConnectionError):
+        return {"result": "error", "agent_moves": 0, "timeouts": 0}
+    session = response["session"]
+    rows, cols = (6, 7) if config is None else config[:2]
+    heights = [0] * cols
+    if "agent_move" in response:
+        heights[response["agent_move"]] += 1
+    agent_moves = int("agent_move" in response)
+    timeouts = int(response.get("timeout", False))
+
+    result = None
+    while result is None:
+        column = rng.choice([c for c in range(cols) if heights[c] < rows])
+        start = time.perf_counter()
+        try:
+            response = await client.request("move", session=session, column=column, deadline=deadline)
+        except (RuntimeError, ConnectionError):
+            result = "error"
+            break
+        finally:
+            latencies.append(time.perf_counter() - start)
+        heights[column] += 1
+        if "agent_move" in response:
+            heights[response["agent_move"]] += 1
+            agent_moves += 1
+            timeouts += int(response["timeout"])
+        result = response["result"]
+    try:
+        await client.request("close", session=session)
+    except ConnectionError:
+        pass  # the server closes the sessions of a lost connection
+    return {"result": result, "agent_moves": agent_moves, "timeouts": timeouts}
+
+
+def summarize(latencies: List[float], results: List[dict], elapsed: float) -> dict:
+    """throughput and latency percentiles (in seconds) of a load test"""
+    agent_moves = sum(r["agent_moves"] for r in results)
+    summary = {
+        "sessions": len(results),
+        "agent_moves": agent_moves,
+        "timeouts": sum(r["timeouts"] for r in results),
+        "elapsed": elapsed,
+        "moves_per_second": agent_moves / elapsed if elapsed > 0 else 0.0,
+        "results": {name: sum(r["result"] == name for r in results) for name in ("win", "draw", "loss", "error")},
+    }
+    if latencies:
+        values = np.percentile(latencies, PERCENTILES)
+        summary["latency"] = dict({f"p{p}": float(v) for p, v in zip(PERCENTILES, values)},
+                                  mean=float(np.mean(latencies)), max=float(np.max(latencies)))
+    return summary
+
+
+async def run_load_test(n_sessions: int, concurrency: int, agent: str, deadline: float = DEFAULT_DEADLINE,
+                        host: str = "127.0.0.1", port: int = DEFAULT_PORT, path: Optional[str] = None,
+                        seed: int = 0, config: Optional[list] = None) -> dict:
+    """
+    Play n_sessions games against the server, at most concurrency of them at the same time (over one connection)
+    Return
+    ----------------
+    summary of the load test (see summarize)
+    """
+    client = await Client.connect(host, port, path)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def limited(i: int) -> dict:
+        async with semaphore:
+            return await play_session(client, agent, deadline, random.Random(seed + i), latencies, config)
+
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(limited(i) for i in range(n_sessions)))
+    finally:
+        await client.close()
+    return summarize(latencies, results, time.perf_counter() - start)
+
+
+async def spawn_and_run(args) -> dict:
+    """start a server on a free port in this process and run the load test against it"""
+    game_server = GameServer(args.workers, args.deadline)
+    server = await game_server.start(args.host, 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        async with server:
+            return await run_load_test(args.sessions, args.concurrency, args.agent, args.deadline, args.host, port,
+                                       seed=args.seed)
+    finally:
+        game_server.close()
+
+
+def format_summary(summary: dict) -> str:
+    lines = [
+        f"{summary['sessions']} games, {summary['agent_moves']} agent moves in {summary['elapsed']:.2f}s: "
+        f"{summary['moves_per_second']:.1f} moves/s, {summary['timeouts']} missed deadlines",
+        "client results: " + ", ".join(f"{name} {n}" for name, n in summary["results"].items()),
+    ]
+    if "latency" in summary:
+        lines.append("move latency: " + ", ".join(
+            f"{name} {value * 1000:.1f}ms" for name, value in summary["latency"].items()
+        ))
+    return "\n".join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="load test of the connect 4 game server")
+    parser.add_argument("--sessions", type=int, default=100, help="number of games")
+    parser.add_argument("--concurrency", type=int, default=20, help="games played at the same time")
+    parser.add_argument("--agent", default="random", help="agent of the server, name:key=value,...")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE, help="deadline per move (s)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None, metavar="PATH", help="connect to a unix socket instead of TCP")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="start the server in this process")
+    parser.add_argument("--workers", type=int, default=None, help="worker lanes of the spawned server")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(args)
+
+    if args.spawn:
+        summary = asyncio.run(spawn_and_run(args))
+    else:
+        summary = asyncio.run(run_load_test(args.sessions, args.concurrency, args.agent, args.deadline,
+                                            args.host, args.port, args.unix, args.seed))
+    print(json.dumps(summary, indent=2) if args.json else format_summary(summary))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
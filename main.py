@@ -1,7 +1,7 @@
 import numpy as np
 from typing import Optional, Callable
 from agents.common import PlayerAction, BoardPiece
-from agents.common import SavedState, GenMove
+from agents.common import SavedState, GenMove, GameConfig, DEFAULT_CONFIG
 from agents.agent_minimax import generate_move_minimax
 from agents.agent_mct import generate_move
 # from agents.agent_random import generate_move
@@ -26,6 +26,7 @@ def human_vs_agent(
     args_2: tuple = (),
     init_1: Callable = lambda board, player: None,
     init_2: Callable = lambda board, player: None,
+    config: GameConfig = DEFAULT_CONFIG,
 ):
     import time
     from agents.common import PLAYER1, PLAYER2, GameState
@@ -34,10 +35,10 @@ def human_vs_agent(
     players = (PLAYER1, PLAYER2)
     for play_first in (1, -1):
         for init, player in zip((init_1, init_2)[::play_first], players):
-            init(initialize_game_state(), player)
+            init(initialize_game_state(config), player)
 
         saved_state = {PLAYER1: None, PLAYER2: None}
-        board = initialize_game_state()
+        board = initialize_game_state(config)
         gen_moves = (generate_move_1, generate_move_2)[::play_first]
         player_names = (player_1, player_2)[::play_first]
         gen_args = (args_1, args_2)[::play_first]
@@ -56,8 +57,11 @@ def human_vs_agent(
                     board.copy(), player, saved_state[player], *args
                 )
                 print(f"Move time: {time.time() - t0:.3f}s")
+                stats = getattr(saved_state[player], "stats", None)
+                if stats is not None:
+                    print(f"Search: {stats}")
                 apply_player_action(board, action, player)
-                end_state = check_end_state(board, player)
+                end_state = check_end_state(board, player, action, config.connect_n)
                 if end_state != GameState.STILL_PLAYING:
                     print(pretty_print_board(board))
                     if end_state == GameState.IS_DRAW:
@@ -77,5 +81,5 @@ if __name__ == "__main__":
     """ for playing against agent """
     human_vs_agent(generate_move)
 
-    """ agent playing against agent """
+    """ agent playing against agent (many games without output: python arena.py mcts minimax --games 100) """
     # human_vs_agent(generate_move , generate_move_minimax)
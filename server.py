@@ -0,0 +1,337 @@
+import argparse
+import asyncio
+import inspect
+import itertools
+import json
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from agents.common import PLAYER1, PLAYER2, NO_PLAYER, BoardPiece, GameState, GameConfig, DEFAULT_CONFIG
+from agents.common import initialize_game_state, apply_player_action, check_end_state
+from agents.pool import default_n_workers
+from arena import parse_agent, supports_config
+
+"""
+Asyncio game server: hosts many concurrent games between clients and agents, speaking JSON lines over a local
+TCP (or unix) socket. Every request is one JSON object per line with an "id", which is echoed in its response;
+requests of one connection are handled concurrently, so responses may arrive out of order.
+
+    {"id": 1, "op": "new", "agent": "mcts:runtime=1", "agent_player": 2}  -> {"id": 1, "session": 7, ...}
+    {"id": 2, "op": "move", "session": 7, "column": 3, "deadline": 2.0}  -> {"id": 2, "agent_move": 4, ...}
+    {"id": 3, "op": "generate", "agent": "minimax", "board": [[0, ...], ...], "player": 1}  -> {"move": 3, ...}
+    {"id": 4, "op": "close", "session": 7}
+    {"id": 5, "op": "status"}
+
+The agents run on worker lanes, single-process pools, so the event loop never waits for a search. A session is
+pinned to one lane for its whole life and its saved_state stays in that worker process (see _worker_states),
+nothing is serialized between moves. Every move has a deadline: the runtime budget of the agent is capped to
+DEADLINE_SHARE of it, and if the search still does not finish in time, a random legal move is played instead
+("timeout": true in the response). Only a search still queued on its lane is cancelled then: a running search can
+not be interrupted and keeps its lane busy until it returns, so the deadline is enforced by the runtime budget alone
+(agents without a runtime parameter are not bounded) and the moves queued behind a late search time out as well.
+A failed agent move is answered with an error and leaves the session as it was before the request; a lane whose
+worker process died is restarted (the saved states of its sessions are lost then, their agents start from scratch).
+
+    python server.py --port 4004 --workers 4
+    python load_test.py --port 4004 --sessions 200 --agent mcts:runtime=0.2
+"""
+
+DEFAULT_PORT = 4004
+DEFAULT_DEADLINE = 10.0  # seconds per move if the request has no deadline
+DEADLINE_SHARE = 0.8  # share of the deadline given to the search as runtime budget
+SESSION_TT_SIZE = 1 << 16  # slots of the transposition table kept per session, unless the agent spec sets tt_size
+RESULTS = ("win", "draw", "loss")  # result of a finished game for the client
+
+_worker_states = {}  # saved states of the sessions pinned to this worker process, by session id
+
+
+def _generate_move(session_id: Optional[int], agent: str, board: np.ndarray, player: BoardPiece, runtime: float):
+    """
+    Worker task: move of agent for board, with the saved_state of the session kept in this process (None for a
+    single move without session); the runtime budget of the agent is capped to runtime, and agents with a
+    transposition table get SESSION_TT_SIZE slots (the default table of the minimax agent takes about 8 MB, kept by
+    every open session)
+    Return
+    ----------------
+    Tuple [action, statistics of the search (as_dict of saved_state.stats) or None]
+    """
+    generate_move, kwargs = parse_agent(agent)
+    if "runtime" in inspect.signature(generate_move).parameters:
+        budget = kwargs.get("runtime", inspect.signature(generate_move).parameters["runtime"].default)
+        kwargs["runtime"] = runtime if budget is None else min(budget, runtime)
+    if "tt_size" in inspect.signature(generate_move).parameters:
+        kwargs.setdefault("tt_size", SESSION_TT_SIZE)
+    action, saved_state = generate_move(board, player, _worker_states.get(session_id), **kwargs)
+    if session_id is not None:
+        _worker_states[session_id] = saved_state
+    stats = getattr(saved_state, "stats", None)
+    return int(action), None if stats is None else stats.as_dict()
+
+
+def _close_session(session_id: int):
+    """Worker task: drop the saved_state of a session"""
+    _worker_states.pop(session_id, None)
+
+
+class Session:
+    def __init__(self, session_id: int, agent: str, agent_player: BoardPiece, lane: int,
+                 config: GameConfig = DEFAULT_CONFIG):
+        """
+        Game between a client and an agent
+        board: current board, kept by the server (the workers only see copies)
+        lane: index of the worker lane the agent of the session runs on
+        result: None while playing, else the result for the client (RESULTS)
+        lock: serializes the requests of the session
+        """
+        self.id = session_id
+        self.agent = agent
+        self.agent_player = agent_player
+        self.client_player = PLAYER2 if agent_player == PLAYER1 else PLAYER1
+        self.lane = lane
+        self.config = config
+        self.board = initialize_game_state(config)
+        self.moves = []
+        self.result = None
+        self.lock = asyncio.Lock()
+
+
+class GameServer:
+    def __init__(self, n_workers: Optional[int] = None, default_deadline: float = DEFAULT_DEADLINE):
+        """
+        Game service on n_workers worker lanes (all cores by default)
+        """
+        n_workers = default_n_workers() if n_workers is None else n_workers
+        self.lanes = [ProcessPoolExecutor(max_workers=1) for _ in range(n_workers)]
+        self.lane_sessions = [0] * n_workers  # number of open sessions per lane
+        self.default_deadline = default_deadline
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.counters = {"requests": 0, "moves": 0, "timeouts": 0, "errors": 0, "restarts": 0}
+
+    def close(self):
+        for lane in self.lanes:
+            lane.shutdown(wait=False, cancel_futures=True)
+
+    def restart_lane(self, lane: int):
+        """replace the worker of a broken lane by a new process"""
+        self.lanes[lane].shutdown(wait=False, cancel_futures=True)
+        self.lanes[lane] = ProcessPoolExecutor(max_workers=1)
+        self.counters["restarts"] += 1
+
+    async def agent_move(self, session_id: Optional[int], agent: str, board: np.ndarray, player: BoardPiece,
+                         lane: int, deadline: float) -> dict:
+        """
+        Run the agent on its lane within the deadline (seconds), fall back to a random legal move if it is missed;
+        errors of the agent are raised, a lane whose worker died is restarted and a RuntimeError is raised
+        Return
+        ----------------
+        dict with the move, the time it took, the statistics of the search and "timeout"
+        """
+        start = time.perf_counter()
+        future = None
+        try:
+            future = self.lanes[lane].submit(
+                _generate_move, session_id, agent, board.copy(), player, deadline * DEADLINE_SHARE
+            )
+            move, stats = await asyncio.wait_for(asyncio.wrap_future(future), deadline)
+            timeout = False
+        except asyncio.TimeoutError:
+            future.cancel()  # only a queued search can be cancelled, a running one keeps its lane until it returns
+            move, stats, timeout = int(np.random.choice(np.flatnonzero(board[-1] == NO_PLAYER))), None, True
+            self.counters["timeouts"] += 1
+        except BrokenProcessPool:
+            self.restart_lane(lane)
+            raise RuntimeError(f"the worker of lane {lane} died, it was restarted")
+        self.counters["moves"] += 1
+        return {"move": move, "time": time.perf_counter() - start, "stats": stats, "timeout": timeout}
+
+    def play(self, session: Session, column: int, player: BoardPiece) -> Optional[str]:
+        """apply the move of player to the board of session, return the result for the client if the game ended"""
+        apply_player_action(session.board, column, player)
+        session.moves.append(column)
+        end_state = check_end_state(session.board, player, column, session.config.connect_n)
+        if end_state == GameState.IS_WIN:
+            session.result = "win" if player == session.client_player else "loss"
+        elif end_state == GameState.IS_DRAW:
+            session.result = "draw"
+        return session.result
+
+    async def new_session(self, request: dict) -> dict:
+        agent = request["agent"]
+        parse_agent(agent)  # unknown agents are rejected before the session is created
+        agent_player = BoardPiece(request.get("agent_player", PLAYER2))
+        if agent_player not in (PLAYER1, PLAYER2):
+            raise ValueError(f"agent_player must be {PLAYER1} or {PLAYER2}")
+        config = GameConfig(*request.get("config", DEFAULT_CONFIG))
+        if not supports_config(agent, config):
+            raise ValueError(f"agent {agent!r} does not support the board configuration {tuple(config)}")
+        lane = int(np.argmin(self.lane_sessions))
+        session = Session(next(self.session_ids), agent, agent_player, lane, config)
+        self.sessions[session.id] = session
+        self.lane_sessions[lane] += 1
+
+        response = {"session": session.id, "agent_player": int(agent_player)}
+        if agent_player == PLAYER1:
+            try:
+                async with session.lock:
+                    reply = await self.agent_move(session.id, agent, session.board, agent_player, lane,
+                                                  request.get("deadline", self.default_deadline))
+                    self.play(session, reply["move"], agent_player)
+            except BaseException:
+                self.close_session(session.id)  # the client never learns the id of a failed session
+                raise
+            response.update(agent_move=reply["move"], time=reply["time"], stats=reply["stats"],
+                            timeout=reply["timeout"])
+        return response
+
+    async def move(self, request: dict) -> dict:
+        session = self.get_session(request["session"])
+        async with session.lock:
+            column = int(request["column"])
+            if session.result is not None:
+                raise ValueError(f"the game of session {session.id} is over ({session.result})")
+            if not (0 <= column < session.config.cols and session.board[-1, column] == NO_PLAYER):
+                raise ValueError(f"illegal move {column}")
+            board, n_moves = session.board.copy(), len(session.moves)
+            if self.play(session, column, session.client_player) is not None:
+                return {"result": session.result, "moves": session.moves}
+
+            try:
+                reply = await self.agent_move(session.id, session.agent, session.board, session.agent_player,
+                                              session.lane, request.get("deadline", self.default_deadline))
+            except BaseException:
+                """the move of the client is taken back, the session stays as it was before the request"""
+                session.board, session.result = board, None
+                del session.moves[n_moves:]
+                raise
+            self.play(session, reply["move"], session.agent_player)
+        return {"agent_move": reply["move"], "result": session.result, "time": reply["time"],
+                "stats": reply["stats"], "timeout": reply["timeout"]}
+
+    async def generate(self, request: dict) -> dict:
+        """single move without session, on the lane with the fewest sessions"""
+        board = np.array(request["board"], dtype=BoardPiece)
+        if board.ndim != 2 or not supports_config(request["agent"], GameConfig(*board.shape)):
+            raise ValueError(f"agent {request['agent']!r} does not support boards of shape {board.shape}")
+        lane = int(np.argmin(self.lane_sessions))
+        return await self.agent_move(None, request["agent"], board, BoardPiece(request["player"]), lane,
+                                     request.get("deadline", self.default_deadline))
+
+    def get_session(self, session_id: int) -> Session:
+        if session_id not in self.sessions:
+            raise ValueError(f"unknown session {session_id}")
+        return self.sessions[session_id]
+
+    def close_session(self, session_id: int) -> dict:
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self.lane_sessions[session.lane] -= 1
+            try:
+                self.lanes[session.lane].submit(_close_session, session_id)
+            except (BrokenProcessPool, RuntimeError):
+                pass  # the saved states died with the worker or the server is shutting down
+        return {"closed": session is not None}
+
+    def status(self) -> dict:
+        return dict(self.counters, sessions=len(self.sessions), lanes=len(self.lanes),
+                    lane_sessions=list(self.lane_sessions))
+
+    async def handle(self, request: dict) -> dict:
+        """
+        Answer one request (see the module docstring), errors are answered with {"error": message}
+        """
+        self.counters["requests"] += 1
+        op = request.get("op")
+        try:
+            if op == "new":
+                response = await self.new_session(request)
+            elif op == "move":
+                response = await self.move(request)
+            elif op == "generate":
+                response = await self.generate(request)
+            elif op == "close":
+                response = self.close_session(request["session"])
+            elif op == "status":
+                response = self.status()
+            else:
+                raise ValueError(f"unknown op {op!r}")
+        except Exception as error:  # errors of the request and of the agents in the workers
+            self.counters["errors"] += 1
+            response = {"error": f"{type(error).__name__}: {error}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Read the requests of a connection line by line and answer each of them as soon as it is handled;
+        the sessions opened on the connection are closed when it ends
+        """
+        write_lock = asyncio.Lock()
+        tasks = set()
+        opened = set()
+
+        async def respond(request: dict):
+            response = await self.handle(request)
+            if request.get("op") == "new" and "session" in response:
+                opened.add(response["session"])
+            async with write_lock:
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as error:
+                    request = {"op": None, "error": str(error)}
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except (ConnectionError, asyncio.CancelledError):
+            """client gone or server shutting down: the pending requests are dropped (the cancellation is not
+            propagated, asyncio would log it as an error of the connection callback)"""
+            for task in tasks:
+                task.cancel()
+        finally:
+            for session_id in opened:
+                self.close_session(session_id)
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, path: Optional[str] = None):
+        """start listening on host:port, or on the unix socket at path"""
+        if path is not None:
+            return await asyncio.start_unix_server(self.serve_connection, path)
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+
+async def serve(host: str, port: int, path: Optional[str], n_workers: Optional[int], deadline: float):
+    game_server = GameServer(n_workers, deadline)
+    server = await game_server.start(host, port, path)
+    print(f"serving on {path or f'{host}:{port}'} with {len(game_server.lanes)} worker lanes")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="connect 4 game server (JSON lines over a local socket)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None, metavar="PATH", help="listen on a unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker lanes (all cores by default)")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE, help="default deadline per move (s)")
+    args = parser.parse_args(args)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.deadline))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
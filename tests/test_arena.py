@@ -0,0 +1,120 @@
+import csv
+import json
+import numpy as np
+import pytest
+from agents.common import *
+from arena import parse_agent, play_game, run_tournament, summarize, elo_difference, game_seeds, main
+
+
+def test_parse_agent():
+    from agents.agent_minimax import generate_move_minimax
+    generate_move, kwargs = parse_agent("minimax:depth=2,runtime=null,book=false")
+    assert generate_move is generate_move_minimax
+    assert kwargs == {"depth": 2, "runtime": None, "book": False}
+    assert parse_agent("agents.agent_random.random.generate_move_random")[1] == {}
+    with pytest.raises(ValueError):
+        parse_agent("unknown")
+
+
+def test_play_game():
+    """test if a game is reproducible from its seed and ends with a legal result"""
+    record = play_game("random", "random", seed=3)
+    replayed = play_game("random", "random", seed=3)
+    assert (record["moves"], record["result"]) == (replayed["moves"], replayed["result"])
+    assert record["result"] in ("win", "draw", "loss")
+    assert len(record["moves"]) == len(record["times"])
+    assert record["stats"] == [None] * len(record["moves"])  # the random agent has no statistics
+
+    board = initialize_game_state()
+    player = PLAYER1
+    for move in record["moves"]:
+        apply_player_action(board, move, player)
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+    last_player = PLAYER2 if player == PLAYER1 else PLAYER1
+    if record["reason"] == "connect4":
+        assert check_end_state(board, last_player) == GameState.IS_WIN
+        """agent_1 moved first, so it won if the last move was made by PLAYER1"""
+        assert record["result"] == ("win" if last_player == PLAYER1 else "loss")
+
+    """minimax beats random, also when it moves second"""
+    record = play_game("random", "minimax:depth=2,runtime=null,book=false", seed=0, agent_1_first=False)
+    assert record["result"] == "loss"
+
+
+def test_move_time_limit():
+    record = play_game("minimax:depth=4,runtime=null,book=false", "random", seed=0, move_time=1e-6)
+    assert record["reason"] == "timeout"
+    assert record["result"] == "loss"
+    assert len(record["moves"]) == 1
+
+
+def test_tournament(tmp_path):
+    """test if the colours alternate and the records are streamed to JSONL and CSV"""
+    path = str(tmp_path / "games.jsonl")
+    records = run_tournament("random", "random", 6, seed=1, output=path)
+    assert [record["agent_1_first"] for record in records] == [True, False] * 3
+    assert [record["seed"] for record in records] == game_seeds(1, 6)
+    with open(path) as file:
+        assert [json.loads(line) for line in file] == records
+
+    path = str(tmp_path / "games.csv")
+    run_tournament("random", "random", 4, seed=1, output=path)
+    with open(path) as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 4
+    assert [int(move) for move in rows[0]["moves"].split()] == records[0]["moves"]
+
+    """the games played on the process pool are the same"""
+    parallel_records = run_tournament("random", "random", 6, n_workers=2, seed=1)
+    assert sorted((r["seed"], r["moves"]) for r in parallel_records) == sorted((r["seed"], r["moves"]) for r in records)
+
+    summary = main(["random", "random", "--games", "4", "--seed", "1"])
+    assert summary["wins"] + summary["draws"] + summary["losses"] == 4
+
+
+def test_other_board_sizes():
+    """test if games on larger boards with connect 5 end with a legal result"""
+    config = GameConfig(8, 9, 5)
+    record = play_game("random", "random", seed=2, config=config)
+    assert record["config"] == [8, 9, 5]
+    board = initialize_game_state(config)
+    player = PLAYER1
+    for move in record["moves"]:
+        apply_player_action(board, move, player)
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+    last_player = PLAYER2 if player == PLAYER1 else PLAYER1
+    if record["reason"] == "connect4":
+        assert connected_four(board, last_player, connect_n=5)
+    else:
+        assert record["reason"] == "draw" and len(record["moves"]) == 8 * 9
+
+    summary = main(["random", "random", "--games", "2", "--rows", "7", "--cols", "8", "--connect", "5"])
+    assert summary["games"] == 2
+
+
+def test_search_stats_recorded(tmp_path):
+    """test if the statistics of the searching agents are recorded and the profile is saved"""
+    path = str(tmp_path / "games.prof")
+    main(["mcts:runtime=null,max_iterations=20,book=false", "minimax:runtime=null,depth=1,book=false", "--games", "1",
+          "--output", str(tmp_path / "games.jsonl"), "--profile", path])
+    with open(tmp_path / "games.jsonl") as file:
+        record = json.loads(file.readline())
+    assert record["stats"][0]["iterations"] == 20
+    assert record["stats"][1]["completed_depth"] == 1
+    import pstats
+    assert pstats.Stats(path).total_calls > 0
+
+
+def test_summarize():
+    records = [{"result": "win", "reason": "connect4"}] * 6 + [{"result": "draw", "reason": "draw"}] * 2 + \
+              [{"result": "loss", "reason": "timeout"}] * 2
+    summary = summarize(records)
+    assert (summary["wins"], summary["draws"], summary["losses"], summary["timeouts"]) == (6, 2, 2, 2)
+    assert summary["score"] == pytest.approx(0.7)
+    low, high = summary["score_interval"]
+    assert low < 0.7 < high
+    assert summary["elo"] == pytest.approx(-400 * np.log10(1 / 0.7 - 1))
+    assert summary["elo_interval"][0] < summary["elo"] < summary["elo_interval"][1]
+    assert summarize(records[:6])["score_interval"][0] > 0.5  # 6 wins out of 6
+    assert elo_difference(0.5) == 0
+    assert elo_difference(1.0) == np.inf
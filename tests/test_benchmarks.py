@@ -0,0 +1,62 @@
+import json
+import numpy as np
+from agents.common import *
+from benchmarks.corpus import CORPUS, corpus_boards
+from benchmarks.suite import BENCHMARKS, run_benchmarks, save_results, load_results, compare_results
+from benchmarks.__main__ import main
+
+
+def test_corpus():
+    """test if the corpus positions are legal, unfinished and have the documented number of pieces"""
+    n_pieces = {"early": 4, "mid": 14, "late": 26}
+    for phase, boards in corpus_boards().items():
+        assert len(boards) == len(CORPUS[phase])
+        for board in boards:
+            assert np.count_nonzero(board) == n_pieces[phase]
+            assert np.count_nonzero(board == PLAYER1) == np.count_nonzero(board == PLAYER2)
+            assert check_end_state(board, PLAYER1) == GameState.STILL_PLAYING
+            assert check_end_state(board, PLAYER2) == GameState.STILL_PLAYING
+
+
+def test_run_and_compare(tmp_path):
+    names = ["get_valid_columns", "evaluate_board"]
+    results = run_benchmarks(names, repeat=1)
+    assert list(results) == names
+    for result in results.values():
+        assert result["ops"] > 0
+        assert np.isclose(result["ops_per_second"] * result["seconds_per_op"], 1)
+
+    path = str(tmp_path / "baseline.json")
+    save_results(path, results)
+    assert load_results(path) == results
+    assert "environment" in json.load(open(path))
+
+    slower = {name: dict(result, seconds_per_op=result["seconds_per_op"] * 1.5) for name, result in results.items()}
+    faster = {name: dict(result, seconds_per_op=result["seconds_per_op"] * 0.5) for name, result in results.items()}
+    assert compare_results(results, results) == []
+    assert compare_results(results, slower, threshold=0.1) == names
+    assert compare_results(results, slower, threshold=0.6) == []
+    assert compare_results(results, faster) == []
+    assert compare_results({}, slower) == []
+
+    slower_path = str(tmp_path / "slower.json")
+    save_results(slower_path, slower)
+    assert main(["compare", path, slower_path]) == 1
+    assert main(["compare", path, path]) == 0
+
+
+def test_benchmarks_registered():
+    for name in ["connected_four", "check_end_state", "evaluate_board", "get_valid_columns", "apply_player_action",
+                 "minimax_search", "mcts_playouts"]:
+        assert name in BENCHMARKS
+
+
+def test_search_nodes_are_metric():
+    """the fixed depth search is timed per position, fewer nodes (better ordering) are no regression"""
+    results = run_benchmarks(["minimax_search"], repeat=1)
+    result = results["minimax_search"]
+    assert result["unit"] == "position" and result["ops"] == len(corpus_boards()["mid"])
+    assert result["metrics"]["nodes"] > result["ops"]
+
+    fewer_nodes = {"minimax_search": dict(result, metrics={"nodes": result["metrics"]["nodes"] // 2})}
+    assert compare_results(results, fewer_nodes, verbose=True) == []
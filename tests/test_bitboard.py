@@ -0,0 +1,121 @@
+import numpy as np
+from agents.common import *
+from agents.bitboard import BitBoard, connected_four_bits, mirror_action
+from agents.agent_minimax.minimax import get_valid_columns, evaluate_board, evaluate_bitboard
+from tests.test_common import generate_draw_board, generate_win_board, HORIZONTAL, VERTICAL, DIAGONAL
+
+
+def generate_random_board(n_moves: int, seed: int = 0) -> np.ndarray:
+    """play n_moves random moves (alternating players) on an empty board, stops early if the game ends"""
+    rng = np.random.default_rng(seed)
+    board = initialize_game_state()
+    player = PLAYER1
+    for _ in range(n_moves):
+        action = rng.choice(get_valid_columns(board))
+        apply_player_action(board, action, player)
+        if check_end_state(board, player) != GameState.STILL_PLAYING:
+            break
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+    return board
+
+
+def test_other_board_sizes():
+    """the bitboard holds the default board size only"""
+    import pytest
+
+    with pytest.raises(ValueError):
+        BitBoard.from_array(initialize_game_state(GameConfig(7, 8, 4)))
+
+
+def test_conversion_roundtrip():
+    """test if ndarray -> bitboard -> ndarray is lossless"""
+    for seed in range(20):
+        board = generate_random_board(seed + 5, seed)
+        position = BitBoard.from_array(board)
+        assert np.array_equal(position.to_array(), board)
+        assert position.n_moves == np.count_nonzero(board)
+
+    board = generate_draw_board()
+    assert np.array_equal(BitBoard.from_array(board).to_array(), board)
+    assert BitBoard.from_array(board).is_full()
+
+
+def test_play_and_undo():
+    """test if play places pieces like apply_player_action and undo restores the position"""
+    board = generate_random_board(12, seed=3)
+    position = BitBoard.from_array(board)
+    key = position.key()
+    for column in get_valid_columns(board):
+        position.play(column, PLAYER2)
+        assert np.array_equal(position.to_array(), apply_player_action(board, column, PLAYER2, True))
+        position.undo(column)
+        assert position.key() == key
+
+
+def test_valid_columns():
+    board = initialize_game_state()
+    for _ in range(6):
+        apply_player_action(board, 2, PLAYER1)
+        apply_player_action(board, 5, PLAYER2)
+    position = BitBoard.from_array(board)
+    assert position.valid_columns() == get_valid_columns(board) == [0, 1, 3, 4, 6]
+    assert position.valid_moves_mask() == 0b1011011
+    assert not position.can_play(2)
+    assert position.can_play(3)
+
+
+def test_connected_four():
+    """test if the shift-and-mask win detection agrees with check_end_state"""
+    for direction in (HORIZONTAL, VERTICAL, DIAGONAL):
+        for player in (PLAYER1, PLAYER2):
+            opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+            position = BitBoard.from_array(generate_win_board(direction, player))
+            assert position.connected_four(player)
+            assert not position.connected_four(opponent)
+
+            position = BitBoard.from_array(generate_win_board(direction, player, apply_last_action=False))
+            assert not position.connected_four(player)
+
+    for seed in range(30):
+        board = generate_random_board(42, seed)
+        position = BitBoard.from_array(board)
+        for player in (PLAYER1, PLAYER2):
+            assert position.connected_four(player) == connected_four(board, player)
+
+    """pieces in different columns must not be joined across the column border"""
+    assert not connected_four_bits((0b11 << 4) | (0b11 << 7))
+
+
+def test_evaluate_bitboard():
+    """test if the bitboard evaluation returns exactly the scores of evaluate_board"""
+    for seed in range(20):
+        board = generate_random_board(seed + 3, seed)
+        position = BitBoard.from_array(board)
+        for player in (PLAYER1, PLAYER2):
+            assert evaluate_bitboard(position, player) == evaluate_board(board, player)
+
+
+def test_mirror_symmetry():
+    """test if the mirrored bitboard, its hashes and the canonical keys agree with np.fliplr"""
+    for seed in range(20):
+        board = generate_random_board(5 + seed, seed)
+        position = BitBoard.from_array(board)
+        mirrored = BitBoard.from_array(np.fliplr(board))
+        assert position.mirrored() == mirrored
+        assert position.mirrored().heights == mirrored.heights
+        assert (position.mirrored().hash, position.mirrored().mirror_hash) == (mirrored.hash, mirrored.mirror_hash)
+        for player in (PLAYER1, PLAYER2):
+            key, flag = position.canonical_key(player)
+            mirrored_key, mirrored_flag = mirrored.canonical_key(player)
+            assert key == mirrored_key
+            assert flag != mirrored_flag or position == mirrored
+            assert position.canonical_zobrist_key(player)[0] == mirrored.canonical_zobrist_key(player)[0]
+
+    """the mirror hash is updated incrementally"""
+    position = BitBoard()
+    for column in (0, 1, 1, 5, 6):
+        position.play(column, PLAYER1)
+    assert position.mirror_hash == BitBoard.from_array(np.fliplr(position.to_array())).hash
+    position.undo(6)
+    assert position.mirror_hash == BitBoard.from_array(np.fliplr(position.to_array())).hash
+    assert mirror_action(PlayerAction(1)) == 5
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from agents.common import *
+from agents.bitboard import BitBoard
+from agents.book import OpeningBook, BOOK_DTYPE, book_key, build_book, write_book, get_book, enumerate_positions
+from agents.agent_minimax.minimax import solve, generate_move_minimax
+from agents.agent_mct.montecarlo import generate_move_montecarlo
+from tests.test_bitboard import generate_random_board
+
+
+def endgame_board() -> np.ndarray:
+    """position with 30 pieces and no four in a row, PLAYER1 to move"""
+    for seed in range(100):
+        board = generate_random_board(30, seed)
+        if np.count_nonzero(board) == 30:
+            return board
+
+
+def test_build_and_lookup(tmp_path):
+    """test if the book holds the solver values of all positions up to the given number of plies"""
+    board = endgame_board()
+    records = build_book(2, board, PLAYER1)
+    position = BitBoard.from_array(board)
+    assert len(records) == len(enumerate_positions(position, PLAYER1, 2))
+    assert np.all(np.diff(records["key"].astype(np.float64)) > 0)
+
+    path = str(tmp_path / "book.npy")
+    write_book(path, records)
+    book = OpeningBook(path)
+    assert len(book) == len(records)
+    move, value = book.lookup(board, PLAYER1)
+    assert (move, value) == solve(board, PLAYER1)
+    assert book_key(position, PLAYER1)[0] in book
+    assert book.lookup(board, PLAYER2) is None
+    assert book.lookup(initialize_game_state(), PLAYER1) is None
+
+    """positions one ply deeper"""
+    for column in position.valid_columns():
+        child = position.copy().play(column, PLAYER1)
+        if not child.connected_four(PLAYER1):
+            assert book.lookup(child, PLAYER2) == solve(child, PLAYER2)
+
+    """mirror images share a record, the move is mirrored"""
+    mirrored_move, mirrored_value = book.lookup(np.fliplr(board), PLAYER1)
+    assert (6 - mirrored_move, mirrored_value) == (move, value)
+
+    """writing again merges the records"""
+    extra = np.array([(book_key(BitBoard(), PLAYER1)[0], 0, 3)], dtype=BOOK_DTYPE)
+    write_book(path, extra)
+    assert len(OpeningBook(path)) == len(records) + 1
+
+
+def test_agents_consult_book(tmp_path, monkeypatch):
+    """test if both agents play the book move without searching"""
+    path = str(tmp_path / "book.npy")
+    write_book(path, np.array([(book_key(BitBoard(), PLAYER1)[0], 0, 6)], dtype=BOOK_DTYPE))
+
+    board = initialize_game_state()
+    assert generate_move_minimax(board, PLAYER1, None, runtime=5, book=path)[0] == 6
+    action, saved_state = generate_move_montecarlo(board, PLAYER1, None, runtime=5, book=path)
+    assert action == 6
+    assert saved_state.stats.stop_reason == "book"
+
+    monkeypatch.setenv("CONNECT4_BOOK", path)
+    assert get_book() is get_book(path)
+    assert generate_move_minimax(board, PLAYER1, None, runtime=5)[0] == 6
+    assert get_book(False) is None
+    assert generate_move_minimax(board, PLAYER1, None, depth=2, runtime=None, book=False)[0] != 6
+
+    with pytest.raises(ValueError):
+        np.save(tmp_path / "other.npy", np.zeros(3))
+        OpeningBook(str(tmp_path / "other.npy"))
@@ -81,6 +81,60 @@ def test_pretty_print_and_string_to_board():
     assert board.all() == board_out.all()
 
 
+def test_string_to_board_roundtrip():
+    """test if pretty_print_board -> string_to_board is lossless, also for other board sizes"""
+    from tests.test_bitboard import generate_random_board
+
+    for board in (generate_draw_board().astype(BoardPiece), generate_random_board(20, seed=1)):
+        assert np.array_equal(string_to_board(pretty_print_board(board)), board)
+    for config in (GameConfig(7, 8, 4), GameConfig(8, 9, 5), GameConfig(4, 12, 3)):
+        board = initialize_game_state(config)
+        assert board.shape == config.shape
+        rng = np.random.default_rng(0)
+        for move in range(20):
+            apply_player_action(board, rng.integers(config.cols), PLAYER1 if move % 2 == 0 else PLAYER2)
+        assert np.array_equal(string_to_board(pretty_print_board(board)), board)
+
+
+def test_batched_board_functions():
+    """test the batched functions against their single board versions"""
+    from tests.test_bitboard import generate_random_board
+
+    boards = np.stack([generate_random_board(n_moves, seed) for n_moves in (0, 8, 20, 42) for seed in range(5)])
+    players = np.array([PLAYER1, PLAYER2] * 10, dtype=BoardPiece)
+    assert connected_four_boards(boards, players).tolist() == [
+        connected_four(board, player) for board, player in zip(boards, players)
+    ]
+    assert valid_moves_mask(boards).tolist() == [
+        [column in get_valid_columns(board) for column in range(7)] for board in boards
+    ]
+    actions = np.arange(len(boards)) % 7
+    expected = [apply_player_action(board, action, player, copying=True)
+                for board, action, player in zip(boards, actions, players)]
+    assert np.array_equal(apply_player_actions(boards.copy(), actions, players), np.stack(expected))
+
+
+def test_line_indices():
+    """test the cached line tables and the connect-n check on other board sizes"""
+    assert line_indices().shape == (69, 4)
+    assert line_indices(GameConfig(6, 7, 4)) is line_indices(DEFAULT_CONFIG)  # computed once per config
+    """rows * (cols - n + 1) + cols * (rows - n + 1) + 2 * (rows - n + 1) * (cols - n + 1) lines"""
+    assert line_indices(GameConfig(8, 9, 5)).shape == (8 * 5 + 9 * 4 + 2 * 4 * 5, 5)
+    assert line_indices(GameConfig(3, 3, 4)).shape == (0, 4)
+
+    config = GameConfig(8, 9, 5)
+    board = initialize_game_state(config)
+    for column in range(2, 6):
+        apply_player_action(board, column, PLAYER1)
+    assert connected_four(board, PLAYER1)
+    assert not connected_four(board, PLAYER1, connect_n=config.connect_n)
+    apply_player_action(board, 6, PLAYER1)
+    assert connected_four(board, PLAYER1, 6, config.connect_n)
+    assert connected_four(board, PLAYER1, connect_n=config.connect_n)
+    assert check_end_state(board, PLAYER1, connect_n=config.connect_n) == GameState.IS_WIN
+    assert check_end_state(board, PLAYER2, connect_n=config.connect_n) == GameState.STILL_PLAYING
+
+
 def test_apply_player_action():
 
     """test if valid action is applied correctly """
@@ -137,3 +191,73 @@ def test_check_end_state():
     # print(pretty_print_board(board_win_p2))
     assert check_end_state(board_win_p2, PLAYER1) == GameState.STILL_PLAYING
     assert check_end_state(board_win_p2, PLAYER2) == GameState.IS_WIN
+
+
+def test_connected_four_last_action():
+    """test if the last-move-aware check agrees with the full board scan"""
+    rng = np.random.default_rng(0)
+    for game in range(30):
+        board = initialize_game_state()
+        player = PLAYER1
+        while True:
+            action = rng.choice(get_valid_columns(board))
+            apply_player_action(board, action, player)
+            won = connected_four(board, player)
+            assert connected_four(board, player, action) == won
+            end_state = check_end_state(board, player, action)
+            assert end_state == check_end_state(board, player)
+            if end_state != GameState.STILL_PLAYING:
+                break
+            player = PLAYER2 if player == PLAYER1 else PLAYER1
+
+    """check if GameState.IS_DRAW is returned for a full board"""
+    assert check_end_state(generate_draw_board(), PLAYER1, 6) == GameState.IS_DRAW
+
+
+def test_undo_player_action():
+    """test if undo_player_action takes back apply_player_action, with and without column-height index"""
+    board = generate_win_board(DIAGONAL, PLAYER1, apply_last_action=False)
+    original = board.copy()
+    heights = column_heights(board)
+    assert list(heights) == [1, 3, 3, 2, 2, 2, 4]
+
+    for column in range(7):
+        apply_player_action(board, column, PLAYER2, heights=heights)
+        assert np.array_equal(board, apply_player_action(original, column, PLAYER2, True))
+        assert np.array_equal(heights, column_heights(board))
+        undo_player_action(board, column, heights)
+        assert np.array_equal(board, original)
+        assert np.array_equal(heights, column_heights(original))
+
+        apply_player_action(board, column, PLAYER1)
+        undo_player_action(board, column)
+        assert np.array_equal(board, original)
+
+    """a full column is left unchanged"""
+    board = generate_draw_board()
+    heights = column_heights(board)
+    assert np.array_equal(apply_player_action(board.copy(), 3, PLAYER1, heights=heights), board)
+    assert heights[3] == 6
+
+
+def test_canonical_board():
+    """test if a board and its mirror image have the same canonical form and key"""
+    board = initialize_game_state()
+    assert canonical_board(board, PLAYER1)[2] is False
+    board[0, 0] = PLAYER1
+    board[0, 3] = PLAYER2
+    board[1, 3] = PLAYER1
+    canonical, key, mirrored = canonical_board(board, PLAYER2)
+    mirrored_canonical, mirrored_key, mirrored_flag = canonical_board(np.fliplr(board), PLAYER2)
+    assert np.array_equal(canonical, mirrored_canonical) and key == mirrored_key
+    assert mirrored != mirrored_flag
+    assert np.array_equal(canonical, np.fliplr(board) if mirrored else board)
+    assert canonical_board(board, PLAYER1)[1] != key
+
+    """moves map back to the original board"""
+    assert mirror_player_action(PlayerAction(0), board) == 6
+    assert mirror_player_action(PlayerAction(3), board) == 3
+    for action in range(7):
+        played = apply_player_action(board, action, PLAYER2, copying=True)
+        mirrored_played = apply_player_action(np.fliplr(board), mirror_player_action(action, board), PLAYER2, True)
+        assert np.array_equal(np.fliplr(played), mirrored_played)
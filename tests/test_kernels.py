@@ -0,0 +1,90 @@
+import numpy as np
+import random
+import pytest
+from agents import kernels
+from agents.common import *
+from agents.bitboard import BitBoard
+from agents.agent_minimax.minimax import get_valid_columns, evaluate_board
+from agents.agent_mct.montecarlo import random_rollout
+from tests.test_bitboard import generate_random_board
+from tests.test_common import generate_draw_board
+
+"""
+The kernels are compared with the NumPy/pure-Python implementations (kernels disabled), compiled by numba if
+it is installed and run as plain Python otherwise.
+"""
+
+
+@pytest.fixture
+def jit(monkeypatch):
+    """public functions dispatch to the kernels (plain Python functions without numba)"""
+    monkeypatch.setattr(kernels, "ENABLED", True)
+
+
+@pytest.fixture
+def no_jit(monkeypatch):
+    monkeypatch.setattr(kernels, "ENABLED", False)
+
+
+def random_boards():
+    return [generate_random_board(n_moves, seed) for n_moves in (0, 5, 12, 20, 30, 42) for seed in range(6)]
+
+
+def results(board):
+    """results of the public functions for board, with the current kernel setting"""
+    heights = column_heights(board)
+    last_actions = [None] + [column for column in range(7) if heights[column] > 0]
+    return (
+        [connected_four(board, player, last_action) for player in (PLAYER1, PLAYER2) for last_action in last_actions],
+        [check_end_state(board, player) for player in (PLAYER1, PLAYER2)],
+        get_valid_columns(board),
+        [evaluate_board(board, player) for player in (PLAYER1, PLAYER2)],
+        [apply_player_action(board, column, PLAYER1, copying=True).tolist() for column in get_valid_columns(board)],
+    )
+
+
+def test_kernels_agree(monkeypatch):
+    for board in random_boards():
+        monkeypatch.setattr(kernels, "ENABLED", False)
+        expected = results(board)
+        monkeypatch.setattr(kernels, "ENABLED", True)
+        assert results(board) == expected
+
+
+def test_connected_four_kernel(no_jit):
+    """vertical, horizontal and both diagonals, also for other line lengths"""
+    for board in random_boards():
+        for player in (PLAYER1, PLAYER2):
+            for connect_n in (3, 4, 5):
+                assert kernels.connected_four_kernel(board, player, connect_n) == connected_four(board, player,
+                                                                                                 connect_n=connect_n)
+
+
+def test_valid_columns_kernel(jit):
+    board = generate_draw_board().astype(BoardPiece)
+    assert get_valid_columns(board) == []
+    board[5, [1, 6]] = NO_PLAYER
+    assert get_valid_columns(board) == [1, 6]
+    assert all(isinstance(column, int) for column in get_valid_columns(board))
+
+
+def test_rollout_kernel(jit):
+    """rollouts are legal, reproducible with random.seed and report draws as GameState.IS_DRAW"""
+    for board in random_boards():
+        position = BitBoard.from_array(board)
+        player = PLAYER1 if position.n_moves % 2 == 0 else PLAYER2
+        last_player = PLAYER2 if player == PLAYER1 else PLAYER1
+        random.seed(1)
+        winner = random_rollout(position, last_player)
+        random.seed(1)
+        assert random_rollout(position, last_player) == winner
+        assert winner in (PLAYER1, PLAYER2, GameState.IS_DRAW)
+        if position.connected_four(last_player):
+            assert winner == last_player
+
+    """a single empty cell: the rollout is forced, both implementations agree"""
+    board = generate_draw_board().astype(BoardPiece)
+    board[5, 6] = NO_PLAYER
+    jit_winner = random_rollout(BitBoard.from_array(board), PLAYER1)
+    kernels.ENABLED = False
+    assert random_rollout(BitBoard.from_array(board), PLAYER1) == jit_winner
@@ -1,5 +1,6 @@
 from agents.agent_mct.montecarlo import *
 from tests.test_common import *
+import pytest
 
 
 def test_initialize_node():
@@ -118,3 +119,166 @@ def test_mcts_1order_loose():
 
     print(pretty_print_board(board))
     assert not check_end_state(board, PLAYER2) == GameState.IS_WIN
+
+
+def test_tree_reuse():
+    """test if the subtree of our move and the opponents reply becomes the new root"""
+    board = initialize_game_state()
+    action, saved_state = generate_move_montecarlo(board, PLAYER1, None, runtime=0.5)
+    assert isinstance(saved_state, MctsState)
+    old_root = saved_state.root_node
+
+    apply_player_action(board, action, PLAYER1)
+    reply = next(node for node in old_root.child_nodes if node.move == action).child_nodes[0]
+    apply_player_action(board, reply.move, PLAYER2)
+    reply_sims = reply.sims
+
+    new_root = saved_state.advance(board, PLAYER1)
+    assert new_root is reply
+    assert new_root.parent is None
+    assert new_root.sims == reply_sims > 0
+    assert saved_state.root_node is None
+
+    """a board which is not in the tree gives a new root"""
+    saved_state.root_node, saved_state.last_move = new_root, 3
+    board_other = initialize_game_state()
+    new_root = saved_state.advance(board_other, PLAYER1)
+    assert new_root.sims == 0 and new_root.child_nodes == []
+
+    """generate_move_montecarlo continues with the reused tree"""
+    saved_state.root_node, saved_state.last_move = old_root, action
+    sims_before = reply_sims
+    _, saved_state = generate_move_montecarlo(board, PLAYER1, saved_state, runtime=0.2)
+    assert saved_state.root_node is reply
+    assert reply.sims > sims_before
+
+
+def test_vectorized_selection():
+    """test if the vectorized selection picks the child with the highest UCB1 value"""
+    random.seed(3)
+    root_node = Node(initialize_game_state(), PLAYER1)
+    mcts_run(root_node, 0.2)
+    assert root_node.possibleMoves == []
+
+    expected = max(root_node.child_nodes, key=lambda child: child.wins / child.sims
+                   + np.sqrt(2) * np.sqrt(np.log(root_node.sims) / child.sims))
+    assert root_node.mcts_selection() is expected
+    n = len(root_node.child_nodes)
+    assert np.array_equal(root_node.child_sims[:n], [child.sims for child in root_node.child_nodes])
+    assert np.array_equal(root_node.child_moves[:n], [child.move for child in root_node.child_nodes])
+
+    for policy in ("ucb1-tuned", "puct"):
+        assert mcts_run(root_node, 0.1, policy) > 0
+        assert root_node.mcts_selection(policy) in root_node.child_nodes
+
+
+def test_mcts_budgets():
+    """test the stopping conditions of mcts_run"""
+
+    """a fixed number of iterations makes the search reproducible"""
+    results = []
+    for _ in range(2):
+        random.seed(5)
+        stats = MctsStats()
+        action = mcts_algorithm(initialize_game_state(), PLAYER1, runtime=None, max_iterations=300, stats=stats)
+        assert stats.iterations == 300 and stats.stop_reason == "iterations"
+        results.append((action, stats.simulations, stats.nodes))
+    assert results[0] == results[1]
+
+    """the tree does not grow beyond max_nodes"""
+    root_node = Node(initialize_game_state(), PLAYER1)
+    stats = MctsStats()
+    mcts_run(root_node, runtime=10, max_nodes=50, stats=stats)
+    assert stats.stop_reason == "nodes"
+    assert count_nodes(root_node) == stats.nodes == 50
+
+    """the search ends when the root is solved (no node is left to expand)"""
+    board = generate_draw_board()
+    board[5, 6] = NO_PLAYER
+    stats = MctsStats()
+    mcts_algorithm(board, PLAYER1, runtime=10, stats=stats)
+    assert stats.stop_reason == "solved"
+    assert stats.elapsed < 1
+
+    with pytest.raises(ValueError):
+        mcts_run(Node(initialize_game_state(), PLAYER1), runtime=None)
+
+
+def test_mcts_stats():
+    """test the tree depth, the time per phase and the statistics returned in saved_state"""
+    import json
+
+    stats = MctsStats()
+    root_node = Node(initialize_game_state(), PLAYER1)
+    mcts_run(root_node, runtime=None, max_iterations=500, stats=stats)
+    depths = []
+    nodes = [(root_node, 0)]
+    while nodes:
+        node, depth = nodes.pop()
+        depths.append(depth)
+        nodes.extend((child, depth + 1) for child in node.child_nodes)
+    assert stats.max_depth == max(depths)
+    assert set(stats.phase_times) == set(PHASES)
+    assert 0 < sum(stats.phase_times.values()) <= stats.elapsed
+
+    _, saved_state = generate_move_montecarlo(initialize_game_state(), PLAYER1, None, runtime=None, max_iterations=50,
+                                              book=False)
+    assert saved_state.stats.iterations == 50
+    assert json.loads(json.dumps(saved_state.stats.as_dict()))["simulations"] == 50
+    assert "50 simulations" in str(saved_state.stats)
+
+
+def test_mcts_early_stop():
+    """test if the search stops early once the best root child can not be overtaken"""
+    random.seed(0)
+    board = initialize_game_state()
+    board[0, 6] = board[1, 6] = board[2, 6] = PLAYER2
+    board[0, 2] = board[0, 3] = board[1, 3] = PLAYER1
+    stats = MctsStats()
+    root_node = Node(board, PLAYER1)
+    action = mcts_algorithm(board, PLAYER1, None, root_node, max_iterations=20000, early_stop=True, stats=stats)
+    assert action == 6
+    assert stats.stop_reason == "early_stop"
+    assert stats.iterations < 20000
+
+    """the chosen move is the most simulated child, its lead exceeds the remaining budget"""
+    robust_child = root_node.pick_robust_action()
+    assert robust_child.move == action and robust_child is root_node.pick_best_action()
+    runner_up = max(child.sims for child in root_node.child_nodes if child is not robust_child)
+    assert robust_child.sims - runner_up > 20000 - stats.iterations
+
+    root_node = Node(initialize_game_state(), PLAYER1)
+    assert not best_child_decided(root_node, 0)
+
+
+def test_mcts_solver():
+    """test if proven wins and losses are propagated and end the search"""
+
+    """terminal nodes are proven and not expanded"""
+    node = Node(generate_win_board(HORIZONTAL, PLAYER1), PLAYER2)
+    assert node.proven == PROVEN_WIN
+    assert node.possibleMoves == []
+    assert Node(generate_draw_board(), PLAYER1).proven == PROVEN_DRAW
+
+    """an immediate win solves the root at once"""
+    board = initialize_game_state()
+    board[0, :3] = PLAYER1
+    board[1, :2] = PLAYER2
+    stats = MctsStats()
+    assert mcts_algorithm(board, PLAYER1, runtime=10, stats=stats) == 3
+    assert stats.stop_reason == "solved"
+    assert stats.elapsed < 1
+
+    """moves allowing an immediate win of the opponent are proven losses and not selected anymore"""
+    random.seed(1)
+    board = initialize_game_state()
+    board[0, 6] = board[1, 6] = board[2, 6] = PLAYER2
+    board[0, 2] = board[0, 3] = board[1, 3] = PLAYER1
+    root_node = Node(board, PLAYER1)
+    mcts_run(root_node, runtime=None, max_iterations=3000)
+    for child in root_node.child_nodes:
+        if child.move != 6:
+            assert child.proven == PROVEN_LOSS
+            assert root_node.child_solved[child.index]
+            assert child.sims < 50
+    assert root_node.pick_best_action().move == 6
@@ -92,3 +92,222 @@ def test_evaluate_board():
 
 def test_evaluate_window():
     pass
+
+
+def test_generate_move_minimax_immediate_win():
+    """test if the minimax agent completes a 4-connect and blocks the 4-connect of the opponent"""
+    from tests.test_common import generate_win_board, HORIZONTAL, VERTICAL, DIAGONAL
+
+    for direction in (HORIZONTAL, VERTICAL, DIAGONAL):
+        board = generate_win_board(direction, PLAYER1, apply_last_action=False)
+        action, _ = generate_move_minimax(board, PLAYER1, None)
+        apply_player_action(board, action, PLAYER1)
+        assert check_end_state(board, PLAYER1) == GameState.IS_WIN
+
+        board = generate_win_board(direction, PLAYER2, apply_last_action=False, block_opponent_win=True)
+        action, _ = generate_move_minimax(board, PLAYER1, None)
+        assert action == 5
+
+
+def test_minimax_alpha_beta_pruning_views():
+    """test if the minimizing call returns the value of the maximizing call from the opponents view"""
+    board = initialize_game_state()
+    for i, x in enumerate((3, 3, 2, 4)):
+        apply_player_action(board, x, PLAYER1 if i % 2 == 0 else PLAYER2)
+
+    column_max, value_max = minimax_alpha_beta_pruning(board, 3, PLAYER1, True, -np.inf, np.inf)
+    column_min, value_min = minimax_alpha_beta_pruning(board, 3, PLAYER1, False, -np.inf, np.inf)
+    assert column_max == column_min
+    assert value_max == -value_min
+
+
+def test_iterative_deepening():
+    """test if iterative deepening keeps the time budget and returns the result of the deepest iteration"""
+    import time
+    from agents.agent_minimax.transposition import TranspositionTable
+
+    board = initialize_game_state()
+    for i, x in enumerate((3, 3, 2, 4, 4)):
+        apply_player_action(board, x, PLAYER1 if i % 2 == 0 else PLAYER2)
+
+    t0 = time.time()
+    action, value, depth = iterative_deepening(board, PLAYER2, runtime=0.3)
+    assert time.time() - t0 < 0.3 + 0.2
+    assert depth >= 1
+    assert action in get_valid_columns(board)
+
+    """the completed iterations give the same value as a search to the same fixed depth"""
+    _, value, depth = iterative_deepening(board, PLAYER2, runtime=10, max_depth=4, tt=TranspositionTable(1 << 12))
+    _, value_fixed = minimax_alpha_beta_pruning(board, 4, PLAYER2, True, -np.inf, np.inf)
+    assert depth == 4
+    assert value == value_fixed
+
+    """a proven win ends the search early"""
+    from tests.test_common import generate_win_board, VERTICAL
+    board = generate_win_board(VERTICAL, PLAYER1, apply_last_action=False)
+    action, value, depth = iterative_deepening(board, PLAYER1, runtime=10)
+    assert action == 1
+    assert depth == 1
+
+
+def reference_evaluate_board(board: np.ndarray, player: BoardPiece) -> int:
+    """window by window evaluation with evaluate_window, reference for the vectorized evaluate_board"""
+    n_rows, m_columns = board.shape
+    board_score = 0
+    for r in range(n_rows):
+        for c in range(m_columns):
+            for d_r, d_c in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+                cells = [(r + d_r * step, c + d_c * step) for step in range(4)]
+                if all(0 <= i < n_rows and 0 <= j < m_columns for i, j in cells):
+                    window = np.array([board[i, j] for i, j in cells])
+                    board_score += evaluate_window(window, player)
+    return board_score
+
+
+def test_evaluate_board_vectorized():
+    """test if the vectorized and the batched evaluation give exactly the window by window scores"""
+    from tests.test_bitboard import generate_random_board
+
+    assert window_indices().shape == (69, 4)
+    boards = np.array([generate_random_board(n, seed=n) for n in range(0, 40, 3)])
+    players = np.array([PLAYER1, PLAYER2] * len(boards))[:len(boards)]
+    for board, player in zip(boards, players):
+        assert evaluate_board(board, player) == reference_evaluate_board(board, player)
+
+    scores = evaluate_boards(boards, players)
+    assert scores.shape == (len(boards),)
+    assert list(scores) == [evaluate_board(board, player) for board, player in zip(boards, players)]
+    assert list(evaluate_boards(boards, PLAYER1)) == [evaluate_board(board, PLAYER1) for board in boards]
+
+
+def test_incremental_evaluator():
+    """test if the incrementally maintained score equals evaluate_board after every move and take back"""
+    from agents.bitboard import BitBoard
+    from tests.test_bitboard import generate_random_board
+
+    rng = np.random.default_rng(1)
+    board = generate_random_board(10, seed=4)
+    position = EvaluatedBitBoard.from_array(board)
+    played = []
+    for ply in range(20):
+        player = PLAYER1 if ply % 2 == 0 else PLAYER2
+        column = rng.choice(position.valid_columns())
+        position.play(column, player)
+        played.append(column)
+        for p in (PLAYER1, PLAYER2):
+            assert position.evaluator.score(p) == evaluate_board(position.to_array(), p)
+
+    copied = position.copy()
+    for column in reversed(played):
+        position.undo(column)
+        assert position.evaluator.score(PLAYER1) == evaluate_board(position.to_array(), PLAYER1)
+    assert position.key() == BitBoard.from_array(board).key()
+    assert copied.evaluator.score(PLAYER2) == evaluate_board(copied.to_array(), PLAYER2)
+
+    """the search gives the same result on an EvaluatedBitBoard as on a BitBoard"""
+    for seed in range(4):
+        board = generate_random_board(8, seed)
+        assert alpha_beta_bitboard(BitBoard.from_array(board), 4, PLAYER1, -np.inf, np.inf) == \
+            alpha_beta_bitboard(EvaluatedBitBoard.from_array(board), 4, PLAYER1, -np.inf, np.inf)
+
+
+def test_solve():
+    """test if the solver gives the exact values of minimax searched to the end of the game"""
+    from tests.test_bitboard import generate_random_board
+
+    boards = [generate_random_board(32, seed) for seed in range(100)]
+    boards = [board for board in boards if np.count_nonzero(board) == 32][:6]
+    assert len(boards) == 6
+    for board in boards:
+        player = PLAYER1
+        remaining = 42 - np.count_nonzero(board)
+        _, value = minimax(board, remaining, player, True)
+        column, solved_value = solve(board, player)
+        assert solved_value == value
+        if column != -1:
+            child = apply_player_action(board, column, player, copying=True)
+            assert -solve(child, PLAYER2 if player == PLAYER1 else PLAYER1)[1] == value
+
+
+def test_evaluate_board_connect_n():
+    """test the window tables of other connect-n rules"""
+    assert window_score_table(4)[1:4, 0].tolist() == [2, 5, 70]
+    assert window_score_table(5)[1:5, 0].tolist() == [0, 2, 5, 70]
+    assert window_score_table(3)[1:3, 0].tolist() == [5, 70]
+
+    config = GameConfig(7, 8, 5)
+    boards = np.stack([initialize_game_state(config) for _ in range(3)])
+    for i, board in enumerate(boards):
+        for column in range(i + 2):
+            apply_player_action(board, column, PLAYER1)
+    scores = evaluate_boards(boards, PLAYER1, config.connect_n)
+    assert scores.tolist() == [evaluate_board(board, PLAYER1, config.connect_n) for board in boards]
+    assert scores[0] < scores[1] < scores[2]
+
+
+def test_search_stats():
+    """test if the statistics are counted without changing the result of the search"""
+    from tests.test_bitboard import generate_random_board
+
+    board = generate_random_board(10, seed=4)
+    stats = SearchStats()
+    with_stats = alpha_beta_bitboard(search_position(board), 4, PLAYER1, -np.inf, np.inf, TranspositionTable(),
+                                     stats=stats)
+    assert with_stats == alpha_beta_bitboard(search_position(board), 4, PLAYER1, -np.inf, np.inf, TranspositionTable())
+    assert stats.nodes > stats.leaf_evals > 0
+    assert stats.cutoffs > 0
+    assert stats.tt_probes >= stats.tt_hits > 0
+    assert stats.max_depth == 4
+
+    action, saved_state = generate_move_minimax(board, PLAYER1, None, runtime=0.3)
+    stats = saved_state.stats
+    assert stats.stop_reason in ("runtime", "depth", "solved")
+    assert stats.completed_depth > 0
+    assert len(stats.depth_times) >= stats.completed_depth
+    assert stats.nodes_per_second > 0
+    assert set(stats.as_dict()) >= {"nodes", "cutoffs", "tt_hits", "leaf_evals", "nodes_per_second"}
+
+    _, saved_state = generate_move_minimax(board, PLAYER1, None, depth=3, runtime=None)
+    assert saved_state.stats.stop_reason == "depth"
+    assert saved_state.stats.completed_depth == saved_state.stats.max_depth == 3
+
+
+def test_batched_moves():
+    """test if the batched search returns the moves and values of minimax for every board"""
+    from tests.test_bitboard import generate_random_board
+
+    boards, players = [], []
+    for n_moves in (2, 9, 16, 25):
+        for seed in range(4):
+            board = generate_random_board(n_moves, seed)
+            if all(check_end_state(board, player) == GameState.STILL_PLAYING for player in (PLAYER1, PLAYER2)):
+                boards.append(board)
+                players.append(PLAYER1 if np.count_nonzero(board) % 2 == 0 else PLAYER2)
+    boards, players = np.stack(boards), np.array(players, dtype=BoardPiece)
+    for depth in (1, 2):
+        actions, values = negamax_batch(boards, players, depth)
+        assert [(int(action), float(value)) for action, value in zip(actions, values)] == [
+            (int(column), float(value)) for column, value in
+            (minimax(board.copy(), depth, player, True) for board, player in zip(boards, players))
+        ]
+
+    """the win of the opponent is blocked in all boards of the batch"""
+    from tests.test_common import generate_win_board, VERTICAL
+    board = generate_win_board(VERTICAL, PLAYER2, apply_last_action=False, block_opponent_win=True)
+    actions, states = generate_moves_minimax_batch(np.stack([board] * 3), PLAYER1, [None] * 3)
+    assert actions.tolist() == [5] * 3 and states == [None] * 3
+
+    """pick_smart_moves_batch chooses the column with the highest score like pick_smart_move"""
+    actions, _ = pick_smart_moves_batch(boards, players)
+    for board, player, action in zip(boards, players, actions):
+        scores = [evaluate_board(apply_player_action(board, column, player, copying=True), player)
+                  for column in get_valid_columns(board)]
+        if max(scores) > 0:
+            assert action == get_valid_columns(board)[int(np.argmax(scores))]
+        else:
+            assert action in get_valid_columns(board)
+
+    config = GameConfig(7, 8, 5)
+    actions, _ = generate_moves_minimax_batch(np.stack([initialize_game_state(config)] * 2), PLAYER1,
+                                              connect_n=config.connect_n)
+    assert actions.shape == (2,) and all(0 <= action < 8 for action in actions)
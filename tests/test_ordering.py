@@ -0,0 +1,53 @@
+import numpy as np
+from agents.common import *
+from agents.bitboard import BitBoard
+from agents.agent_minimax.minimax import minimax, minimax_alpha_beta_pruning
+from agents.agent_minimax.ordering import MoveOrdering, CenterFirstOrdering, KillerHistoryOrdering
+from agents.agent_minimax.transposition import TranspositionTable
+from tests.test_bitboard import generate_random_board
+
+
+def test_center_first_ordering():
+    position = BitBoard()
+    ordering = CenterFirstOrdering()
+    assert ordering.order([0, 1, 2, 3, 4, 5, 6], position, PLAYER1, -1) == [3, 2, 4, 1, 5, 0, 6]
+    assert ordering.order([0, 1, 2, 3, 4, 5, 6], position, PLAYER1, 6) == [6, 3, 2, 4, 1, 5, 0]
+    assert CenterFirstOrdering(hash_move_first=False).order([0, 6, 3], position, PLAYER1, 6) == [3, 0, 6]
+
+
+def test_killer_history_ordering():
+    position = BitBoard().play(3, PLAYER1)
+    ordering = KillerHistoryOrdering()
+
+    """moves causing cut-offs are searched first in sibling nodes (killers)"""
+    ordering.cutoff(position, 0, PLAYER2, 2)
+    assert ordering.order([0, 1, 2, 3, 4, 5, 6], position, PLAYER2, -1)[0] == 0
+    assert ordering.order([0, 1, 2, 3, 4, 5, 6], position, PLAYER2, 5)[:2] == [5, 0]
+
+    """history scores are kept for other plies, killers are not"""
+    other = BitBoard()
+    assert ordering.order([0, 1, 2, 3, 4, 5, 6], other, PLAYER2, -1)[:2] == [0, 3]
+    assert ordering.order([0, 1, 2, 3, 4, 5, 6], other, PLAYER1, -1)[:2] == [3, 2]
+    ordering.cutoff(position, 6, PLAYER2, 3)
+    assert ordering.order([0, 1, 2, 3, 4, 5, 6], other, PLAYER2, -1)[0] == 6
+
+    ordering.new_search()
+    assert ordering.killers[position.n_moves] == []
+    assert ordering.history[PLAYER2][other.heights[6]] == 9 // 2
+
+
+def test_alpha_beta_matches_minimax():
+    """test if all orderings, with and without PVS and transposition table, give the values of minimax"""
+    orderings = (None, MoveOrdering(), CenterFirstOrdering(), KillerHistoryOrdering())
+    for seed in range(6):
+        board = generate_random_board(4 + 5 * seed, seed)
+        player = PLAYER1 if np.count_nonzero(board) % 2 == 0 else PLAYER2
+        for maximizing in (True, False):
+            _, value = minimax(board, 3, player, maximizing)
+            for ordering in orderings:
+                for pvs in (False, True):
+                    tt = TranspositionTable(1 << 10)
+                    _, value_ab = minimax_alpha_beta_pruning(
+                        board, 3, player, maximizing, -np.inf, np.inf, tt, ordering, pvs
+                    )
+                    assert value_ab == value
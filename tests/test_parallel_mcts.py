@@ -0,0 +1,106 @@
+import numpy as np
+import random
+import pytest
+from agents.common import *
+from agents.agent_mct.montecarlo import generate_move_montecarlo, random_rollout, rollout_results, MctsStats
+from agents.agent_mct.parallel import root_parallel_mcts, leaf_parallel_mcts, merged_best_move, _simulate_batch, \
+    _grow_tree
+from agents.bitboard import BitBoard
+from tests.test_common import generate_draw_board, generate_win_board, HORIZONTAL, VERTICAL
+
+
+def test_simulate_batch():
+    """test if the batched simulations count the winners like single simulations"""
+    position = BitBoard.from_array(generate_draw_board())
+    assert _simulate_batch(position, PLAYER1, 5, seed=0) == [5, 0, 0]
+
+    position = BitBoard.from_array(generate_win_board(HORIZONTAL, PLAYER2))
+    assert _simulate_batch(position, PLAYER2, 3, seed=0) == [0, 0, 3]
+    assert rollout_results(random_rollout(position, PLAYER2)) == [0, 0, 1]
+
+    results = _simulate_batch(BitBoard(), PLAYER2, 20, seed=1)
+    assert sum(results) == 20
+    assert results == _simulate_batch(BitBoard(), PLAYER2, 20, seed=1)
+
+
+def test_grow_tree():
+    children, stats = _grow_tree(initialize_game_state(), PLAYER1, 0.2, seed=0)
+    assert stats.iterations > 0 and stats.stop_reason == "runtime"
+    assert sorted(move for move, *_ in children) == list(range(7))
+    assert sum(sims for _, _, sims, _, _ in children) <= stats.iterations
+
+    children, stats = _grow_tree(initialize_game_state(), PLAYER1, None, seed=0, max_iterations=50)
+    assert stats.iterations == 50 and stats.stop_reason == "iterations"
+
+
+def test_merged_best_move():
+    """a proven win beats any ratio, proven losses are only picked if all children are lost"""
+    wins, sims = {0: 9, 1: 1, 2: 5}, {0: 10, 1: 10, 2: 10}
+    assert merged_best_move(wins, sims, {0: None, 1: None, 2: None}, {0: 0, 1: 0, 2: 0}) == 0
+    assert merged_best_move(wins, sims, {0: -1, 1: None, 2: None}, {0: 2, 1: 0, 2: 0}) == 2
+    assert merged_best_move(wins, sims, {0: None, 1: 1, 2: 1}, {0: 0, 1: 3, 2: 1}) == 2
+    assert merged_best_move(wins, sims, {0: -1, 1: -1, 2: -1}, {0: 2, 1: 4, 2: 2}) == 1
+
+
+def test_root_parallel_blocks_win():
+    """the moves not blocking the win of the opponent are proven losses and are not picked for their ratio"""
+    board = generate_win_board(VERTICAL, PLAYER2, apply_last_action=False, block_opponent_win=True)
+    for max_iterations in (45, 60, 100):
+        for seed in range(10):
+            action, _ = root_parallel_mcts(board, PLAYER1, None, n_workers=2, seed=seed,
+                                           max_iterations=max_iterations)
+            assert action == 5
+
+
+def test_parallel_mcts():
+    """test if both parallel modes return a valid move and report simulations per second"""
+    board = generate_win_board(HORIZONTAL, PLAYER1, apply_last_action=False)
+    for parallel_mcts in (root_parallel_mcts, leaf_parallel_mcts):
+        action, playouts_per_second = parallel_mcts(board, PLAYER1, runtime=0.5, n_workers=2, seed=0)
+        assert 0 <= action < 7
+        assert playouts_per_second > 0
+
+    action, _ = generate_move_montecarlo(board, PLAYER1, None, runtime=0.5, n_workers=2, parallel="leaf")
+    assert 0 <= action < 7
+
+
+def test_parallel_mcts_budgets():
+    """test if the budgets are forwarded to the parallel searches and the statistics are filled"""
+    board = initialize_game_state()
+    for parallel in ("root", "leaf"):
+        action, saved_state = generate_move_montecarlo(
+            board, PLAYER1, None, runtime=None, max_iterations=200, n_workers=2, parallel=parallel, book=False
+        )
+        assert 0 <= action < 7
+        stats = saved_state.stats
+        assert stats.stop_reason == "iterations"
+        assert stats.iterations == (400 if parallel == "root" else 200)  # the budget applies to every tree of root
+        assert stats.simulations >= stats.iterations and stats.simulations_per_second > 0
+        assert stats.nodes > 1 and stats.max_depth > 0
+
+        _, saved_state = generate_move_montecarlo(
+            board, PLAYER1, None, runtime=None, max_nodes=100, rollouts=2, policy="ucb1-tuned", n_workers=2,
+            parallel=parallel, book=False
+        )
+        assert saved_state.stats.stop_reason == "nodes"
+
+    with pytest.raises(ValueError):
+        generate_move_montecarlo(board, PLAYER1, None, runtime=None, n_workers=2, book=False)
+    with pytest.raises(ValueError):
+        generate_move_montecarlo(board, PLAYER1, None, runtime=0.1, n_workers=2, compact=True, book=False)
+
+
+def test_leaf_parallel_mcts_rounds():
+    """test if the leaves are simulated in rounds, reproducibly, without touching the global random state"""
+    board = initialize_game_state()
+    random.seed(5)
+    state = random.getstate()
+    stats = MctsStats()
+    action, _ = leaf_parallel_mcts(board, PLAYER1, None, n_workers=2, leaves_per_task=8, seed=1, rollouts=3,
+                                   max_iterations=100, stats=stats)
+    assert random.getstate() == state
+    assert stats.iterations == 100 and stats.simulations == 300 and stats.nodes == 101
+    replayed = MctsStats()
+    assert leaf_parallel_mcts(board, PLAYER1, None, n_workers=2, leaves_per_task=8, seed=1, rollouts=3,
+                              max_iterations=100, stats=replayed)[0] == action
+    assert replayed.simulations == stats.simulations
@@ -0,0 +1,67 @@
+import numpy as np
+from agents.common import *
+from agents.agent_minimax.minimax import alpha_beta_bitboard, search_position, generate_move_minimax, \
+    iterative_deepening, SearchStats
+from agents.agent_minimax.ordering import CenterFirstOrdering
+from agents.agent_minimax.parallel import parallel_alpha_beta, get_pool, new_search_id
+from tests.test_bitboard import generate_random_board
+
+
+def test_parallel_matches_serial():
+    """test if the root-split search returns the move and value of the single process search"""
+    for seed in range(6):
+        board = generate_random_board(3 + 4 * seed, seed)
+        player = PLAYER1 if np.count_nonzero(board) % 2 == 0 else PLAYER2
+        for depth in (1, 4):
+            serial = alpha_beta_bitboard(search_position(board), depth, player, -np.inf, np.inf,
+                                         ordering=CenterFirstOrdering())
+            parallel = parallel_alpha_beta(board, depth, player, n_workers=2)
+            assert parallel == serial
+
+
+def test_parallel_matches_serial_after_deeper_search():
+    """test if entries of an earlier, deeper search in the worker tables do not change a shallower search"""
+    boards = [generate_random_board(3 + 4 * seed, seed) for seed in range(6)]
+    players = [PLAYER1 if np.count_nonzero(board) % 2 == 0 else PLAYER2 for board in boards]
+    for board, player in zip(boards, players):
+        parallel_alpha_beta(board, 6, player, n_workers=2)
+    for board, player in zip(boards, players):
+        for depth in (2, 3, 4):
+            serial = alpha_beta_bitboard(search_position(board), depth, player, -np.inf, np.inf,
+                                         ordering=CenterFirstOrdering())
+            assert parallel_alpha_beta(board, depth, player, n_workers=2) == serial
+
+
+def test_worker_tables_kept_between_depths():
+    """test if the iterations of one search find the entries of the previous iterations in the worker tables"""
+    board = generate_random_board(8, seed=4)
+    player = PLAYER1 if np.count_nonzero(board) % 2 == 0 else PLAYER2
+    search_id = new_search_id()
+    for depth in (1, 2, 3, 4):
+        carried = SearchStats()
+        parallel_alpha_beta(board, depth, player, n_workers=1, stats=carried, search_id=search_id)
+    fresh = SearchStats()
+    parallel_alpha_beta(board, 4, player, n_workers=1, stats=fresh)
+    assert carried.tt_hits > fresh.tt_hits
+
+
+def test_persistent_pool():
+    assert get_pool(2) is get_pool(2)
+
+
+def test_parallel_generate_move():
+    """test if the parallel search is reachable through generate_move_minimax"""
+    from tests.test_common import generate_win_board, VERTICAL
+
+    board = generate_win_board(VERTICAL, PLAYER2, apply_last_action=False, block_opponent_win=True)
+    action, _ = generate_move_minimax(board, PLAYER1, None, depth=4, runtime=None, n_workers=2)
+    assert action == 5
+    action, _ = generate_move_minimax(board, PLAYER1, None, runtime=0.5, n_workers=2)
+    assert action == 5
+
+    board = generate_random_board(10, seed=2)
+    stats = SearchStats()
+    _, _, depth = iterative_deepening(board, PLAYER1, runtime=10, max_depth=4, n_workers=2, stats=stats)
+    assert depth == 4
+    assert stats.max_depth == 4  # the counters of the workers are merged
+    assert stats.nodes > stats.leaf_evals > 0
@@ -1,5 +1,5 @@
 import numpy as np
-from agents.agent_random.random import generate_move_random
+from agents.agent_random.random import generate_move_random, generate_moves_random_batch
 from agents.common import *
 
 
@@ -19,3 +19,13 @@ def test_generate_random_move():
     assert action == 6
 
 
+def test_generate_random_moves_batch():
+    """test if only valid columns are chosen, all of them, and -1 for full boards"""
+    boards = np.stack([initialize_game_state() for _ in range(200)])
+    boards[:, :, [0, 2]] = PLAYER1  # full columns
+    boards[-1] = PLAYER2  # full board
+    states = [None] * len(boards)
+    actions, saved_states = generate_moves_random_batch(boards, np.full(len(boards), PLAYER1), states)
+    assert saved_states is states
+    assert actions[-1] == -1
+    assert set(actions[:-1].tolist()) == {1, 3, 4, 5, 6}
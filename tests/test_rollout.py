@@ -0,0 +1,53 @@
+import numpy as np
+from agents.common import *
+from agents.bitboard import BitBoard, connected_four_bits
+from agents.agent_mct.rollout import connected_four_vector, batched_rollouts, rollout_counts, DRAW
+from agents.agent_mct.montecarlo import Node, mcts_run
+from tests.test_bitboard import generate_random_board
+from tests.test_common import generate_draw_board
+
+
+def test_connected_four_vector():
+    """test if the vectorized win detection agrees with connected_four_bits"""
+    bits = []
+    for seed in range(40):
+        position = BitBoard.from_array(generate_random_board(10 + seed % 25, seed))
+        bits += [position.pieces[PLAYER1], position.pieces[PLAYER2]]
+    won = connected_four_vector(np.array(bits, dtype=np.uint64))
+    assert list(won) == [connected_four_bits(b) for b in bits]
+
+
+def test_batched_rollouts_end_states():
+    """test the results for won, drawn and forced positions"""
+    board = np.zeros((6, 7), dtype=BoardPiece)
+    board[0, :4] = PLAYER1
+    board[1, :3] = PLAYER2
+    winners = batched_rollouts(BitBoard.from_array(board), PLAYER1, 10)
+    assert np.all(winners == PLAYER1)
+
+    draw_position = BitBoard.from_array(generate_draw_board())
+    assert np.all(batched_rollouts(draw_position, PLAYER2, 10) == DRAW)
+
+    """one free cell left, the last piece of PLAYER2 does not connect four"""
+    board = generate_draw_board()
+    board[5, 6] = NO_PLAYER
+    position = BitBoard.from_array(board)
+    assert np.all(batched_rollouts(position, PLAYER1, 5) == DRAW)
+
+
+def test_batched_rollouts_distribution():
+    """test if the batched games agree with single random games: PLAYER1 (first to move) wins more often"""
+    rng = np.random.default_rng(0)
+    winners = batched_rollouts(BitBoard(), PLAYER2, 4000, rng)
+    counts = rollout_counts(winners)
+    assert sum(counts) == 4000
+    assert counts[PLAYER1] > counts[PLAYER2] > counts[0]
+    assert 0.5 < counts[PLAYER1] / 4000 < 0.62
+
+
+def test_mcts_batched_rollouts():
+    """test if mcts_run counts every simulation of the batches"""
+    root_node = Node(initialize_game_state(), PLAYER1)
+    counter = mcts_run(root_node, 0.2, rollouts=16)
+    assert root_node.sims == 16 * counter
+    assert sum(child.sims for child in root_node.child_nodes) == root_node.sims
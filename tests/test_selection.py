@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from agents.agent_mct.selection import UCB1, UCB1Tuned, PUCT, get_policy, DEFAULT_POLICY
+
+
+def test_ucb1_scores():
+    """test if UCB1 scores all children as the scalar formula"""
+    wins = np.array([3, 0, 7, 5])
+    sims = np.array([5, 2, 10, 9])
+    parent_sims = 26
+    expected = [w / s + np.sqrt(2) * np.sqrt(np.log(parent_sims) / s) for w, s in zip(wins, sims)]
+    assert np.allclose(UCB1().scores(wins, sims, parent_sims, np.arange(4)), expected)
+    assert UCB1().select(wins, sims, parent_sims, np.arange(4)) == int(np.argmax(expected))
+
+
+def test_ucb1_tuned_scores():
+    """test if the exploration term of UCB1-Tuned is bounded by the variance (never larger than for UCB1)"""
+    wins = np.array([0, 5, 10])
+    sims = np.array([10, 10, 10])
+    scores = UCB1Tuned().scores(wins, sims, 30, np.arange(3))
+    mean = wins / sims
+    exploration = scores - mean
+    assert np.all(exploration > 0)
+    assert np.all(exploration <= np.sqrt(np.log(30) / sims / 4) + 1e-12)
+    """the certain results (0 or 10 wins) are explored less than the uncertain one"""
+    assert exploration[1] > exploration[0]
+    assert np.isclose(exploration[0], exploration[2])
+
+
+def test_puct_scores():
+    """test if PUCT explores the moves with high prior first and normalizes the prior over the children"""
+    prior = np.array([1, 1, 1, 4, 1, 1, 1])
+    wins = np.array([1, 1])
+    sims = np.array([2, 2])
+    policy = PUCT(prior=prior)
+    assert policy.select(wins, sims, 4, np.array([0, 3])) == 1
+    expected = 0.5 + 1.5 * np.array([0.2, 0.8]) * 2 / 3
+    assert np.allclose(policy.scores(wins, sims, 4, np.array([0, 3])), expected)
+    assert np.allclose(PUCT().scores(wins, sims, 4, np.array([0, 3])), 0.5 + 1.5 * 0.5 * 2 / 3)
+
+
+def test_get_policy():
+    assert get_policy(None) is DEFAULT_POLICY
+    assert isinstance(get_policy("ucb1-tuned"), UCB1Tuned)
+    policy = PUCT(c=2)
+    assert get_policy(policy) is policy
+    with pytest.raises(ValueError):
+        get_policy("ucb2")
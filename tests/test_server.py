@@ -0,0 +1,243 @@
+import asyncio
+import os
+import time
+import numpy as np
+from agents.common import *
+import server
+from server import GameServer, SESSION_TT_SIZE
+from load_test import run_load_test
+
+
+def play_random_game(game_server: GameServer, session_id: int, agent_player: BoardPiece) -> dict:
+    """play legal moves (the lowest free column) against the agent of a session until the game ends"""
+    board = initialize_game_state()
+    client_player = PLAYER2 if agent_player == PLAYER1 else PLAYER1
+
+    async def play() -> dict:
+        response = {"result": None}
+        while response["result"] is None:
+            column = int(np.flatnonzero(board[-1] == NO_PLAYER)[0])
+            apply_player_action(board, column, client_player)
+            response = await game_server.handle({"op": "move", "session": session_id, "column": column})
+            assert "error" not in response
+            if "agent_move" in response:
+                apply_player_action(board, response["agent_move"], agent_player)
+        return response
+
+    return asyncio.run(play())
+
+
+def generate_move_failing(board: np.ndarray, player: BoardPiece, saved_state: Optional[SavedState]):
+    """agent raising an error, run by the workers of the tests"""
+    raise RuntimeError("agent failed")
+
+
+def generate_move_crashing(board: np.ndarray, player: BoardPiece, saved_state: Optional[SavedState]):
+    """agent killing its worker process"""
+    os._exit(1)
+
+
+def test_game_session():
+    """test a whole game against the random agent, the board of the server and the errors of bad requests"""
+    game_server = GameServer(n_workers=1)
+    try:
+        response = asyncio.run(game_server.handle({"id": 1, "op": "new", "agent": "random", "agent_player": 1}))
+        assert response["id"] == 1 and "agent_move" in response and not response["timeout"]
+        session = game_server.sessions[response["session"]]
+        assert (session.board == PLAYER1).sum() == 1
+
+        result = play_random_game(game_server, session.id, PLAYER1)
+        assert result["result"] == session.result and session.result in ("win", "draw", "loss")
+        assert (session.board != NO_PLAYER).sum() == len(session.moves)
+
+        handle = lambda request: asyncio.run(game_server.handle(request))
+        assert "error" in handle({"op": "move", "session": session.id, "column": 0})  # game over
+        assert "error" in handle({"op": "move", "session": 999, "column": 0})
+        assert "error" in handle({"op": "new", "agent": "unknown"})
+        assert "error" in handle({"op": "bogus"})
+        assert handle({"op": "close", "session": session.id}) == {"closed": True}
+        assert handle({"op": "status"})["sessions"] == 0
+    finally:
+        game_server.close()
+
+
+def test_illegal_move():
+    game_server = GameServer(n_workers=1)
+    try:
+        handle = lambda request: asyncio.run(game_server.handle(request))
+        session_id = handle({"op": "new", "agent": "random"})["session"]
+        assert "error" in handle({"op": "move", "session": session_id, "column": 7})
+        assert game_server.sessions[session_id].moves == []
+    finally:
+        game_server.close()
+
+
+def test_unsupported_config():
+    """agents searching on the 6x7 bitboard are rejected for other boards before a session is created"""
+    game_server = GameServer(n_workers=1)
+    try:
+        handle = lambda request: asyncio.run(game_server.handle(request))
+        for agent in ("minimax", "mcts"):
+            assert "error" in handle({"op": "new", "agent": agent, "config": [7, 8, 4]})
+            assert "error" in handle({"op": "generate", "agent": agent, "board": np.zeros((7, 8)).tolist(),
+                                      "player": 1})
+        assert game_server.status()["sessions"] == 0
+        response = handle({"op": "new", "agent": "random", "agent_player": 1, "config": [7, 8, 4]})
+        assert "error" not in response and 0 <= response["agent_move"] < 8
+    finally:
+        game_server.close()
+
+
+def test_failed_agent_move():
+    """a failing agent is answered with an error, the session stays as it was before the request"""
+    game_server = GameServer(n_workers=1)
+    try:
+        handle = lambda request: asyncio.run(game_server.handle(request))
+        agent = "tests.test_server.generate_move_failing"
+        session_id = handle({"op": "new", "agent": agent})["session"]
+        response = handle({"op": "move", "session": session_id, "column": 3})
+        assert "agent failed" in response["error"]
+        session = game_server.sessions[session_id]
+        assert session.moves == [] and not session.board.any() and session.result is None
+
+        """a failed first move of the agent closes the new session"""
+        assert "error" in handle({"op": "new", "agent": agent, "agent_player": 1})
+        assert game_server.status()["sessions"] == 1 and game_server.lane_sessions == [1]
+    finally:
+        game_server.close()
+
+
+def test_crashed_worker():
+    """a lane whose worker died is restarted and answers the next requests"""
+    game_server = GameServer(n_workers=1)
+    try:
+        handle = lambda request: asyncio.run(game_server.handle(request))
+        session_id = handle({"op": "new", "agent": "tests.test_server.generate_move_crashing"})["session"]
+        assert "error" in handle({"op": "move", "session": session_id, "column": 3})
+        assert game_server.sessions[session_id].moves == []
+        assert game_server.counters["restarts"] == 1
+
+        session_id = handle({"op": "new", "agent": "random"})["session"]
+        response = handle({"op": "move", "session": session_id, "column": 3})
+        assert "error" not in response and 0 <= response["agent_move"] < 7
+    finally:
+        game_server.close()
+
+
+def test_session_tt_size():
+    """the transposition table kept per session is bounded, unless the agent spec sets its size"""
+    board = initialize_game_state()
+    try:
+        server._generate_move(1, "minimax:runtime=0.05,book=false", board, PLAYER1, 1.0)
+        assert server._worker_states[1].tt.size == SESSION_TT_SIZE
+        server._generate_move(2, "minimax:runtime=0.05,book=false,tt_size=1024", board, PLAYER1, 1.0)
+        assert server._worker_states[2].tt.size == 1024
+    finally:
+        server._worker_states.clear()
+
+
+def test_runtime_capped_by_deadline():
+    """the runtime budget of the agent is capped to a share of the deadline, so the search stops in time"""
+    game_server = GameServer(n_workers=1)
+    try:
+        handle = lambda request: asyncio.run(game_server.handle(request))
+        session_id = handle({"op": "new", "agent": "mcts:runtime=null,max_iterations=1000000,book=false"})["session"]
+        response = handle({"op": "move", "session": session_id, "column": 3, "deadline": 0.5})
+        assert not response["timeout"]
+        assert response["stats"]["stop_reason"] == "runtime"
+        assert response["time"] < 0.5
+    finally:
+        game_server.close()
+
+
+def test_deadline_fallback():
+    """a move queued behind a long search misses its deadline, is cancelled and replaced by a random legal move"""
+    game_server = GameServer(n_workers=1)
+    try:
+        async def run():
+            slow = await game_server.handle({"op": "new", "agent": "mcts:runtime=1,book=false"})
+            queued = await game_server.handle({"op": "new", "agent": "random"})
+            slow_move = asyncio.create_task(
+                game_server.handle({"op": "move", "session": slow["session"], "column": 3, "deadline": 5})
+            )
+            await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            response = await game_server.handle({"op": "move", "session": queued["session"], "column": 3,
+                                                 "deadline": 0.2})
+            waited = time.perf_counter() - start
+            return response, waited, await slow_move
+
+        response, waited, slow_response = asyncio.run(run())
+        assert response["timeout"] and response["stats"] is None and waited < 0.8
+        assert 0 <= response["agent_move"] < 7
+        assert not slow_response["timeout"]
+        assert game_server.counters["timeouts"] == 1
+    finally:
+        game_server.close()
+
+
+def test_sessions_on_separate_lanes():
+    """a long search of one session does not delay the moves of a session on another lane"""
+    game_server = GameServer(n_workers=2)
+    try:
+        async def run():
+            slow = await game_server.handle({"op": "new", "agent": "mcts:runtime=1.5,book=false"})
+            fast = await game_server.handle({"op": "new", "agent": "random"})
+            assert game_server.sessions[slow["session"]].lane != game_server.sessions[fast["session"]].lane
+            """warm up the lane of the fast session, so the start of its process is not measured"""
+            await game_server.handle({"op": "move", "session": fast["session"], "column": 0})
+
+            slow_move = asyncio.create_task(
+                game_server.handle({"op": "move", "session": slow["session"], "column": 3})
+            )
+            await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            fast_response = await game_server.handle({"op": "move", "session": fast["session"], "column": 0})
+            fast_time = time.perf_counter() - start
+            assert not slow_move.done()
+            slow_response = await slow_move
+            return fast_response, fast_time, slow_response
+
+        fast_response, fast_time, slow_response = asyncio.run(run())
+        assert "agent_move" in fast_response and fast_time < 1.0
+        assert not slow_response["timeout"] and slow_response["stats"]["iterations"] > 0
+    finally:
+        game_server.close()
+
+
+def test_load_test():
+    """games over a socket connection, with the throughput and latency summary of the load test"""
+    game_server = GameServer(n_workers=2)
+
+    async def run():
+        server = await game_server.start("127.0.0.1", 0)
+        async with server:
+            return await run_load_test(6, 3, "random", port=server.sockets[0].getsockname()[1])
+
+    try:
+        summary = asyncio.run(run())
+    finally:
+        game_server.close()
+    assert summary["sessions"] == 6
+    assert sum(summary["results"].values()) == 6
+    assert summary["agent_moves"] > 0 and summary["moves_per_second"] > 0
+    assert summary["timeouts"] == 0
+    latency = summary["latency"]
+    assert latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    assert game_server.status()["sessions"] == 0
+
+
+def test_load_test_lost_connection():
+    """games whose connection is closed by the server count as errors instead of failing the load test"""
+    async def close_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        await reader.readline()
+        writer.close()
+
+    async def run():
+        closing_server = await asyncio.start_server(close_connection, "127.0.0.1", 0)
+        async with closing_server:
+            return await run_load_test(3, 3, "random", port=closing_server.sockets[0].getsockname()[1])
+
+    summary = asyncio.run(run())
+    assert summary["sessions"] == 3 and summary["results"]["error"] == 3
+    assert summary["agent_moves"] == 0
@@ -0,0 +1,101 @@
+import numpy as np
+from agents.common import *
+from agents.bitboard import BitBoard
+from agents.agent_minimax.minimax import minimax_alpha_beta_pruning, generate_move_minimax, MinimaxState
+from agents.agent_minimax.transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from tests.test_bitboard import generate_random_board
+
+
+def test_zobrist_hash():
+    """test if the incrementally updated hash equals the hash of the converted board"""
+    board = generate_random_board(15, seed=1)
+    position = BitBoard.from_array(board)
+    for column in (0, 3, 3, 6):
+        position.play(column, PLAYER1)
+        apply_player_action(board, column, PLAYER1)
+        assert position.hash == BitBoard.from_array(board).hash
+    for column in (6, 3, 3, 0):
+        position.undo(column)
+    assert position.hash == BitBoard.from_array(generate_random_board(15, seed=1)).hash
+    assert position.zobrist_key(PLAYER1) != position.zobrist_key(PLAYER2)
+
+    """transpositions (same position, different move order) have the same hash"""
+    a = BitBoard().play(2, PLAYER1).play(4, PLAYER2).play(3, PLAYER1)
+    b = BitBoard().play(3, PLAYER1).play(4, PLAYER2).play(2, PLAYER1)
+    assert a.hash == b.hash
+
+
+def test_store_and_probe():
+    tt = TranspositionTable(size=16)
+    assert tt.probe(5) is None
+    tt.store(5, 3, 10, EXACT, 2)
+    entry = tt.probe(5)
+    assert (entry.depth, entry.value, entry.flag, entry.move) == (3, 10, EXACT, 2)
+    assert len(tt) == 1
+
+    """a different position in the same slot is no hit"""
+    assert tt.probe(5 + 16) is None
+
+
+def test_replacement_policy():
+    tt = TranspositionTable(size=16)
+    tt.store(1, 5, 10, LOWER_BOUND, 0)
+
+    """a shallower entry of the current search does not replace a deeper one"""
+    tt.store(17, 2, 20, UPPER_BOUND, 1)
+    assert tt.probe(1) is not None and tt.probe(17) is None
+
+    """the same position is always updated"""
+    tt.store(1, 1, 30, EXACT, 3)
+    assert tt.probe(1).value == 30
+
+    """entries of earlier searches are replaced"""
+    tt.store(1, 5, 10, LOWER_BOUND, 0)
+    tt.new_search()
+    tt.store(17, 2, 20, UPPER_BOUND, 1)
+    assert tt.probe(1) is None and tt.probe(17).value == 20
+
+
+def test_search_with_tt():
+    """test if the transposition table does not change the result of the search"""
+    for seed in range(8):
+        board = generate_random_board(6 + seed, seed)
+        player = PLAYER1 if np.count_nonzero(board) % 2 == 0 else PLAYER2
+        if check_end_state(board, PLAYER1) != GameState.STILL_PLAYING or \
+                check_end_state(board, PLAYER2) != GameState.STILL_PLAYING:
+            continue
+        tt = TranspositionTable(size=1 << 12)
+        _, value = minimax_alpha_beta_pruning(board, 4, player, True, -np.inf, np.inf)
+        _, value_tt = minimax_alpha_beta_pruning(board, 4, player, True, -np.inf, np.inf, tt)
+        assert value == value_tt
+        assert tt.hits > 0
+
+
+def test_saved_state_carries_tt():
+    board = initialize_game_state()
+    action, saved_state = generate_move_minimax(board, PLAYER1, None, depth=4)
+    assert isinstance(saved_state, MinimaxState)
+    assert len(saved_state.tt) > 0
+
+    apply_player_action(board, action, PLAYER1)
+    apply_player_action(board, 3, PLAYER2)
+    hits = saved_state.tt.hits
+    _, next_state = generate_move_minimax(board, PLAYER1, saved_state, depth=4)
+    assert next_state is saved_state
+    assert saved_state.tt.hits > hits
+
+
+def test_mirrored_positions_share_entries():
+    """test if the search of the mirror image is answered from the entries of the position (moves mirrored)"""
+    board = generate_random_board(8, seed=2)
+    player = PLAYER1 if np.count_nonzero(board) % 2 == 0 else PLAYER2
+    tt = TranspositionTable(size=1 << 14)
+    column, value = minimax_alpha_beta_pruning(board, 5, player, True, -np.inf, np.inf, tt)
+    n_entries, probes, hits = len(tt), tt.probes, tt.hits
+
+    mirrored_column, mirrored_value = minimax_alpha_beta_pruning(
+        np.fliplr(board), 5, player, True, -np.inf, np.inf, tt
+    )
+    assert (mirrored_column, mirrored_value) == (6 - column, value)
+    assert len(tt) == n_entries
+    assert tt.hits - hits == tt.probes - probes  # every probe is a hit
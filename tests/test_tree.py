@@ -0,0 +1,110 @@
+import numpy as np
+import random
+import pytest
+from agents.common import *
+from agents.bitboard import BitBoard
+from agents.agent_mct.montecarlo import generate_move_montecarlo, MctsStats
+from agents.agent_mct.tree import ArrayTree, array_mcts_algorithm, ROOT, NO_NODE, MIN_MAX_NODES
+from tests.test_bitboard import generate_random_board
+
+
+def check_tree(tree: ArrayTree):
+    """every node has the statistics of its children and its position can be replayed from the root"""
+    for node in range(tree.n_nodes):
+        start, n = tree.first_child[node], tree.n_children[node]
+        if n > 0:
+            children = slice(start, start + n)
+            assert np.all(tree.parent[children] == node)
+            assert tree.sims[node] >= tree.sims[children].sum()
+            assert np.all(tree.player[children] != tree.player[node])
+        moves = []
+        current = node
+        while tree.parent[current] != NO_NODE:
+            moves.append(int(tree.move[current]))
+            current = tree.parent[current]
+        position = tree.root_position.copy()
+        for move in reversed(moves):
+            assert position.can_play(move)
+            position.play(move, PLAYER1 if position.n_moves % 2 == 0 else PLAYER2)
+
+
+def test_array_tree_growth():
+    """test if the arrays grow from the initial capacity and the tree stays consistent"""
+    random.seed(0)
+    board = generate_random_board(6, 0)
+    player = PLAYER1 if np.count_nonzero(board) % 2 == 0 else PLAYER2
+    tree = ArrayTree(board, player, capacity=8)
+    for _ in range(300):
+        position = tree.root_position.copy()
+        node = tree.select_and_expand(position)
+        tree.backpropagate(node, PLAYER1)
+    assert tree.capacity > 8
+    assert tree.sims[ROOT] == 300
+    check_tree(tree)
+
+
+def test_array_tree_node_cap():
+    """test if the tree stops growing at max_nodes, but the simulations go on"""
+    tree = ArrayTree(initialize_game_state(), PLAYER1, capacity=4, max_nodes=30)
+    for _ in range(200):
+        position = tree.root_position.copy()
+        node = tree.select_and_expand(position)
+        tree.backpropagate(node, PLAYER2)
+    assert tree.n_nodes <= 30
+    assert tree.capacity <= 30
+    assert tree.sims[ROOT] == 200
+    check_tree(tree)
+
+
+def test_array_mcts_stops_at_node_cap():
+    """test if the search ends with the stop reason "nodes" once the tree is full"""
+    stats = MctsStats()
+    tree = ArrayTree(initialize_game_state(), PLAYER1, max_nodes=30)
+    iterations = tree.run(runtime=10, stats=stats)
+    assert tree.full and stats.stop_reason == "nodes"
+    assert stats.nodes == tree.n_nodes <= 30 and iterations < 100
+    assert stats.elapsed < 1
+
+
+def test_compact_unsupported_options():
+    """the compact tree rejects the options it does not implement instead of ignoring them"""
+    board = initialize_game_state()
+    for options in ({"rollouts": 4}, {"early_stop": True}):
+        with pytest.raises(ValueError):
+            generate_move_montecarlo(board, PLAYER1, None, runtime=None, max_iterations=10, compact=True,
+                                     book=False, **options)
+
+
+def test_array_tree_tiny_cap():
+    """test if caps too small for the children of the root are rejected, the smallest cap still finds a move"""
+    board = initialize_game_state()
+    with pytest.raises(ValueError):
+        array_mcts_algorithm(board, PLAYER1, runtime=None, max_nodes=5, max_iterations=10)
+    with pytest.raises(ValueError):
+        generate_move_montecarlo(board, PLAYER1, None, runtime=None, max_iterations=10, compact=True, max_nodes=3,
+                                 book=False)
+    action = array_mcts_algorithm(board, PLAYER1, runtime=None, max_nodes=MIN_MAX_NODES, max_iterations=50)
+    assert 0 <= action < 7
+
+
+def test_array_tree_terminal_node():
+    """test if a won position is not expanded"""
+    board = np.zeros((6, 7), dtype=BoardPiece)
+    board[0, :4] = PLAYER1
+    board[1, :3] = PLAYER2
+    tree = ArrayTree(board, PLAYER2)
+    assert tree.untried[ROOT] == 0
+    assert tree.select_and_expand(tree.root_position.copy()) == ROOT
+
+
+def test_array_mcts_immediate_win():
+    """test if the compact tree finds an immediate win and blocks the opponent's"""
+    board = np.zeros((6, 7), dtype=BoardPiece)
+    board[0, :3] = PLAYER1
+    board[1, :2] = PLAYER2
+    assert array_mcts_algorithm(board, PLAYER1, runtime=1) == 3
+
+    board[1, :2] = NO_PLAYER
+    board[0, 6] = PLAYER2
+    board[1, 6] = PLAYER2
+    assert array_mcts_algorithm(board, PLAYER2, runtime=1) == 3